@@ -0,0 +1,40 @@
+-- The chain_gang database (chain_gang.sql and admin.sql) for the SQLite
+-- backend (activerecord.backends.SQLiteBackend).
+-- It is used as DB_SCHEMA in db_credentials.py, so offline sessions and
+-- benchmarks have the same tables as the MySQL server.
+-- DECIMAL columns come back as decimal.Decimal, as they do from MySQL.
+-- DECIMAL_SCALE_<n>(p,n) is DECIMAL(p,n) with NUMERIC affinity, but read back
+-- with its n decimal places (a DECIMAL column would read 1000.00 as 1000).
+
+DROP TABLE IF EXISTS admins;
+
+DROP TABLE IF EXISTS bicycles;
+
+CREATE TABLE bicycles (
+  id            INTEGER PRIMARY KEY AUTOINCREMENT,
+  brand         VARCHAR(255) NOT NULL,
+  model         VARCHAR(255) NOT NULL,
+  `year`        INT(4) NOT NULL,
+  category      VARCHAR(255) NOT NULL,
+  gender        VARCHAR(255) NOT NULL,
+  color         VARCHAR(255) NOT NULL,
+  price         DECIMAL_SCALE_2(9,2) NOT NULL,
+  weight_kg     DECIMAL_SCALE_5(9,5) NOT NULL,
+  condition_id  TINYINT(3) NOT NULL,
+  `description` TEXT NOT NULL
+);
+
+INSERT INTO bicycles VALUES (1,'Trek','Emonda',2017,'Hybrid','Unisex','black','1495.00','1.50000',5,''),
+                            (2,'Cannondale','Synapse',2016,'Road','Unisex','matte black','1999.00','1.00000',5,'');
+
+CREATE TABLE admins (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name       VARCHAR (255) NOT NULL,
+    last_name        VARCHAR (255) NOT NULL,
+    email            VARCHAR (255) NOT NULL,
+    username         VARCHAR (255) NOT NULL,
+    hashed_password  VARCHAR (255) NOT NULL
+);
+
+-- Adds an index to speed up searches.
+CREATE INDEX index_username ON admins (username);
@@ -0,0 +1,117 @@
+"""Measures how many objects per second ``find_all()`` creates.
+
+The records come from an in-memory SQLite database with the schema of
+``resources/sql/chain_gang_sqlite.sql``, so no MySQL server is needed. Three
+ways of creating the objects are compared:
+
+``constructor``
+    ``_fast_hydration = False``: ``Bicycle()`` plus ``setattr()`` per column.
+
+``plan``
+    ``_fast_hydration = True``: a ``HydrationPlan`` per set of columns.
+
+``slotted``
+    The plan, with the objects of ``Bicycle.slotted()``.
+
+Both the whole ``find_all()`` (query included) and ``_instantiate()`` alone
+(the records are fetched once) are timed.
+
+Usage (``db_credentials.py`` must exist in ``src/activerecord``)::
+
+    python scripts/benchmark_hydration.py [--rows 20000] [--repeat 5]
+
+"""
+
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import argparse
+import decimal
+import os
+import sys
+import time
+
+project_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root_dir, "src"))
+
+from activerecord import ConnectionDB, DatabaseObject, SQLiteBackend
+from appclasses import Bicycle
+
+
+def populate(rows):
+    """Inserts the bicycles of the benchmark.
+
+    Args:
+        rows (int): The number of bicycles.
+    """
+    bikes = [Bicycle(brand='Brand {n}'.format(n=n % 50),
+                     model='Model {n}'.format(n=n), year=2000 + n % 25,
+                     category='Road', gender='Unisex', color='black',
+                     price=decimal.Decimal(n % 3000), weight_kg=10,
+                     condition_id=n % 5 + 1,
+                     description='A bicycle for the benchmark.')
+             for n in range(rows)]
+    Bicycle.bulk_create(bikes)
+
+
+def best_rate(function, count, repeat):
+    """Runs a function several times and returns the best objects per second.
+
+    Args:
+        function (callable): Creates ``count`` objects.
+        count (int): The number of objects per run.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: Objects per second of the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+
+    schema = os.path.join(project_root_dir, "resources", "sql",
+                          "chain_gang_sqlite.sql")
+    DatabaseObject._database = ConnectionDB(
+        pool_size=0, backend=SQLiteBackend(':memory:', schema))
+    populate(arguments.rows)
+
+    count = Bicycle.count_all()
+    records = Bicycle._database.query(Bicycle._find_all_sql(),
+                                      row_format=Bicycle._row_format)
+    slotted = Bicycle.slotted()
+
+    cases = [
+        ('constructor', Bicycle, False),
+        ('plan', Bicycle, True),
+        ('slotted', slotted, True)
+    ]
+
+    print("{count} bicycles, best of {repeat} runs (objects/second)".format(
+        count=count, repeat=arguments.repeat))
+    print("{:<12} {:>14} {:>14}".format('', 'find_all()', '_instantiate()'))
+
+    for name, model, fast in cases:
+        model._fast_hydration = fast
+        find_all = best_rate(model.find_all, count, arguments.repeat)
+        instantiate = best_rate(
+            lambda: [model._instantiate(record) for record in records],
+            count, arguments.repeat)
+        print("{:<12} {:>14,.0f} {:>14,.0f}".format(name, find_all, instantiate))
+
+    Bicycle._fast_hydration = True
+
+
+if __name__ == '__main__':
+    main()
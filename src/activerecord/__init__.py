@@ -3,15 +3,79 @@
 This package implements the Active Record design pattern.
 
 Exports:
+    ``async_connection_db``
+
+    ``backends``
+
+    ``columnar``
+
     ``connection_db``
 
+    ``connection_pool``
+
     ``database_object``
 
+    ``errors``
+
+    ``explain``
+
+    ``hydration``
+
+    ``identity_map``
+
+    ``instrumentation``
+
+    ``query_batch``
+
+    ``query_cache``
+
+    ``query_set``
+
+    ``recording``
+
+    ``replicas``
+
+    ``row_formats``
+
+    ``statement_cache``
+
 """
 
+from . async_connection_db import *
+from . backends import *
+from . columnar import *
 from . connection_db import *
+from . connection_pool import *
 from . database_object import *
+from . errors import *
+from . explain import *
+from . hydration import *
+from . identity_map import *
+from . instrumentation import *
+from . query_batch import *
+from . query_cache import *
+from . query_set import *
+from . recording import *
+from . replicas import *
+from . row_formats import *
+from . statement_cache import *
 
 
-__all__ = (connection_db.__all__ +
-           database_object.__all__)
+__all__ = (async_connection_db.__all__ +
+           backends.__all__ +
+           columnar.__all__ +
+           connection_db.__all__ +
+           connection_pool.__all__ +
+           database_object.__all__ +
+           errors.__all__ +
+           explain.__all__ +
+           hydration.__all__ +
+           identity_map.__all__ +
+           instrumentation.__all__ +
+           query_batch.__all__ +
+           query_cache.__all__ +
+           query_set.__all__ +
+           recording.__all__ +
+           replicas.__all__ +
+           row_formats.__all__ +
+           statement_cache.__all__)
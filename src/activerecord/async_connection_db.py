@@ -0,0 +1,160 @@
+"""An asyncio counterpart of ``ConnectionDB``.
+
+``mysql.connector`` has no asyncio API, so the queries run in a bounded
+``ThreadPoolExecutor`` and are awaited with ``loop.run_in_executor()``. The
+event loop is never blocked, and as many queries run at the same time as there
+are connections in the pool of the wrapped ``ConnectionDB`` (or workers, if it
+is not pooled and every thread has a connection of its own).
+
+The queries run in the worker threads, so the state that belongs to the thread
+of the caller is not seen by them: its ``transaction()`` (use ``run()`` to
+await a whole transaction block) and its ``DatabaseObject.session()``, whose
+identity map is not used by the ``*_async`` finders.
+
+References:
+    `Executing code in thread or process pools`_
+
+.. _Executing code in thread or process pools:
+   https://docs.python.org/3.7/library/asyncio-eventloop.html#executing-code-in-thread-or-process-pools
+
+"""
+
+__all__ = ['AsyncConnectionDB']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+
+class AsyncConnectionDB(object):
+    """Runs the methods of a ``ConnectionDB`` in worker threads and makes them
+    awaitable.
+
+    Args:
+        database (ConnectionDB): The synchronous instance that executes the
+            queries.
+        max_workers (int, optional): Number of worker threads. Defaults to the
+            pool size of ``database``, or ``DEFAULT_MAX_WORKERS`` if it is not
+            pooled. Each worker of an instance that is not pooled opens a
+            connection of its own, which is closed when the executor shuts
+            down.
+
+    Example:
+        Running independent lookups concurrently::
+
+            async_database = AsyncConnectionDB(ConnectionDB(pool_size=8))
+
+            results = await asyncio.gather(*[
+                async_database.query(sql) for sql in list_of_selects])
+
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+    """int: Worker threads (and connections) of a ``ConnectionDB`` that is not
+    pooled."""
+
+    _instances_lock = threading.Lock()
+
+    def __init__(self, database, max_workers=None):
+        if max_workers is None:
+            if database.pool is None:
+                max_workers = self.DEFAULT_MAX_WORKERS
+            else:
+                max_workers = database.pool.size
+
+        self.database = database
+        self.max_workers = max_workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='AsyncConnectionDB')
+
+    @classmethod
+    def of(cls, database):
+        """Returns the ``AsyncConnectionDB`` shared by everyone that uses the
+        given ``ConnectionDB`` (creating it on the first call), so they all
+        respect the same number of workers.
+
+        Args:
+            database (ConnectionDB): The synchronous instance.
+
+        Returns:
+            AsyncConnectionDB: The shared asynchronous instance.
+        """
+        # An attribute of the database, not a WeakKeyDictionary: the instance
+        # refers to the database, so a dictionary value would keep its key
+        # alive forever.
+        with cls._instances_lock:
+            instance = getattr(database, '_async_database', None)
+            if instance is None:
+                instance = cls(database)
+                database._async_database = instance
+            return instance
+
+    async def run(self, function, *args, **kwargs):
+        """Runs any blocking function in a worker thread.
+
+        This is how a whole ``transaction()`` block can be awaited, since the
+        transaction belongs to the thread that runs it.
+
+        Args:
+            function (callable): The function to be called.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Any: The return value of the function.
+
+        Example:
+            How to call this method::
+
+                def reprice(bikes):
+                    with Bicycle.transaction():
+                        for bike in bikes:
+                            bike.price = bike.price * 2
+                            bike.save()
+
+                await async_database.run(reprice, bikes)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs))
+
+    async def query(self, sql, values=None, row_format='dict'):
+        """Awaitable ``ConnectionDB.query()``.
+
+        Args:
+            sql (str): The query to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            row_format (str, optional): ``'dict'``, ``'tuple'`` or
+                ``'namedtuple'``. Defaults to ``'dict'``.
+
+        Returns:
+            (list[dict] | list[tuple] | list[] | bool): The same as
+            ``ConnectionDB.query()``.
+        """
+        return await self.run(self.database.query, sql, values, row_format)
+
+    async def execute(self, sql, values=None, row_format='dict'):
+        """Awaitable ``ConnectionDB.execute()``. Unlike the ``affected_rows``
+        and ``insert_id`` attributes, which belong to the worker thread, the
+        metadata of the query is returned to the caller.
+
+        Args:
+            sql (str): The query to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            row_format (str, optional): ``'dict'``, ``'tuple'`` or
+                ``'namedtuple'``. Defaults to ``'dict'``.
+
+        Returns:
+            QueryResult: ``rows``, ``affected_rows`` and ``insert_id``.
+        """
+        return await self.run(self.database.execute, sql, values, row_format)
+
+    def close(self):
+        """Stops the worker threads after the running queries finish."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,692 @@
+"""Database engines that ``ConnectionDB`` can talk to.
+
+A backend knows how to open a connection, create cursors, execute a statement
+(translating the ``%s`` placeholders used by this package, if needed) and
+interpret the errors of its driver. Everything else (pooling, transactions,
+caches) lives in ``ConnectionDB`` and works the same for every backend.
+
+Two backends are provided:
+
+``MySQLBackend``
+    The MySQL server, through ``mysql.connector``. It is the default.
+
+``SQLiteBackend``
+    An embedded SQLite database in a local file or in memory, through the
+    ``sqlite3`` module of the standard library. It needs no server, so it can
+    be used in offline Scribus sessions and for benchmarks.
+
+The backend used by ``ConnectionDB()`` is chosen by ``DB_ENGINE`` in
+``db_credentials`` (see ``database_functions.db_backend()``).
+
+References:
+    `sqlite3 — DB-API 2.0 interface for SQLite databases`_
+
+    `In-Memory Databases And Shared Cache`_
+
+.. _sqlite3 — DB-API 2.0 interface for SQLite databases:
+   https://docs.python.org/3.7/library/sqlite3.html
+.. _In-Memory Databases And Shared Cache:
+   https://www.sqlite.org/inmemorydb.html
+
+"""
+
+__all__ = [
+    'DatabaseBackend',
+    'MySQLBackend',
+    'SQLiteBackend'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+from abc import ABC, abstractmethod
+import decimal
+import functools
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from . import database_functions
+
+# mysql.connector is only needed by MySQLBackend.
+try:
+    import mysql.connector
+    from mysql.connector import errorcode
+except ImportError:
+    mysql = None
+    errorcode = None
+
+
+class DatabaseBackend(ABC):
+    """Abstract superclass of the database engines.
+
+    Attributes:
+        name (str): A short name of the engine.
+        Error (type): The base exception class of the driver.
+        supports_prepared_statements (bool): If the connections create
+            ``cursor(prepared=True)`` for the ``StatementCache``.
+        max_placeholders (int): Maximum number of placeholders in a statement.
+        server_variables (dict): Values returned by
+            ``ConnectionDB.server_variable()`` without asking the server.
+        supports_multi_statements (bool): If ``execute_multi()`` sends all the
+            statements in one round trip.
+    """
+
+    name = None
+    Error = Exception
+    supports_prepared_statements = False
+    supports_multi_statements = False
+    max_placeholders = 999
+    server_variables = {}
+
+    @abstractmethod
+    def connect(self):
+        """Opens a new connection.
+
+        Returns:
+            Any: The DB-API connection of the driver.
+        """
+        pass
+
+    def close(self, connection):
+        """Closes a connection, ignoring errors of broken connections.
+
+        Args:
+            connection (Any): The connection to be closed.
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @abstractmethod
+    def is_connected(self, connection):
+        """Checks if the connection can still be used.
+
+        Args:
+            connection (Any): The connection to be checked.
+
+        Returns:
+            bool: True if it can. False otherwise.
+        """
+        pass
+
+    @abstractmethod
+    def cursor(self, connection, dictionary=True, buffered=True):
+        """Creates a cursor.
+
+        Args:
+            connection (Any): The connection.
+            dictionary (bool, optional): Rows are dictionaries (True) or tuples
+                (False). Defaults to True.
+            buffered (bool, optional): Fetches the whole result set when the
+                statement is executed (True) or as the rows are read (False).
+                Defaults to True.
+
+        Returns:
+            Any: The DB-API cursor.
+        """
+        pass
+
+    def execute(self, cursor, sql, values=None):
+        """Executes a statement written with ``%s`` placeholders.
+
+        Args:
+            cursor (Any): A cursor created by this backend.
+            sql (str): The statement.
+            values (tuple, optional): The values of the placeholders.
+                Defaults to None.
+        """
+        cursor.execute(sql, values)
+
+    def execute_multi(self, cursor, statements):
+        """Executes several statements written with ``%s`` placeholders and
+        reads all their results.
+
+        This implementation executes them one by one. Backends that support
+        it send them together (see ``supports_multi_statements``).
+
+        Args:
+            cursor (Any): A cursor created by this backend.
+            statements (list[tuple[str, tuple]]): The statements and the values
+                of their placeholders (or None).
+
+        Returns:
+            list[tuple]: Per statement, ``(rows, affected_rows, insert_id)``.
+            ``rows`` is the list of records, or None if the statement does not
+            produce a result set.
+        """
+        results = []
+        for sql, values in statements:
+            self.execute(cursor, sql, values)
+            if cursor.description is not None:
+                rows = cursor.fetchall()
+                results.append((rows, len(rows), 0))
+            else:
+                results.append((None, cursor.rowcount,
+                                self.insert_id(cursor, sql)))
+        return results
+
+    def insert_id(self, cursor, sql):
+        """Returns the id generated for the first row of the INSERT that was
+        just executed (0 if the statement was not an INSERT).
+
+        Args:
+            cursor (Any): The cursor that executed the statement.
+            sql (str): The statement.
+
+        Returns:
+            int: The id.
+        """
+        return cursor.lastrowid
+
+    def upsert_clause(self, conflict_keys, update_columns):
+        """Returns the clause that turns a multi-row INSERT into an upsert:
+        the rows that conflict with existing records update them instead.
+
+        This implementation is MySQL's ``ON DUPLICATE KEY UPDATE``, which
+        detects the conflict on any PRIMARY KEY or UNIQUE index of the table
+        (``conflict_keys`` is not part of the statement).
+
+        Args:
+            conflict_keys (list[str]): The columns whose unique index detects
+                the conflict.
+            update_columns (list[str]): The columns updated with the values of
+                the conflicting row.
+
+        Returns:
+            str: The clause, starting with a space.
+
+        References:
+            `13.2.6.2 INSERT ... ON DUPLICATE KEY UPDATE Statement`_
+
+        .. _13.2.6.2 INSERT ... ON DUPLICATE KEY UPDATE Statement:
+           https://dev.mysql.com/doc/refman/8.0/en/insert-on-duplicate.html
+        """
+        if not update_columns:
+            # Conflicting rows are kept as they are.
+            return " ON DUPLICATE KEY UPDATE id=id"
+        return " ON DUPLICATE KEY UPDATE " + ", ".join(
+            "{column}=VALUES({column})".format(column=column)
+            for column in update_columns)
+
+    def explain(self, connection, sql, values=None):
+        """Asks the engine for the execution plan of a statement.
+
+        Args:
+            connection (Any): The connection that runs the EXPLAIN.
+            sql (str): A SELECT, UPDATE or DELETE with ``%s`` placeholders.
+            values (tuple, optional): The values of the placeholders.
+                Defaults to None.
+
+        Returns:
+            tuple: ``(plan, problems)``. ``plan`` is what the engine returned,
+            made of JSON types (None if the engine cannot explain), and
+            ``problems`` is a list of str, like ``'full table scan on
+            bicycles'`` (see ``activerecord.explain``).
+        """
+        return None, []
+
+    def error_kind(self, err):
+        """Classifies an error of the driver.
+
+        Args:
+            err (Exception): An instance of ``Error``.
+
+        Returns:
+            (str | None): ``'deadlock'``, ``'lock_wait_timeout'``,
+            ``'connection_lost'``, ``'no_such_table'``, ``'bad_field'``,
+            ``'integrity'`` or None (see ``activerecord.errors``).
+        """
+        return None
+
+
+if errorcode is not None:
+    _MYSQL_ERROR_KINDS = {
+        errorcode.ER_LOCK_DEADLOCK: 'deadlock',
+        errorcode.ER_LOCK_WAIT_TIMEOUT: 'lock_wait_timeout',
+        errorcode.CR_SERVER_LOST: 'connection_lost',
+        errorcode.CR_SERVER_GONE_ERROR: 'connection_lost',
+        errorcode.CR_SERVER_LOST_EXTENDED: 'connection_lost',
+        errorcode.ER_NO_SUCH_TABLE: 'no_such_table',
+        errorcode.ER_BAD_FIELD_ERROR: 'bad_field',
+        errorcode.ER_DUP_ENTRY: 'integrity',
+        errorcode.ER_BAD_NULL_ERROR: 'integrity',
+        errorcode.ER_NO_REFERENCED_ROW_2: 'integrity',
+        errorcode.ER_ROW_IS_REFERENCED_2: 'integrity'
+    }
+else:
+    _MYSQL_ERROR_KINDS = {}
+
+
+class MySQLBackend(DatabaseBackend):
+    """The MySQL server, through ``mysql.connector``.
+
+    Args:
+        host (str, optional): Defaults to ``DB_SERVER``.
+        user (str, optional): Defaults to ``DB_USER``.
+        password (str, optional): Defaults to ``DB_PASS``.
+        database (str, optional): Defaults to ``DB_NAME``.
+    """
+
+    name = 'mysql'
+    supports_prepared_statements = True
+    supports_multi_statements = True
+    max_placeholders = 65535
+
+    def __init__(self, host=None, user=None, password=None, database=None):
+        if mysql is None:
+            raise ImportError(
+                "MySQLBackend needs mysql-connector-python to be installed.")
+
+        self.Error = mysql.connector.Error
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def connect(self):
+        # There is error checking inside the db_connect() function.
+        return database_functions.db_connect(host=self.host, user=self.user,
+                                             password=self.password,
+                                             database=self.database)
+
+    def is_connected(self, connection):
+        # Pings the server.
+        return connection.is_connected()
+
+    def cursor(self, connection, dictionary=True, buffered=True):
+        return connection.cursor(dictionary=dictionary, buffered=buffered)
+
+    def execute_multi(self, cursor, statements):
+        # https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursor-execute.html
+        # One COM_QUERY with the statements separated by semicolons. The values
+        # of all of them are interpolated together, so the % of the statements
+        # without values must be escaped.
+        params = []
+        for _, values in statements:
+            if values:
+                params.extend(values)
+
+        parts = []
+        for sql, values in statements:
+            sql = sql.strip().rstrip(';')
+            if params and not values:
+                sql = sql.replace('%', '%%')
+            parts.append(sql)
+
+        results = []
+        for result in cursor.execute(";\n".join(parts), tuple(params) or None,
+                                     multi=True):
+            if result.with_rows:
+                rows = result.fetchall()
+                results.append((rows, len(rows), 0))
+            else:
+                results.append((None, result.rowcount, result.lastrowid or 0))
+        return results
+
+    def explain(self, connection, sql, values=None):
+        # https://dev.mysql.com/doc/refman/8.0/en/explain-output.html
+        cursor = self.cursor(connection, dictionary=False)
+        try:
+            self.execute(cursor, "EXPLAIN FORMAT=JSON " + sql, values)
+            plan = json.loads(cursor.fetchall()[0][0])
+        finally:
+            cursor.close()
+        return plan, _mysql_plan_problems(plan)
+
+    def error_kind(self, err):
+        # err.errno means the error code (number).
+        kind = _MYSQL_ERROR_KINDS.get(err.errno)
+        if kind is None and isinstance(err, mysql.connector.IntegrityError):
+            kind = 'integrity'
+        if kind is None and 'Connection not available' in str(err):
+            # Raised by cursor() when the connection was closed.
+            kind = 'connection_lost'
+        return kind
+
+
+def _mysql_plan_nodes(node):
+    """Yields every dictionary of a JSON plan, depth first."""
+    if isinstance(node, dict):
+        yield node
+        node = list(node.values())
+    if isinstance(node, list):
+        for child in node:
+            for descendant in _mysql_plan_nodes(child):
+                yield descendant
+
+
+def _mysql_plan_problems(plan):
+    """Finds the problems of an ``EXPLAIN FORMAT=JSON`` plan.
+
+    Args:
+        plan (dict): The plan.
+
+    Returns:
+        list[str]: The problems, in the order of the plan.
+    """
+    problems = []
+    for node in _mysql_plan_nodes(plan):
+        if node.get('using_filesort'):
+            problems.append('filesort')
+        if node.get('using_temporary_table'):
+            problems.append('temporary table')
+
+        table = node.get('table_name')
+        access_type = node.get('access_type')
+        if table is None or access_type is None:
+            continue
+
+        if access_type == 'ALL':
+            problems.append('full table scan on {table}'.format(table=table))
+        elif access_type == 'index':
+            problems.append('full index scan on {table}'.format(table=table))
+
+        condition = node.get('attached_condition')
+        if access_type in ('ALL', 'index') and condition:
+            if node.get('possible_keys'):
+                problems.append('index not used on {table} for: {condition}'.format(
+                    table=table, condition=condition))
+            else:
+                problems.append('no index on {table} for: {condition}'.format(
+                    table=table, condition=condition))
+    return problems
+
+
+# Quoted strings and identifiers are kept as they are. Outside of them, %s is
+# a placeholder.
+_PLACEHOLDER_PATTERN = re.compile(
+    r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`)|(%s)""")
+
+
+@functools.lru_cache(maxsize=256)
+def _qmark_sql(sql):
+    """Translates ``%s`` placeholders to the ``?`` placeholders of sqlite3.
+
+    Args:
+        sql (str): The statement with ``%s`` placeholders.
+
+    Returns:
+        str: The statement with ``?`` placeholders.
+    """
+
+    def replace(match):
+        if match.group(2):
+            return '?'
+        return match.group(1)
+
+    return _PLACEHOLDER_PATTERN.sub(replace, sql)
+
+
+def _dictionary_row(cursor, row):
+    """``row_factory`` that creates a dictionary per row, like
+    ``MySQLCursorDict``."""
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+_INSERT_PATTERN = re.compile(r"^\s*(?:INSERT|REPLACE)\b", re.IGNORECASE)
+_RETURNING_PATTERN = re.compile(r"\bRETURNING\b", re.IGNORECASE)
+# https://www.sqlite.org/lang_returning.html
+_SQLITE_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class _SQLiteCursor(sqlite3.Cursor):
+    """A cursor that keeps the rowids of the rows its INSERTs created.
+
+    ``SQLiteBackend.execute()`` adds ``RETURNING rowid`` to the INSERTs and
+    reads the ids, so the statement still looks like a write (without a result
+    set) to ``ConnectionDB``.
+    """
+
+    inserted_ids = None
+
+    @property
+    def description(self):
+        if self.inserted_ids is not None:
+            return None
+        return super().description
+
+
+_SQLITE_SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+
+def _sqlite_plan_problems(details, sql):
+    """Finds the problems of an ``EXPLAIN QUERY PLAN`` plan.
+
+    Args:
+        details (list[str]): The ``detail`` column of the plan.
+        sql (str): The statement (a scan only misses an index if it has a
+            WHERE clause).
+
+    Returns:
+        list[str]: The problems, in the order of the plan.
+    """
+    has_where = re.search(r"\bWHERE\b", sql, re.IGNORECASE) is not None
+    problems = []
+    for detail in details:
+        match = _SQLITE_SCAN_PATTERN.match(detail)
+        if match is not None:
+            table, rest = match.groups()
+            if 'INDEX' in rest:
+                problems.append('full index scan on {table}'.format(table=table))
+            else:
+                problems.append('full table scan on {table}'.format(table=table))
+                if has_where:
+                    problems.append('no index on {table} for the WHERE clause'.format(
+                        table=table))
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append('temporary b-tree for {what}'.format(
+                what=detail[len('USE TEMP B-TREE FOR '):].lower()))
+    return problems
+
+
+def _decimal_converter(scale):
+    """Returns the converter of the ``DECIMAL_SCALE_<scale>`` columns."""
+    exponent = decimal.Decimal(1).scaleb(-scale)
+    return lambda value: decimal.Decimal(value.decode()).quantize(exponent)
+
+
+# DECIMAL columns come back as decimal.Decimal, as they do from MySQL. They have
+# NUMERIC affinity, so they are compared and sorted as numbers, but SQLite
+# stores them as INTEGER or REAL: '1000.00' is read back as 1000. Declared as
+# DECIMAL_SCALE_<n>(p,n) (see chain_gang_sqlite.sql), they are quantized to n
+# places again. REAL keeps 15 significant digits, enough for DECIMAL(15,n).
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_converter('DECIMAL', lambda value: decimal.Decimal(value.decode()))
+for _scale in range(31):
+    sqlite3.register_converter('DECIMAL_SCALE_{scale}'.format(scale=_scale),
+                               _decimal_converter(_scale))
+del _scale
+
+
+class SQLiteBackend(DatabaseBackend):
+    """An embedded SQLite database.
+
+    The ``query()`` contract of ``ConnectionDB`` is kept: ``%s`` placeholders
+    are translated to ``?``, rows are dictionaries, ``affected_rows`` is the
+    ``rowcount`` and ``insert_id`` is the id of the first inserted row.
+
+    Args:
+        path (str, optional): The database file, or ``':memory:'``. Every
+            connection of one backend instance sees the same in-memory
+            database (a shared cache, kept alive while the backend exists).
+            Defaults to ``':memory:'``.
+        schema (str, optional): Path to a SQL script executed when the database
+            is created (always, for in-memory databases; only if the file does
+            not exist, otherwise). Defaults to None.
+        timeout (float, optional): Seconds to wait for a lock held by another
+            connection. Defaults to 5.0.
+
+    Warning:
+        The connections to an in-memory database use ``PRAGMA read_uncommitted``:
+        the table locks of a shared cache are not waited for (the ``timeout``
+        does not apply to them), so without it concurrent threads fail with
+        "database table is locked". The price is dirty reads: a SELECT sees
+        the uncommitted writes of the transactions of other threads. Databases
+        in a file keep the committed reads of SQLite.
+
+    Example:
+        Using the bicycles and admins tables without a MySQL server::
+
+            schema = os.path.join(project_root_dir, "resources", "sql",
+                                  "chain_gang_sqlite.sql")
+            database = ConnectionDB(backend=SQLiteBackend(':memory:', schema))
+
+            # Or, in db_credentials.py:
+            DB_ENGINE = 'sqlite'
+            DB_PATH = ':memory:'
+            DB_SCHEMA = '<project_root>/resources/sql/chain_gang_sqlite.sql'
+    """
+
+    name = 'sqlite'
+    Error = sqlite3.Error
+    # SQLITE_MAX_VARIABLE_NUMBER of the versions before 3.32.0.
+    max_placeholders = 999
+    server_variables = {
+        # SQLITE_MAX_LENGTH (the limit of a statement and of a value).
+        'max_allowed_packet': 1000000000,
+        'auto_increment_increment': 1
+    }
+
+    _memory_counter = itertools.count(1)
+
+    def __init__(self, path=':memory:', schema=None, timeout=5.0):
+        self.path = path
+        self.schema = schema
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._memory = path == ':memory:'
+        self._anchor = None
+
+        if self._memory:
+            self._uri = "file:activerecord_memory_{number}?mode=memory&cache=shared".format(
+                number=next(self._memory_counter))
+        else:
+            self._uri = None
+
+    def connect(self):
+        with self._lock:
+            if self._memory:
+                create = self._anchor is None
+            else:
+                create = not os.path.exists(self.path)
+
+            connection = self._open()
+
+            if self._memory and self._anchor is None:
+                # The in-memory database lives while a connection is open.
+                self._anchor = self._open()
+
+            if create and self.schema:
+                with open(self.schema) as schema_file:
+                    connection.executescript(schema_file.read())
+                connection.commit()
+
+        return connection
+
+    def _open(self):
+        if self._memory:
+            connection = sqlite3.connect(self._uri, uri=True,
+                                         timeout=self.timeout,
+                                         check_same_thread=False,
+                                         detect_types=sqlite3.PARSE_DECLTYPES)
+            # Readers do not wait for the table locks of the shared cache,
+            # which ignore the timeout (see the Warning of the class).
+            connection.execute("PRAGMA read_uncommitted = true")
+        else:
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         check_same_thread=False,
+                                         detect_types=sqlite3.PARSE_DECLTYPES)
+        return connection
+
+    def is_connected(self, connection):
+        try:
+            connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def cursor(self, connection, dictionary=True, buffered=True):
+        # sqlite3 reads the rows as they are fetched; buffered does not apply.
+        cursor = connection.cursor(_SQLiteCursor)
+        if dictionary:
+            cursor.row_factory = _dictionary_row
+        return cursor
+
+    def execute(self, cursor, sql, values=None):
+        returning = (_SQLITE_RETURNING and
+                     isinstance(cursor, _SQLiteCursor) and
+                     _INSERT_PATTERN.match(sql) is not None and
+                     _RETURNING_PATTERN.search(sql) is None)
+        if returning:
+            # The rowids of a multi-row INSERT are not always consecutive
+            # (explicit ids, rows skipped by ON CONFLICT), so they are read
+            # instead of being counted back from lastrowid.
+            sql += " RETURNING rowid"
+
+        cursor.inserted_ids = None
+        if values is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(_qmark_sql(sql), values)
+
+        if returning:
+            # The column is named after the INTEGER PRIMARY KEY, if any.
+            ids = [next(iter(row.values())) if isinstance(row, dict) else row[0]
+                   for row in cursor.fetchall()]
+            cursor.inserted_ids = ids
+
+    def insert_id(self, cursor, sql):
+        if getattr(cursor, 'inserted_ids', None) is not None:
+            return cursor.inserted_ids[0] if cursor.inserted_ids else 0
+        # SQLite before 3.35.0: lastrowid is the id of the last row inserted,
+        # so the first one is counted back from it.
+        if cursor.rowcount > 0 and _INSERT_PATTERN.match(sql) is not None:
+            return cursor.lastrowid - cursor.rowcount + 1
+        return 0
+
+    def upsert_clause(self, conflict_keys, update_columns):
+        # https://www.sqlite.org/lang_upsert.html (SQLite 3.24.0 or later).
+        # The conflict keys must be the PRIMARY KEY or have a UNIQUE index.
+        sql = " ON CONFLICT (" + ", ".join(conflict_keys) + ")"
+        if not update_columns:
+            return sql + " DO NOTHING"
+        return sql + " DO UPDATE SET " + ", ".join(
+            "{column}=excluded.{column}".format(column=column)
+            for column in update_columns)
+
+    def explain(self, connection, sql, values=None):
+        # https://www.sqlite.org/eqp.html
+        cursor = self.cursor(connection, dictionary=False)
+        try:
+            self.execute(cursor, "EXPLAIN QUERY PLAN " + sql, values)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        # (id, parent, notused, detail): the details, indented by depth.
+        depths = {0: -1}
+        plan = []
+        for node_id, parent, _, detail in rows:
+            depths[node_id] = depths.get(parent, -1) + 1
+            plan.append("  " * depths[node_id] + detail)
+        return plan, _sqlite_plan_problems([row[3] for row in rows], sql)
+
+    def error_kind(self, err):
+        message = str(err)
+        if isinstance(err, sqlite3.IntegrityError):
+            return 'integrity'
+        if message.startswith('no such table'):
+            return 'no_such_table'
+        if message.startswith('no such column') or 'has no column named' in message:
+            return 'bad_field'
+        if 'closed database' in message:
+            return 'connection_lost'
+        if 'is locked' in message:
+            # SQLITE_BUSY and SQLITE_LOCKED: the busy timeout ran out.
+            return 'lock_wait_timeout'
+        return None
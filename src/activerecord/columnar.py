@@ -0,0 +1,152 @@
+"""Result sets as NumPy arrays, one per column.
+
+A list of dictionaries repeats the column names in every row and keeps every
+value as a Python object. ``to_columns()`` turns the rows into one NumPy array
+per column (or a structured array), so reports can be computed with vectorized
+operations::
+
+    columns = database.query_columns(
+        "SELECT price, weight_kg, year FROM bicycles")
+
+    average_price = columns['price'].mean()
+    price_per_kg = columns['price'] / columns['weight_kg']
+
+The dtype of a column is chosen from its values:
+
+==============================  =======================================
+Values                          dtype
+==============================  =======================================
+``int`` (no NULL)               ``int64``
+``int`` with NULL, ``float``,   ``float64`` (NULL becomes NaN)
+``decimal.Decimal``
+``bool``                        ``bool`` (``object`` with NULL)
+``datetime.datetime``           ``datetime64[us]`` (NULL becomes NaT)
+``datetime.date``               ``datetime64[D]`` (NULL becomes NaT)
+anything else (``str``, ...)    ``object``
+==============================  =======================================
+
+A ``decimal(9,2)`` or ``decimal(9,5)`` has at most 9 significant digits, so it
+fits a ``float64`` (15 digits) without changing the value that is printed.
+Other dtypes can be forced per column.
+
+Note:
+    NumPy is optional. Without it, everything else in ``activerecord`` works
+    and ``to_columns()`` raises ``ImportError``.
+
+References:
+    `Structured arrays`_
+
+.. _Structured arrays:
+   https://numpy.org/doc/stable/user/basics.rec.html
+
+"""
+
+__all__ = ['to_columns']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import datetime
+import decimal
+
+# NumPy is only needed by the columnar results.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _infer_dtype(column):
+    """Chooses the dtype of a column from its values.
+
+    Args:
+        column (tuple): The values of the column.
+
+    Returns:
+        str: The NumPy dtype.
+    """
+    kinds = set(type(value) for value in column if value is not None)
+    has_null = any(value is None for value in column)
+
+    if not kinds:
+        return 'object'
+    if kinds == {bool}:
+        return 'object' if has_null else 'bool'
+    if kinds == {int}:
+        return 'float64' if has_null else 'int64'
+    if kinds <= {int, float, decimal.Decimal}:
+        return 'float64'
+    if kinds == {datetime.datetime}:
+        return 'datetime64[us]'
+    if kinds == {datetime.date}:
+        return 'datetime64[D]'
+    return 'object'
+
+
+def _as_array(column, dtype):
+    """Creates the array of a column, replacing NULL by NaN or NaT.
+
+    Args:
+        column (tuple): The values of the column.
+        dtype (str | numpy.dtype): The dtype of the array.
+
+    Returns:
+        numpy.ndarray: The array.
+    """
+    dtype = numpy.dtype(dtype)
+    if dtype.kind == 'f':
+        column = [numpy.nan if value is None else value for value in column]
+    elif dtype.kind == 'M':
+        column = [numpy.datetime64('NaT') if value is None else value
+                  for value in column]
+    elif dtype.kind == 'O':
+        array = numpy.empty(len(column), dtype=object)
+        array[:] = column
+        return array
+    return numpy.array(column, dtype=dtype)
+
+
+def to_columns(names, rows, dtypes=None, structured=False):
+    """Turns rows (tuples) into NumPy arrays, one per column.
+
+    Args:
+        names (list[str]): The column names, in the order of the values of the
+            rows.
+        rows (list[tuple]): The records.
+        dtypes (dict, optional): The dtype of some columns, by name (for
+            example, ``{'price': 'float32'}``). The others are inferred from
+            their values. Defaults to None.
+        structured (bool, optional): Returns one structured array, with a field
+            per column, instead of a dictionary of arrays. Defaults to False.
+
+    Returns:
+        (dict[str, numpy.ndarray] | numpy.ndarray): The arrays by column name,
+        in the order of the query, or the structured array.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+    if numpy is None:
+        raise ImportError("Columnar results need numpy to be installed.")
+
+    dtypes = dtypes or {}
+    if rows:
+        values = list(zip(*rows))
+    else:
+        values = [()] * len(names)
+
+    columns = {}
+    for name, column in zip(names, values):
+        dtype = dtypes.get(name)
+        if dtype is None:
+            dtype = _infer_dtype(column)
+        columns[name] = _as_array(column, dtype)
+
+    if not structured:
+        return columns
+
+    array = numpy.empty(len(rows), dtype=[(name, columns[name].dtype)
+                                          for name in names])
+    for name in names:
+        array[name] = columns[name]
+    return array
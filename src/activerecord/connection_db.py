@@ -1,13 +1,90 @@
-__all__ = ['ConnectionDB']
+__all__ = [
+    'ConnectionDB',
+    'QueryResult'
+]
 __copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
 __author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
 __link__ = "https://www.leonardopinheiro.net"
 
+import collections
+import contextlib
+import os
+import threading
+import time
+import weakref
+
 import shared
 from . import database_functions
+from . columnar import to_columns
+from . errors import (ConnectionLostError, DeadlockError, QueryError,
+                      RetryPolicy, translate_error)
+from . connection_pool import ConnectionPool
+from . explain import ExplainCapture
+from . instrumentation import QueryInstrumentation, estimate_bytes
+from . query_cache import QueryCache, is_read, table_written
+from . replicas import ReplicaSet
+from . row_formats import check_row_format, format_rows
+from . statement_cache import StatementCache
+
+
+_INHERITED = []
+"""list: Objects holding connections opened by the parent process before a
+``os.fork()``. They share their sockets with the parent, so they are kept
+referenced and never closed (closing them would end the sessions of the
+parent)."""
+
+
+def _close_connection(backend, connection, pid):
+    """Closes the connection of a thread that ended, unless it was inherited
+    from the parent process."""
+    if os.getpid() == pid:
+        backend.close(connection)
+    else:
+        _INHERITED.append(connection)
+
+
+class _ThreadConnection(object):
+    """Holds the connection of one thread (when ``ConnectionDB`` is not
+    pooled). It is closed when the thread ends and its thread-local storage is
+    freed."""
+
+    def __init__(self, backend, connection):
+        self.connection = connection
+        self.close = weakref.finalize(self, _close_connection, backend,
+                                      connection, os.getpid())
+
+
+class QueryResult(collections.namedtuple(
+        'QueryResult', ['rows', 'affected_rows', 'insert_id'])):
+    """What ``ConnectionDB.execute()`` returns: the result of one query and its
+    metadata, instead of the ``affected_rows`` and ``insert_id`` attributes of
+    the instance.
+
+    Attributes:
+        rows (list[dict] | list[tuple] | bool): The same as
+            ``ConnectionDB.query()`` returns.
+        affected_rows (int): Rows changed (or returned) by the query.
+        insert_id (int): The AUTO_INCREMENT id generated for the first row of
+            an INSERT (0 for other statements).
+    """
+
+    __slots__ = ()
+
+
+class _Transaction(object):
+    """The state of the transaction of one thread (see
+    ``ConnectionDB.transaction()``)."""
+
+    def __init__(self, connection, autocommit_every=None):
+        self.connection = connection
+        self.autocommit_every = autocommit_every
+        self.savepoints = []
+        self.savepoint_counter = 0
+        self.pending = 0
+        # Tables written, invalidated again in the query cache when the
+        # transaction ends (None means all of them).
+        self.tables_written = set()
 
-import mysql.connector
-from mysql.connector import errorcode
 
 class ConnectionDB(object):
     """Mimics (loosely and in a very crud way) the mysqli (PHP) class.
@@ -42,35 +119,756 @@ class ConnectionDB(object):
     .. _3.7.4. Admonitions:
        https://sphinx-rtd-theme.readthedocs.io/en/stable/demo/demo.html#admonitions
 
+    The SQL itself is sent to a backend (see ``activerecord.backends``): the
+    MySQL server by default, or an embedded SQLite database.
+
+    Args:
+        pool_size (int, optional): Number of pooled connections. When it is
+            greater than zero, every query borrows a connection from a
+            ``ConnectionPool`` and several threads can query at the same time.
+            0 uses a single connection. Defaults to the ``DB_POOL_SIZE``
+            setting in ``db_credentials`` (0 if it is missing).
+        statement_cache_size (int, optional): Number of server-side prepared
+            statements kept per connection for the statements that have values
+            (INSERT, UPDATE and DELETE). 0 disables the cache. Defaults to the
+            ``DB_STATEMENT_CACHE_SIZE`` setting (32 if it is missing). Only
+            used by backends with server-side prepared statements (MySQL).
+        backend (DatabaseBackend, optional): The database engine. Defaults to
+            the one chosen by ``DB_ENGINE`` (see
+            ``database_functions.db_backend()``).
+        instrumentation (QueryInstrumentation, optional): Times every query
+            (see ``activerecord.instrumentation``). It can also be set later
+            through the ``instrumentation`` attribute. Defaults to one created
+            from ``DB_SLOW_QUERY_THRESHOLD`` and ``DB_SLOW_QUERY_LOG`` if
+            ``DB_INSTRUMENTATION`` is True, otherwise None (no overhead).
+        query_cache (QueryCache, optional): Caches the results of SELECT
+            queries, invalidated by the writes to their tables (see
+            ``activerecord.query_cache``). It can also be set later through the
+            ``query_cache`` attribute. Defaults to one with
+            ``DB_QUERY_CACHE_SIZE`` entries and ``DB_QUERY_CACHE_TTL`` if that
+            size is greater than zero, otherwise None. The results read from
+            replicas are not cached (they can be behind the primary).
+        replicas (ReplicaSet, optional): Read replicas. The SELECTs executed
+            outside transactions go to them and everything else goes to the
+            primary (``backend``). Defaults to the ``DB_REPLICAS`` setting (no
+            replicas if it is empty).
+        read_your_writes (float, optional): Seconds after a write during which
+            the reads of the same thread stay on the primary, so they see the
+            write even if the replicas lag behind. Defaults to the
+            ``DB_READ_YOUR_WRITES`` setting (2.0 if it is missing).
+        retry_policy (RetryPolicy, optional): Tries again the statements that
+            fail with a transient error (see ``activerecord.errors``). It can
+            also be set later through the ``retry_policy`` attribute. Defaults
+            to one created from ``DB_RETRY_ATTEMPTS``, ``DB_RETRY_BASE_DELAY``
+            and ``DB_RETRY_MAX_DELAY`` (3 attempts if they are missing).
+        explain (ExplainCapture, optional): Explains the slow queries (see
+            ``activerecord.explain``). It is attached to this instance, which
+            gets an ``instrumentation`` if it has none. Defaults to one created
+            from ``DB_EXPLAIN_THRESHOLD`` if that setting is not None,
+            otherwise None.
+
+    Note:
+        Creating an instance does not connect to the database. The connection is
+        opened by the first query (or in the background by ``warm_up()``), so
+        importing ``activerecord`` costs no network round trip. If
+        ``DB_WARM_UP`` is True in ``db_credentials``, ``warm_up()`` is started
+        by the constructor.
+
+        When it is not pooled, every thread gets a connection of its own, so an
+        instance (like ``DatabaseObject._database``) can be shared by a thread
+        pool. In a child process created by ``os.fork()`` (``multiprocessing``
+        on Linux), the connections of the parent are left alone and new ones
+        are opened.
+
+    Example:
+        Pooled mode, used from several threads::
+
+            database = ConnectionDB(pool_size=4)
+
+            with concurrent.futures.ThreadPoolExecutor(4) as executor:
+                executor.map(database.query, list_of_selects)
+
+            print(database.pool_statistics())
+
     """
 
-    affected_rows = 0
-    insert_id = 0
+    def __init__(self, pool_size=None, statement_cache_size=None, backend=None,
+                 instrumentation=None, query_cache=None, replicas=None,
+                 read_your_writes=None, retry_policy=None, explain=None):
+        if pool_size is None:
+            pool_size = database_functions.db_setting('DB_POOL_SIZE', 0)
+        if statement_cache_size is None:
+            statement_cache_size = database_functions.db_setting(
+                'DB_STATEMENT_CACHE_SIZE', 32)
+
+        if backend is None:
+            backend = database_functions.db_backend()
+        self.backend = backend
+
+        if (instrumentation is None and
+                database_functions.db_setting('DB_INSTRUMENTATION', False)):
+            instrumentation = QueryInstrumentation(
+                slow_query_threshold=database_functions.db_setting(
+                    'DB_SLOW_QUERY_THRESHOLD'),
+                slow_query_log=database_functions.db_setting('DB_SLOW_QUERY_LOG'),
+                log_values=database_functions.db_setting(
+                    'DB_SLOW_QUERY_LOG_VALUES', False))
+        self.instrumentation = instrumentation
+
+        if query_cache is None:
+            cache_size = database_functions.db_setting('DB_QUERY_CACHE_SIZE', 0)
+            if cache_size:
+                query_cache = QueryCache(
+                    max_entries=cache_size,
+                    ttl=database_functions.db_setting('DB_QUERY_CACHE_TTL'))
+        self.query_cache = query_cache
+
+        # affected_rows, insert_id, the transaction and (if not pooled) the
+        # connection belong to the thread.
+        self._local = threading.local()
+
+        self.pool = None
+        # A connection opened by warm_up(), taken by the first thread that
+        # needs one.
+        self._spare = None
+        self._connect_lock = threading.Lock()
+
+        # The process that opened the connections (see _check_fork()).
+        self._pid = os.getpid()
+
+        # Server variables read by server_variable(), by name.
+        self._server_variables = {}
+
+        # The AsyncConnectionDB shared through AsyncConnectionDB.of(). It is
+        # kept here, so it lives (and dies) with this instance.
+        self._async_database = None
+
+        # One StatementCache per connection. The entries go away with the
+        # connections (prepared statements die with the session).
+        self.statement_cache_size = statement_cache_size
+        self._statement_caches = weakref.WeakKeyDictionary()
+        self._statement_counters = collections.Counter()
+        self._statement_lock = threading.Lock()
+
+        if pool_size:
+            self.pool = ConnectionPool(
+                self.backend.connect,
+                ping=self.backend.is_connected,
+                size=pool_size,
+                timeout=database_functions.db_setting('DB_POOL_TIMEOUT', 30.0),
+                pre_ping=database_functions.db_setting('DB_POOL_PRE_PING', True),
+                recycle=database_functions.db_setting('DB_POOL_RECYCLE', 3600))
+
+        if replicas is None:
+            replica_backends = database_functions.db_replica_backends()
+            if replica_backends:
+                replicas = ReplicaSet(
+                    replica_backends,
+                    selection=database_functions.db_setting(
+                        'DB_REPLICA_SELECTION', 'round_robin'),
+                    pool_size=max(pool_size, 1),
+                    retry_after=database_functions.db_setting(
+                        'DB_REPLICA_RETRY_AFTER', 30.0),
+                    timeout=database_functions.db_setting('DB_POOL_TIMEOUT', 30.0),
+                    pre_ping=database_functions.db_setting('DB_POOL_PRE_PING', True),
+                    recycle=database_functions.db_setting('DB_POOL_RECYCLE', 3600))
+        self.replicas = replicas
+
+        if read_your_writes is None:
+            read_your_writes = database_functions.db_setting(
+                'DB_READ_YOUR_WRITES', 2.0)
+        self.read_your_writes = read_your_writes
+
+        if retry_policy is None:
+            retry_policy = RetryPolicy(
+                attempts=database_functions.db_setting('DB_RETRY_ATTEMPTS', 3),
+                base_delay=database_functions.db_setting(
+                    'DB_RETRY_BASE_DELAY', 0.05),
+                max_delay=database_functions.db_setting('DB_RETRY_MAX_DELAY', 1.0))
+        self.retry_policy = retry_policy
+
+        if explain is None:
+            explain_threshold = database_functions.db_setting(
+                'DB_EXPLAIN_THRESHOLD')
+            if explain_threshold is not None:
+                explain = ExplainCapture(explain_threshold)
+        if explain is not None:
+            explain.attach(self)
+        self.explain = explain
+
+        if database_functions.db_setting('DB_WARM_UP', False):
+            self.warm_up()
+
+    @property
+    def connection_db(self):
+        """MySQLConnection: The connection of the current thread, used when this
+        instance is not pooled (None if it is). It is opened on first access
+        and closed when the thread ends. With another backend, it is the
+        connection of that backend's driver.
+        """
+        if self.pool is not None:
+            return None
+
+        self._check_fork()
+        holder = getattr(self._local, 'connection', None)
+        if holder is None:
+            # A warm_up() that is connecting holds the lock, so this waits for
+            # its connection instead of opening another one.
+            with self._connect_lock:
+                connection, self._spare = self._spare, None
+            if connection is None:
+                # There is error checking inside the db_connect() function.
+                connection = self.backend.connect()
+            holder = _ThreadConnection(self.backend, connection)
+            self._local.connection = holder
+        return holder.connection
+
+    @connection_db.setter
+    def connection_db(self, connection):
+        if connection is None:
+            self._local.connection = None
+        else:
+            self._local.connection = _ThreadConnection(self.backend, connection)
+
+    def _check_fork(self):
+        """Forgets the connections and the thread state inherited from the
+        parent process, if this is a child created by ``os.fork()``. New
+        connections are opened on demand.
+
+        Note:
+            The inherited connections share their sockets with the parent, so
+            they are never used or closed, only kept referenced (see
+            ``ConnectionPool.after_fork()``).
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+
+        # The locks may have been held by threads that do not exist here.
+        self._connect_lock = threading.Lock()
+        self._statement_lock = threading.Lock()
+
+        _INHERITED.append((self._local, self._spare, self._statement_caches))
+        self._local = threading.local()
+        self._spare = None
+        self._statement_caches = weakref.WeakKeyDictionary()
+
+        if self.pool is not None:
+            self.pool.after_fork()
+        if self.replicas is not None:
+            self.replicas.after_fork()
+
+    def warm_up(self, connections=None):
+        """Starts connecting to the database in a background (daemon) thread
+        and returns immediately.
+
+        A query that arrives while the connection is being opened waits for it
+        instead of opening another one.
+
+        Args:
+            connections (int, optional): Connections to open when pooled.
+                Defaults to the pool size. Ignored if not pooled.
+
+        Returns:
+            threading.Thread: The started thread (it can be joined).
+
+        Example:
+            Starting the connection while Scribus builds the document::
+
+                from activerecord import DatabaseObject
+
+                DatabaseObject.warm_up()
+                # ... work that does not need the database ...
+                bicycles = Bicycle.find_all()
+        """
+        thread = threading.Thread(target=self._warm_up, args=(connections,),
+                                  name='ConnectionDB-warm-up')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _warm_up(self, connections):
+        try:
+            if self.pool is None:
+                with self._connect_lock:
+                    if self._spare is None:
+                        self._spare = self.backend.connect()
+            else:
+                self.pool.warm_up(connections)
+        except Exception:
+            # db_connect() already printed the error. The next query tries to
+            # connect again and raises it to the caller.
+            pass
+
+    @property
+    def affected_rows(self):
+        """int: Rows changed (or returned) by the last query of this thread."""
+        return getattr(self._local, 'affected_rows', 0)
+
+    @affected_rows.setter
+    def affected_rows(self, value):
+        self._local.affected_rows = value
+
+    @property
+    def insert_id(self):
+        """int: The AUTO_INCREMENT id generated by the last INSERT of this
+        thread."""
+        return getattr(self._local, 'insert_id', 0)
+
+    @insert_id.setter
+    def insert_id(self, value):
+        self._local.insert_id = value
+
+    @contextlib.contextmanager
+    def _connection(self, read=False):
+        """Lends the connection used by a query: the connection of the thread
+        or one checked out from the pool (given back when the block ends).
+
+        Inside ``transaction()``, it is always the connection of the
+        transaction.
+
+        Args:
+            read (bool, optional): The query only reads, so it can go to a
+                replica (see ``_checkout_replica()``). Defaults to False.
+
+        Yields:
+            MySQLConnection: The connection to be used.
+        """
+        self._check_fork()
+
+        state = getattr(self._local, 'transaction', None)
+        if state is not None:
+            yield state.connection
+            return
+
+        if read and self.replicas is not None:
+            replica, connection = self._checkout_replica()
+            if replica is not None:
+                start = time.perf_counter()
+                broken = False
+                # The results of a replica are not cached (see _query()).
+                self._local.replica_read = True
+                try:
+                    yield connection
+                except ConnectionLostError:
+                    broken = True
+                    raise
+                finally:
+                    self._local.replica_read = False
+                    self.replicas.checkin(replica, connection,
+                                          time.perf_counter() - start,
+                                          failed=broken)
+                return
+
+        if self.pool is None:
+            try:
+                yield self.connection_db
+            except ConnectionLostError:
+                # The next query opens a new connection.
+                self._reset_connection()
+                raise
+            return
+
+        connection = self.pool.checkout()
+        broken = False
+        try:
+            yield connection
+        except ConnectionLostError:
+            broken = True
+            raise
+        finally:
+            self.pool.checkin(connection, discard=broken)
+
+    def _reset_connection(self):
+        """Forgets the connection of the thread after it broke, so the next
+        query opens a new one."""
+        holder = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if holder is not None:
+            holder.close()
+
+    def _checkout_replica(self):
+        """Takes a connection from a read replica, unless the reads of this
+        thread must stay on the primary: inside ``transaction()`` or
+        ``primary()``, or less than ``read_your_writes`` seconds after a
+        write.
+
+        Returns:
+            tuple: ``(replica, connection)``, or ``(None, None)`` to use the
+            primary.
+        """
+        if self.replicas is None or self.in_transaction():
+            return None, None
+        if getattr(self._local, 'primary', 0):
+            return None, None
+
+        last_write = getattr(self._local, 'last_write', None)
+        if (last_write is not None and
+                time.monotonic() - last_write < self.read_your_writes):
+            return None, None
+
+        return self.replicas.checkout()
+
+    def _wrote(self):
+        # Starts the read-your-writes window of this thread.
+        if self.replicas is not None:
+            self._local.last_write = time.monotonic()
+
+    @contextlib.contextmanager
+    def primary(self):
+        """Sends every query of the block (of this thread) to the primary, for
+        reads that cannot see stale data.
+
+        Yields:
+            ConnectionDB: This instance.
+
+        Example:
+            How to call this method::
+
+                with database.primary():
+                    stock = database.query("SELECT * FROM bicycles")
+        """
+        self._local.primary = getattr(self._local, 'primary', 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.primary -= 1
+
+    def replica_statistics(self):
+        """Returns the usage of the read replicas.
+
+        Returns:
+            (list[dict] | None): See ``ReplicaSet.statistics()``. None if there
+            are no replicas.
+        """
+        if self.replicas is None:
+            return None
+        return self.replicas.statistics()
+
+    @contextlib.contextmanager
+    def transaction(self, autocommit_every=None):
+        """Groups the statements executed inside the block in one transaction:
+        ``query()`` stops committing after each write, and the block commits
+        when it ends or rolls back if it raises an exception.
+
+        Blocks can be nested. An inner block is a SAVEPOINT: an exception
+        inside it rolls back only its statements (and is raised to the outer
+        block, which can catch it and go on).
+
+        The transaction belongs to the thread that opened it. When the instance
+        is pooled, the thread keeps one connection until the outer block ends.
+
+        Args:
+            autocommit_every (int, optional): Commits after every N writes, so a
+                long job keeps its progress without paying a commit per
+                statement. Only applies while no SAVEPOINT is open. None commits
+                only at the end. Ignored by inner blocks. Defaults to None.
+
+        Yields:
+            ConnectionDB: This instance.
+
+        Note:
+            ``query_batches()`` and ``query_iter()`` use a connection of their
+            own, so they do not see the uncommitted writes of the transaction.
+
+        Example:
+            Saving a list of bicycles with one commit every 500 rows::
+
+                with Bicycle.transaction(autocommit_every=500):
+                    for bike in bikes:
+                        bike.save()
+
+            Nesting::
+
+                with database.transaction():
+                    admin.save()
+                    try:
+                        with database.transaction():
+                            bike.save()
+                            raise ValueError()
+                    except ValueError:
+                        pass    # Only bike.save() was rolled back.
+
+        References:
+            `10.2.36 MySQLConnection.rollback() Method`_
+
+            `13.3.4 SAVEPOINT, ROLLBACK TO SAVEPOINT, and RELEASE SAVEPOINT Statements`_
+
+        .. _10.2.36 MySQLConnection.rollback() Method:
+           https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlconnection-rollback.html
+        .. _13.3.4 SAVEPOINT, ROLLBACK TO SAVEPOINT, and RELEASE SAVEPOINT Statements:
+           https://dev.mysql.com/doc/refman/8.0/en/savepoint.html
+        """
+
+        self._check_fork()
+        state = getattr(self._local, 'transaction', None)
+
+        # Inner block: SAVEPOINT.
+        if state is not None:
+            state.savepoint_counter += 1
+            name = "active_record_{number}".format(number=state.savepoint_counter)
+            self._execute_control(state.connection, "SAVEPOINT " + name)
+            state.savepoints.append(name)
+            try:
+                yield self
+            except (DeadlockError, ConnectionLostError):
+                # The server already rolled back the whole transaction (and
+                # its savepoints).
+                raise
+            except BaseException:
+                self._execute_control(state.connection,
+                                      "ROLLBACK TO SAVEPOINT " + name)
+                raise
+            else:
+                self._execute_control(state.connection,
+                                      "RELEASE SAVEPOINT " + name)
+            finally:
+                state.savepoints.pop()
+            return
+
+        # Outer block.
+        if self.pool is None:
+            connection = self.connection_db
+        else:
+            connection = self.pool.checkout()
+
+        state = _Transaction(connection, autocommit_every)
+        self._local.transaction = state
+        broken = False
+        try:
+            yield self
+        except BaseException as err:
+            broken = isinstance(err, ConnectionLostError)
+            try:
+                connection.rollback()
+            except self.backend.Error:
+                # The connection broke. The server rolls back by itself.
+                broken = True
+            raise
+        else:
+            try:
+                connection.commit()
+            except self.backend.Error as err:
+                broken = self.backend.error_kind(err) == 'connection_lost'
+                self._raise_query_error(err)
+        finally:
+            self._local.transaction = None
+            if self.pool is not None:
+                self.pool.checkin(connection, discard=broken)
+            elif broken:
+                self._reset_connection()
+
+            # Other threads may have cached the old rows while the transaction
+            # was open.
+            if self.query_cache is not None:
+                if state.tables_written is None:
+                    self.query_cache.clear()
+                else:
+                    for table in state.tables_written:
+                        self.query_cache.invalidate(table)
+
+    def run_transaction(self, function, *args, **kwargs):
+        """Calls a function inside ``transaction()``. If the transaction fails
+        with a deadlock or a lock wait timeout, it is rolled back and the
+        function is called again, following the ``retry_policy``.
+
+        Inside another transaction, the function is called once, in a
+        SAVEPOINT (the outer transaction is the one that can be tried again).
+
+        Args:
+            function (callable): The work of the transaction.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Any: The return value of the function.
+
+        Warning:
+            The function must be safe to call again. The database is rolled
+            back, but the Python objects are not (for example, the ``id``
+            given by ``save()`` to a new object), so the objects should be
+            created or read inside the function.
+
+        Example:
+            Moving stock between two bicycles::
+
+                def move_stock(from_id, to_id):
+                    source = Bicycle.find_by_id(from_id)
+                    target = Bicycle.find_by_id(to_id)
+                    ...
+                    source.save()
+                    target.save()
+
+                database.run_transaction(move_stock, 1, 2)
+        """
+
+        def attempt():
+            with self.transaction():
+                return function(*args, **kwargs)
+
+        if self.retry_policy is None or self.in_transaction():
+            return attempt()
+        return self.retry_policy.run(attempt)
+
+    def in_transaction(self):
+        """Checks if the current thread is inside ``transaction()``.
+
+        Returns:
+            bool: True if it is. False otherwise.
+        """
+        self._check_fork()
+        return getattr(self._local, 'transaction', None) is not None
+
+    def _commit(self, connection):
+        """Commits a write, unless the thread is inside ``transaction()``. In
+        that case, only commits when ``autocommit_every`` writes are pending.
+
+        Args:
+            connection (MySQLConnection): The connection that executed the
+                write.
+        """
+        state = getattr(self._local, 'transaction', None)
+        if state is None:
+            connection.commit()
+            return
+
+        state.pending += 1
+        if (state.autocommit_every and not state.savepoints and
+                state.pending >= state.autocommit_every):
+            connection.commit()
+            state.pending = 0
+
+    def _invalidate_cache(self, sql):
+        """Removes from the query cache the results that a write may have
+        changed.
+
+        Args:
+            sql (str): The statement that is not a SELECT.
+        """
+        self.query_cache.invalidate_sql(sql)
+
+        state = getattr(self._local, 'transaction', None)
+        if state is not None and state.tables_written is not None:
+            table = table_written(sql)
+            if table is None:
+                state.tables_written = None
+            else:
+                state.tables_written.add(table)
+
+    def query_cache_statistics(self):
+        """Returns the counters of the query cache.
+
+        Returns:
+            (dict | None): See ``QueryCache.statistics()``. None if there is no
+            query cache.
+        """
+        if self.query_cache is None:
+            return None
+        return self.query_cache.statistics()
+
+    def _execute_control(self, connection, sql):
+        """Executes a statement that returns no rows and must not be committed
+        (SAVEPOINT and the like).
+
+        Args:
+            connection (MySQLConnection): The connection of the transaction.
+            sql (str): The statement.
+        """
+        cursor = self.backend.cursor(connection, dictionary=False)
+        try:
+            self.backend.execute(cursor, sql)
+        except self.backend.Error as err:
+            self._raise_query_error(err)
+        finally:
+            cursor.close()
+
+    def _statement_cache(self, connection):
+        """Returns the prepared statement cache of the connection.
+
+        Args:
+            connection (MySQLConnection): The connection used by the query.
+
+        Returns:
+            StatementCache: The cache that belongs to the connection.
+        """
+        with self._statement_lock:
+            cache = self._statement_caches.get(connection)
+            if cache is None:
+                cache = StatementCache(connection, self.statement_cache_size,
+                                       self._statement_counters,
+                                       self._statement_lock)
+                self._statement_caches[connection] = cache
+            return cache
+
+    def statement_cache_statistics(self):
+        """Returns the counters of the prepared statement cache.
+
+        Returns:
+            dict: ``size`` (per connection), ``cached`` (open statements in all
+            connections), ``hits``, ``misses`` and ``evictions``.
+        """
+        with self._statement_lock:
+            cached = sum(len(cache) for cache in self._statement_caches.values())
+            return {
+                'size': self.statement_cache_size,
+                'cached': cached,
+                'hits': self._statement_counters['hits'],
+                'misses': self._statement_counters['misses'],
+                'evictions': self._statement_counters['evictions']
+            }
 
-    def __init__(self):
-        # There is error checking inside the db_connect() function.
-        self.connection_db = database_functions.db_connect()
+    def pool_statistics(self):
+        """Returns the usage statistics of the pool.
 
-    def query(self, sql, values=None):
+        Returns:
+            (dict | None): See ``ConnectionPool.statistics()``. None if this
+            instance is not pooled.
+        """
+        if self.pool is None:
+            return None
+        return self.pool.statistics()
+
+    def query(self, sql, values=None, row_format='dict'):
         """Performs a query on the database.
 
         Args:
             sql (str): The query to be executed.
             values (tuple, optional): The values to complete the SQL statement.
                 Defaults to None.
+            row_format (str, optional): The format of the records: ``'dict'``,
+                ``'tuple'`` or ``'namedtuple'`` (see
+                ``activerecord.row_formats``). Defaults to ``'dict'``.
 
         Returns:
-            (list[dict] | list[] | bool): Returns False on failure. For
-            successful queries which produce a result set, such as SELECT, SHOW,
-            DESCRIBE or EXPLAIN, will return a list of dictionaries with all
-            records. For other successful queries, will return True.
+            (list[dict] | list[tuple] | list[] | bool): For queries which
+            produce a result set, such as SELECT, SHOW, DESCRIBE or EXPLAIN,
+            will return a list with all records, in the requested format. For
+            other queries, will return True.
+
+        Note:
+            Writes with values are executed as server-side prepared
+            statements, cached per connection (see ``StatementCache``), unless
+            ``statement_cache_size`` is 0. Executing the same SQL text again
+            only sends the values. Reads with values return their records,
+            like the reads without them.
+
+            If there is a ``query_cache``, SELECT results are served from it
+            (outside transactions) and the other statements invalidate it.
+
+            Outside transactions, deadlocks and lock wait timeouts are tried
+            again by the ``retry_policy``, and so are reads whose connection
+            was lost (a write may have been applied before the connection
+            broke).
 
         Raises:
-            ER_NO_SUCH_TABLE: Raised by the MySQLConnection object if the
-                table does not exist.
-            ER_BAD_FIELD_ERROR: Raised by the MySQLConnection object if the
-                column does not exist.
-            Error: Any other error raised by the MySQLConnection object.
+            NoSuchTableError: If the table does not exist
+                (ER_NO_SUCH_TABLE).
+            BadFieldError: If the column does not exist (ER_BAD_FIELD_ERROR).
+            TransientError: Deadlocks, lock wait timeouts and lost
+                connections, when they cannot be (or were not) tried again.
+            DatabaseError: Any other error raised by the driver (see
+                ``activerecord.errors``).
 
         References:
             `10.6.4 cursor.MySQLCursorDict Class`_
@@ -100,60 +898,568 @@ class ConnectionDB(object):
 
         """
 
+        if row_format != 'dict':
+            check_row_format(row_format)
+
+        policy = self.retry_policy
+        if policy is None or self.in_transaction():
+            return self._query(sql, values, row_format)
+
+        return policy.run(self._query, sql, values, row_format,
+                          retry_on=self._retry_on(sql, values))
+
+    def execute(self, sql, values=None, row_format='dict'):
+        """Performs a query and returns its result together with its metadata.
+
+        ``affected_rows`` and ``insert_id`` belong to the thread that executed
+        the last query, so they are safe to read right after ``query()``. This
+        method returns them with the rows, so they can also be passed around
+        (to another thread, or after other queries) without being overwritten.
+
+        Args:
+            sql (str): The query to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            row_format (str, optional): The format of the records (see
+                ``query()``). Defaults to ``'dict'``.
+
+        Returns:
+            QueryResult: ``rows``, ``affected_rows`` and ``insert_id``.
+
+        Example:
+            How to call this method::
+
+                result = database.execute(
+                    "INSERT INTO bicycles (brand) VALUES (%s)", ('Trek',))
+                print(result.insert_id, result.affected_rows)
+        """
+        rows = self.query(sql, values, row_format)
+        return QueryResult(rows, self.affected_rows, self.insert_id)
+
+    def _retry_on(self, sql, values=None):
+        """Returns the errors of a statement that the ``retry_policy`` tries
+        again.
+
+        Args:
+            sql (str): The statement.
+            values (tuple, optional): The values of the placeholders.
+
+        Returns:
+            tuple[type]: The exception classes.
+        """
+        if is_read(sql):
+            return self.retry_policy.retry_on + (ConnectionLostError,)
+        return self.retry_policy.retry_on
+
+    def _query(self, sql, values, row_format):
+        """Executes ``query()`` once, without retries."""
+
         # The default return value of this function is False.
         result = False
+        error = None
 
-        # If the execution got to this line, it passed the error checking in
-        # db_connect().
-        cursor = self.connection_db.cursor(dictionary=True)  # MySQLCursorDict
+        write = not is_read(sql)
 
-        # https://dev.mysql.com/doc/connector-python/en/connector-python-tutorial-cursorbuffered.html
-        try:
-            # CREATE, UPDATE or DELETE (CRUD)
-            if values:
-                cursor.execute(sql, values)
-                self.connection_db.commit()
-                result = True
+        cache = self.query_cache
+        cache_key = None
+        if cache is not None:
+            if not write and not self.in_transaction():
+                cache_key = cache.key(sql, values, row_format)
+                cached = cache.get(cache_key) if cache_key is not None else None
+                if cached is not None:
+                    self.affected_rows = len(cached)
+                    self.insert_id = 0
+                    return cached
+                generation = cache.generation(sql)
 
-            # READ (CRUD)
-            else:
-                # Read
-                cursor.execute(sql)
-                result = cursor.fetchall()
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            event = instrumentation.before_query(sql, values)
+
+        with self._connection(read=not write) as connection:
+
+            prepared = (bool(values) and write and
+                        self.statement_cache_size > 0 and
+                        self.backend.supports_prepared_statements)
+
+            # If the execution got to this line, it passed the error checking in
+            # db_connect().
+            try:
+                if prepared:
+                    # MySQLCursorPrepared. The cached SQL object must be
+                    # executed.
+                    cursor, sql = self._statement_cache(connection).get(sql)
+                else:
+                    # MySQLCursorDict (or MySQLCursor, for tuples)
+                    cursor = self.backend.cursor(connection,
+                                                 dictionary=row_format == 'dict',
+                                                 buffered=False)
+            except self.backend.Error as err:
+                # The connection broke while it was idle.
+                self._raise_query_error(err)
+
+            # https://dev.mysql.com/doc/connector-python/en/connector-python-tutorial-cursorbuffered.html
+            start = time.perf_counter()
+            try:
+                # CREATE, UPDATE or DELETE (CRUD)
+                if values and write:
+                    if prepared:
+                        cursor.execute(sql, values)
+                    else:
+                        self.backend.execute(cursor, sql, values)
+                    self._commit(connection)
+                    result = True
+
+                # READ (CRUD)
+                else:
+                    # Read (a SELECT with values is not prepared, so its rows
+                    # come in the requested format).
+                    self.backend.execute(cursor, sql, values)
+                    result = cursor.fetchall()
+                    if row_format != 'dict':
+                        result = format_rows(cursor, result, row_format)
+
+            except self.backend.Error as err:
+                error = err
+                if prepared:
+                    self._statement_cache(connection).discard(sql)
+                self._raise_query_error(err)
+
+            finally:
+                duration = time.perf_counter() - start
+
+                # If there was no error in the execution:
+                if isinstance(result, list) and cursor.rowcount == -1:
+                    # Drivers that do not count the rows of a SELECT.
+                    self.affected_rows = len(result)
+                else:
+                    self.affected_rows = cursor.rowcount
+                self.insert_id = self.backend.insert_id(cursor, sql)
+
+                # Closes the cursor (prepared ones stay open in the cache).
+                if not prepared:
+                    cursor.close()
+
+                if instrumentation is not None:
+                    instrumentation.after_query(event, duration, result,
+                                                self.affected_rows,
+                                                self.insert_id, error)
+
+                if cache is not None:
+                    # A replica can lag behind a write made by another thread
+                    # (which reads its own writes from the primary), and its
+                    # stale rows would be served to every thread.
+                    if (cache_key is not None and isinstance(result, list) and
+                            not getattr(self._local, 'replica_read', False)):
+                        cache.put(cache_key, sql, result, generation)
+                    elif write:
+                        self._invalidate_cache(sql)
+
+                if write and error is None:
+                    self._wrote()
+
+                # THE CONNECTION SHOULD NOT BE CLOSED.
+                # Autodesk Maya executes correctly the first time, but shows an error
+                # from the second time foward. See reference.
+                # ----------------------------------------------------------------------
+                # Would close the connection.
+                # database_functions.db_disconnect(self.connection_db)
+
+        return result
+
+    def query_many(self, statements):
+        """Performs several queries in one round trip to the database.
+
+        The statements are sent together (``cursor.execute(multi=True)`` on
+        MySQL). Backends that cannot do that execute them one by one on the same
+        connection, so the results are the same.
+
+        Args:
+            statements (list[str | tuple[str, tuple]]): The queries, as SQL
+                strings or ``(sql, values)`` tuples.
+
+        Returns:
+            list[list[dict] | bool]: One result per statement, in order: a list
+            of dictionaries for statements that produce a result set (SELECT),
+            True for the others.
+
+        Note:
+            Writes are committed together after the last statement (or left to
+            the transaction, inside ``transaction()``). If any statement fails,
+            the writes of the batch are rolled back, unless the thread is
+            inside ``transaction()``.
+
+            SELECT results in the ``query_cache`` are not sent to the database.
+
+        Raises:
+            DatabaseError: The same errors raised by ``query()``.
+
+        Example:
+            Everything a catalog page needs, in one round trip::
+
+                count, breakdown, page = database.query_many([
+                    "SELECT COUNT(*) AS count FROM bicycles",
+                    "SELECT category, COUNT(*) AS count FROM bicycles "
+                    "GROUP BY category",
+                    ("SELECT * FROM bicycles ORDER BY id LIMIT %s", (20,))])
+
+        References:
+            `10.5.4 MySQLCursor.execute() Method`_
+
+        .. _10.5.4 MySQLCursor.execute() Method:
+           https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursor-execute.html
+        """
+        statements = [(statement, None) if isinstance(statement, str)
+                      else (statement[0], statement[1] or None)
+                      for statement in statements]
 
-        except mysql.connector.Error as err:
+        policy = self.retry_policy
+        if policy is None or self.in_transaction():
+            return self._query_many(statements)
 
-            # err.errno means the error code (number).
-            if err.errno == errorcode.ER_NO_SUCH_TABLE:
-                shared.print_error_message(
-                    "Database table does not exist.")
-                raise Exception("Database table does not exist.")
+        # The writes of a batch that fails are rolled back, so it can be sent
+        # again.
+        retry_on = policy.retry_on
+        if all(is_read(sql) for sql, _ in statements):
+            retry_on += (ConnectionLostError,)
+        return policy.run(self._query_many, statements, retry_on=retry_on)
 
-            if err.errno == errorcode.ER_BAD_FIELD_ERROR:
-                shared.print_error_message(
-                    "Column does not exist in table.")
-                raise Exception("Column does not exist in table.")
+    def _query_many(self, statements):
+        """Executes ``query_many()`` once, without retries."""
+        results = [None] * len(statements)
 
+        # Statements that need the database (the others came from the cache).
+        cache = self.query_cache
+        cache_keys = {}
+        generations = {}
+        pending = []
+        for index, (sql, values) in enumerate(statements):
+            if (cache is not None and not values and is_read(sql) and
+                    not self.in_transaction()):
+                key = cache.key(sql, values)
+                cached = cache.get(key) if key is not None else None
+                if cached is not None:
+                    results[index] = cached
+                    continue
+                cache_keys[index] = key
+                generations[index] = cache.generation(sql)
+            pending.append(index)
+
+        if not pending:
+            return results
+
+        batch = [statements[index] for index in pending]
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            params = tuple(value for _, values in batch if values
+                           for value in values)
+            event = instrumentation.before_query(
+                ";\n".join(sql for sql, _ in batch), params or None,
+                len(batch))
+
+        read = all(is_read(sql) for sql, _ in batch)
+        with self._connection(read=read) as connection:
+            from_replica = getattr(self._local, 'replica_read', False)
+            cursor = self.backend.cursor(connection, dictionary=True,
+                                         buffered=False)
+            start = time.perf_counter()
+            error = None
+            # Still empty if something other than a driver error is raised.
+            executed = []
+            try:
+                executed = self.backend.execute_multi(cursor, batch)
+                if any(rows is None for rows, _, _ in executed):
+                    self._commit(connection)
+                    self._wrote()
+
+            except self.backend.Error as err:
+                error = err
+                if not self.in_transaction():
+                    connection.rollback()
+                self._raise_query_error(err)
+
+            finally:
+                duration = time.perf_counter() - start
+                cursor.close()
+                if instrumentation is not None:
+                    if error is None and executed:
+                        rows = [row for rows, _, _ in executed
+                                if rows is not None for row in rows]
+                        instrumentation.after_query(
+                            event, duration, rows, executed[-1][1],
+                            executed[-1][2])
+                    else:
+                        instrumentation.after_query(event, duration,
+                                                    error=error)
+
+        for index, (rows, affected_rows, insert_id) in zip(pending, executed):
+            sql = statements[index][0]
+            results[index] = rows if rows is not None else True
+            if cache is not None:
+                if index in cache_keys and rows is not None and not from_replica:
+                    cache.put(cache_keys[index], sql, rows, generations[index])
+                elif rows is None or not is_read(sql):
+                    self._invalidate_cache(sql)
+
+        # The same as after the last of the queries.
+        self.affected_rows = executed[-1][1]
+        self.insert_id = executed[-1][2]
+
+        return results
+
+    def server_variable(self, name):
+        """Reads a server system variable once and remembers its value.
+
+        Args:
+            name (str): The variable name without ``@@`` (for example,
+                ``'max_allowed_packet'``).
+
+        Returns:
+            Any: The value of the variable.
+
+        References:
+            `5.1.8 Server System Variables`_
+
+        .. _5.1.8 Server System Variables:
+           https://dev.mysql.com/doc/refman/8.0/en/server-system-variables.html
+        """
+        if name in self.backend.server_variables:
+            return self.backend.server_variables[name]
+
+        if name not in self._server_variables:
+            result = self.query("SELECT @@" + name + " AS value")
+            self._server_variables[name] = result[0]['value']
+        return self._server_variables[name]
+
+    def query_batches(self, sql, values=None, batch_size=1000,
+                      row_format='dict'):
+        """Performs a SELECT and yields its records in lists of at most
+        ``batch_size`` records, reading them from the server as they are
+        consumed.
+
+        The query runs on an unbuffered cursor (``buffered=False``), so only
+        one batch is kept in memory. Because the result set stays open on that
+        connection until it is consumed, the rows are streamed through a
+        connection of its own: a pooled one (of a replica, if there are any),
+        or a dedicated connection that is closed at the end. Other queries can
+        be executed while iterating.
+
+        Args:
+            sql (str): The SELECT to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            batch_size (int, optional): The number of records fetched per
+                round trip. Defaults to 1000.
+            row_format (str, optional): ``'dict'``, ``'tuple'`` or
+                ``'namedtuple'`` (see ``query()``). Defaults to ``'dict'``.
+
+        Yields:
+            (list[dict] | list[tuple]): The next batch of records.
+
+        Raises:
+            DatabaseError: The same errors raised by ``query()``.
+
+        References:
+            `10.5.7 MySQLCursor.fetchmany() Method`_
+
+            `10.6.1 cursor.MySQLCursorBuffered Class`_
+
+        .. _10.5.7 MySQLCursor.fetchmany() Method:
+           https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursor-fetchmany.html
+        .. _10.6.1 cursor.MySQLCursorBuffered Class:
+           https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursorbuffered.html
+        """
+
+        if row_format != 'dict':
+            check_row_format(row_format)
+
+        self._check_fork()
+        replica, connection = self._checkout_replica()
+        if replica is None:
+            if self.pool is None:
+                connection = self.backend.connect()
             else:
-                shared.print_error_message(err)
-                raise Exception("There was an error executing the query.")
+                connection = self.pool.checkout()
+
+        cursor = self.backend.cursor(connection, dictionary=row_format == 'dict',
+                                     buffered=False)
+        exhausted = False
+
+        # Only the time spent in the database is measured, not the time the
+        # caller spends with each batch.
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            event = instrumentation.before_query(sql, values)
+        duration = 0.0
+        row_count = 0
+        size = 0
+        error = None
+
+        try:
+            start = time.perf_counter()
+            self.backend.execute(cursor, sql, values)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                duration += time.perf_counter() - start
+                if not rows:
+                    break
+                if row_format != 'dict':
+                    rows = format_rows(cursor, rows, row_format)
+                if instrumentation is not None:
+                    row_count += len(rows)
+                    size += estimate_bytes(rows)
+                yield rows
+                start = time.perf_counter()
+            exhausted = True
+
+        except self.backend.Error as err:
+            duration += time.perf_counter() - start
+            error = err
+            self._raise_query_error(err)
 
         finally:
-            # If there was no error in the execution:
-            self.affected_rows = cursor.rowcount
-            self.insert_id = cursor.lastrowid
+            if instrumentation is not None:
+                instrumentation.after_query(event, duration, error=error,
+                                            rows=row_count, size=size)
 
-            # Closes the cursor.
-            cursor.close()
+            try:
+                cursor.close()
+            except self.backend.Error:
+                # Unread rows are left when the caller stops iterating early.
+                exhausted = False
+
+            # A connection with unread rows cannot be reused, but it is only
+            # a failure of the replica if the connection was lost.
+            if replica is not None:
+                self.replicas.checkin(
+                    replica, connection, duration, discard=not exhausted,
+                    failed=(error is not None and
+                            self.backend.error_kind(error) == 'connection_lost'))
+            elif self.pool is None:
+                self.backend.close(connection)
+            else:
+                self.pool.checkin(connection, discard=not exhausted)
+
+    def query_iter(self, sql, values=None, batch_size=1000, row_format='dict'):
+        """Performs a SELECT and yields its records one by one, keeping at most
+        ``batch_size`` of them in memory (see ``query_batches()``).
+
+        Args:
+            sql (str): The SELECT to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            batch_size (int, optional): The number of records fetched per
+                round trip. Defaults to 1000.
+            row_format (str, optional): ``'dict'``, ``'tuple'`` or
+                ``'namedtuple'`` (see ``query()``). Defaults to ``'dict'``.
+
+        Yields:
+            (dict | tuple): The next record.
+
+        Example:
+            How to call this method::
+
+                for record in database.query_iter("SELECT * FROM bicycles"):
+                    print(record['brand'])
+        """
+        for rows in self.query_batches(sql, values, batch_size, row_format):
+            for row in rows:
+                yield row
+
+    def query_columns(self, sql, values=None, dtypes=None, structured=False):
+        """Performs a SELECT and returns its result as NumPy arrays, one per
+        column (see ``activerecord.columnar``).
+
+        The rows are fetched as tuples, so no dictionary is created per row.
+
+        Args:
+            sql (str): The SELECT to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            dtypes (dict, optional): The dtype of some columns, by name. The
+                others are inferred from their values. Defaults to None.
+            structured (bool, optional): Returns one structured array instead
+                of a dictionary of arrays. Defaults to False.
+
+        Returns:
+            (dict[str, numpy.ndarray] | numpy.ndarray): The arrays by column
+            name, or the structured array.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+            DatabaseError: The same errors raised by ``query()``.
+
+        Note:
+            The ``query_cache`` is not used.
+
+        Example:
+            A price report computed without Python loops::
+
+                columns = database.query_columns(
+                    "SELECT price, weight_kg FROM bicycles")
+                print((columns['price'] / columns['weight_kg']).max())
+        """
+        policy = self.retry_policy
+        if policy is None or self.in_transaction():
+            return self._query_columns(sql, values, dtypes, structured)
+
+        return policy.run(self._query_columns, sql, values, dtypes, structured,
+                          retry_on=policy.retry_on + (ConnectionLostError,))
+
+    def _query_columns(self, sql, values, dtypes, structured):
+        """Executes ``query_columns()`` once, without retries."""
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            event = instrumentation.before_query(sql, values)
+
+        rows = []
+        error = None
+        with self._connection(read=True) as connection:
+            cursor = self.backend.cursor(connection, dictionary=False,
+                                         buffered=False)
+            start = time.perf_counter()
+            try:
+                self.backend.execute(cursor, sql, values)
+                rows = cursor.fetchall()
+                names = [column[0] for column in cursor.description]
+
+            except self.backend.Error as err:
+                error = err
+                self._raise_query_error(err)
+
+            finally:
+                duration = time.perf_counter() - start
+                self.affected_rows = len(rows)
+                self.insert_id = 0
+                cursor.close()
+                if instrumentation is not None:
+                    instrumentation.after_query(event, duration,
+                                                affected_rows=len(rows),
+                                                error=error, rows=len(rows),
+                                                size=estimate_bytes(rows))
+
+        return to_columns(names, rows, dtypes, structured)
+
+    def _raise_query_error(self, err):
+        """Shows the error message and raises the exception that corresponds to
+        the error raised by the driver of the backend.
+
+        Args:
+            err (mysql.connector.Error): The error raised by the cursor.
+
+        Raises:
+            DatabaseError: Always, a subclass chosen by the ``error_kind()`` of
+                the backend (see ``activerecord.errors``).
+        """
 
-            # THE CONNECTION SHOULD NOT BE CLOSED.
-            # Autodesk Maya executes correctly the first time, but shows an error
-            # from the second time foward. See reference.
-            # ----------------------------------------------------------------------
-            # Would close the connection.
-            # database_functions.db_disconnect(self.connection_db)
+        error = translate_error(err, self.backend.error_kind(err))
 
-            return result
+        # The message of the driver is more useful than the generic one.
+        if isinstance(error, QueryError):
+            shared.print_error_message(err)
+        else:
+            shared.print_error_message(str(error))
+        raise error from err
 
     def escape_string(self, string_to_escape):
         """**NOT NECESSARY** (see reference).
@@ -0,0 +1,333 @@
+"""A bounded, thread-safe pool of database connections.
+
+The pool is used by ``ConnectionDB`` when it is created with a ``pool_size``
+(or when ``DB_POOL_SIZE`` is set in ``db_credentials``). Connections are created
+on demand, up to ``size``, and reused afterwards.
+
+References:
+    `threading — Thread-based parallelism`_
+
+    `10.2.33 MySQLConnection.is_connected() Method`_
+
+.. _threading — Thread-based parallelism:
+   https://docs.python.org/3.7/library/threading.html#condition-objects
+.. _10.2.33 MySQLConnection.is_connected() Method:
+   https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlconnection-is-connected.html
+
+"""
+
+__all__ = ['ConnectionPool']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import collections
+import contextlib
+import threading
+import time
+
+import shared
+from . errors import PoolTimeoutError
+
+
+class ConnectionPool(object):
+    """Keeps up to ``size`` open connections and lends them to one thread at a
+    time.
+
+    Args:
+        factory (callable): Function without arguments that returns a new
+            connection (for example, ``database_functions.db_connect``).
+        size (int, optional): Maximum number of open connections. Defaults to 5.
+        timeout (float, optional): Seconds a thread waits for a free connection
+            before an error is raised. Defaults to 30.0.
+        pre_ping (bool, optional): Checks if the connection is still alive every
+            time it is checked out. Defaults to True.
+        ping (callable, optional): Function that receives a connection and
+            returns True if it is alive. Defaults to calling
+            ``connection.is_connected()`` (``mysql.connector``).
+        recycle (float, optional): Connections older than this number of
+            seconds are closed and replaced on checkout. None disables it.
+            Defaults to None.
+
+    Example:
+        How to use the pool directly::
+
+            pool = ConnectionPool(database_functions.db_connect, size=4)
+
+            with pool.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute("SELECT * FROM bicycles")
+                rows = cursor.fetchall()
+                cursor.close()
+
+            print(pool.statistics())
+
+    """
+
+    def __init__(self, factory, size=5, timeout=30.0, pre_ping=True, recycle=None,
+                 ping=None):
+        if size < 1:
+            raise ValueError("The pool size must be greater than zero.")
+
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+        self._ping = ping
+
+        self._condition = threading.Condition()
+
+        # Idle connections as (connection, created_at) pairs. The most recently
+        # returned connection is reused first (LIFO), so the others can age.
+        self._idle = collections.deque()
+
+        # created_at of the connections that are checked out, by id().
+        self._checked_out = {}
+
+        # Open connections (idle + checked out + being created).
+        self._open = 0
+
+        # Connections of the parent process, after a fork (see after_fork()).
+        self._inherited = []
+        self._inherited_ids = set()
+
+        self._created = 0
+        self._recycled = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def checkout(self):
+        """Takes a connection from the pool, waiting if all of them are in use.
+
+        Returns:
+            MySQLConnection: A connection that was checked to be alive (if
+            ``pre_ping`` is enabled).
+
+        Raises:
+            PoolTimeoutError: If no connection becomes free within ``timeout``
+                seconds.
+        """
+
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, created_at = self._idle.pop()
+                    break
+
+                # There is room to open a new connection.
+                if self._open < self.size:
+                    self._open += 1
+                    connection, created_at = None, None
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    shared.print_error_message(
+                        "Timed out waiting for a database connection.")
+                    raise PoolTimeoutError(
+                        "Timed out waiting for a database connection.")
+
+                waited = True
+                self._condition.wait(remaining)
+
+            wait_time = time.perf_counter() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        # Connecting and pinging happen outside the lock, so other threads are
+        # not blocked by the network.
+        try:
+            if connection is None:
+                connection, created_at = self._create()
+            elif not self._is_usable(connection, created_at):
+                self._close(connection)
+                connection, created_at = self._create()
+                with self._condition:
+                    self._recycled += 1
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._checked_out[id(connection)] = created_at
+
+        return connection
+
+    def checkin(self, connection, discard=False):
+        """Gives a connection back to the pool.
+
+        Args:
+            connection (MySQLConnection): A connection obtained from
+                ``checkout()``. Connections that are not checked out from this
+                pool (given back twice, for example) are ignored.
+            discard (bool, optional): Closes the connection instead of reusing
+                it (for example, after it was left in an unknown state).
+                Defaults to False.
+        """
+
+        with self._condition:
+            created_at = self._checked_out.pop(id(connection), None)
+            if created_at is None:
+                if id(connection) in self._inherited_ids:
+                    # Checked out before a fork (see after_fork()).
+                    self._inherited.append(connection)
+                # Otherwise it is not checked out from this pool (or it was
+                # already given back): it is not counted in _open.
+                return
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((connection, created_at))
+            self._condition.notify()
+
+        if discard:
+            self._close(connection)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in.
+
+        Yields:
+            MySQLConnection: The checked out connection.
+        """
+        connection = self.checkout()
+        try:
+            yield connection
+        finally:
+            self.checkin(connection)
+
+    def warm_up(self, count=None):
+        """Opens connections ahead of time and leaves them idle in the pool.
+
+        Args:
+            count (int, optional): How many connections to open. It never goes
+                beyond ``size``. Defaults to ``size``.
+
+        Returns:
+            int: The number of connections that were opened.
+        """
+
+        if count is None:
+            count = self.size
+
+        opened = 0
+        for _ in range(count):
+            with self._condition:
+                if self._open >= self.size:
+                    break
+                self._open += 1
+
+            try:
+                connection, created_at = self._create()
+            except Exception:
+                with self._condition:
+                    self._open -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._idle.appendleft((connection, created_at))
+                self._condition.notify()
+            opened += 1
+
+        return opened
+
+    def statistics(self):
+        """Returns a snapshot of the pool usage.
+
+        Returns:
+            dict: The keys are ``size``, ``open``, ``in_use``, ``idle``,
+            ``created``, ``recycled``, ``checkouts``, ``waits``, ``timeouts``,
+            ``wait_time_total``, ``wait_time_avg`` and ``wait_time_max`` (times
+            in seconds).
+        """
+
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': len(self._checked_out),
+                'idle': len(self._idle),
+                'created': self._created,
+                'recycled': self._recycled,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_time_total': self._wait_time_total,
+                'wait_time_avg': (self._wait_time_total / self._checkouts
+                                  if self._checkouts else 0.0),
+                'wait_time_max': self._wait_time_max
+            }
+
+    def close(self):
+        """Closes every idle connection. Checked out connections are closed
+        when they are given back with ``discard=True`` or dropped by their
+        users.
+        """
+
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._condition.notify_all()
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def after_fork(self):
+        """Forgets the connections inherited from the parent process, in a
+        child process created by ``os.fork()``. New ones are opened on demand.
+
+        The inherited connections share their sockets with the parent, so they
+        are never used or closed (closing them would end the sessions of the
+        parent). They are only kept referenced, so they are not closed by the
+        garbage collector either.
+        """
+        self._condition = threading.Condition()
+        self._inherited.extend(connection for connection, _ in self._idle)
+        self._inherited_ids.update(self._checked_out)
+        self._idle = collections.deque()
+        self._checked_out = {}
+        self._open = 0
+
+    def _create(self):
+        connection = self._factory()
+        with self._condition:
+            self._created += 1
+        return connection, time.monotonic()
+
+    def _is_usable(self, connection, created_at):
+        if self.recycle is not None and time.monotonic() - created_at > self.recycle:
+            return False
+
+        if self.pre_ping:
+            try:
+                if self._ping is not None:
+                    return self._ping(connection)
+                return connection.is_connected()
+            except Exception:
+                return False
+
+        return True
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            # The connection is already broken. There is nothing to do.
+            pass
@@ -9,10 +9,124 @@ References:
 """
 
 from . import db_credentials
+from . errors import AccessDeniedError, ConnectionFailedError
 import shared
 
-from mysql.connector import errorcode
-import mysql.connector
+# mysql.connector is not needed when DB_ENGINE is 'sqlite'.
+try:
+    from mysql.connector import errorcode
+    import mysql.connector
+except ImportError:
+    errorcode = None
+    mysql = None
+
+
+def db_setting(name, default=None):
+    """Reads an optional setting from the ``db_credentials`` module.
+
+    Settings added after the ``db_credentials.py`` file was copied from
+    ``db_credentials_example.py`` may not exist in it, so a default is used.
+
+    Args:
+        name (str): The name of the setting (for example, ``'DB_POOL_SIZE'``).
+        default (Any, optional): The value used when the setting is missing.
+            Defaults to None.
+
+    Returns:
+        Any: The value of the setting or the default.
+    """
+    return getattr(db_credentials, name, default)
+
+
+def db_backend():
+    """Creates the backend chosen by the ``DB_ENGINE`` setting.
+
+    ``'mysql'`` (the default) connects to ``DB_SERVER`` with the credentials in
+    ``db_credentials``. ``'sqlite'`` opens the ``DB_PATH`` file (or
+    ``':memory:'``), running the ``DB_SCHEMA`` script when the database is
+    created. ``'replay'`` answers with the results recorded in the
+    ``DB_RECORDING`` file, waiting ``DB_REPLAY_LATENCY`` seconds per statement.
+
+    With the other engines, if ``DB_RECORDING`` is set, the statements and
+    their results are recorded to that file (see ``activerecord.recording``).
+
+    Returns:
+        DatabaseBackend: The backend used by ``ConnectionDB``.
+
+    Raises:
+        Exception: If ``DB_ENGINE`` has an unknown value.
+    """
+
+    # Imported here because the backends module imports this one.
+    from . import backends, recording
+
+    engine = db_setting('DB_ENGINE', 'mysql')
+    recording_path = db_setting('DB_RECORDING')
+
+    if engine == 'replay':
+        return recording.ReplayBackend(
+            recording_path, latency=db_setting('DB_REPLAY_LATENCY', 0.0))
+
+    if engine == 'mysql':
+        backend = backends.MySQLBackend()
+    elif engine == 'sqlite':
+        backend = backends.SQLiteBackend(db_setting('DB_PATH', ':memory:'),
+                                         schema=db_setting('DB_SCHEMA'))
+    else:
+        shared.print_error_message(
+            "Unknown database engine: {engine}".format(engine=engine))
+        raise Exception("Unknown database engine: {engine}".format(engine=engine))
+
+    if recording_path:
+        backend = recording.RecordingBackend(
+            backend, recording_path, db_setting(
+                'DB_RECORDING_REDACTED_COLUMNS',
+                recording.DEFAULT_REDACTED_COLUMNS))
+    return backend
+
+
+def db_replica_backends():
+    """Creates the backends of the read replicas in the ``DB_REPLICAS``
+    setting.
+
+    With ``'mysql'``, every item is a host name (connected to with the other
+    credentials in ``db_credentials``) or a dictionary with the ``host``,
+    ``user``, ``password`` and ``database`` keys that differ. With ``'sqlite'``,
+    every item is the path of a database file. A ``DatabaseBackend`` can also
+    be given directly.
+
+    Returns:
+        list[DatabaseBackend]: The backends (empty if there are no replicas).
+    """
+
+    # Imported here because the backends module imports this one.
+    from . import backends, recording
+
+    engine = db_setting('DB_ENGINE', 'mysql')
+    if engine == 'replay':
+        # The reads of the replicas were recorded with the others.
+        return []
+
+    replica_backends = []
+    for replica in db_setting('DB_REPLICAS', None) or []:
+        if isinstance(replica, backends.DatabaseBackend):
+            replica_backends.append(replica)
+        elif engine == 'sqlite':
+            replica_backends.append(backends.SQLiteBackend(replica))
+        elif isinstance(replica, dict):
+            replica_backends.append(backends.MySQLBackend(**replica))
+        else:
+            replica_backends.append(backends.MySQLBackend(host=replica))
+
+    recording_path = db_setting('DB_RECORDING')
+    if recording_path:
+        redacted_columns = db_setting('DB_RECORDING_REDACTED_COLUMNS',
+                                      recording.DEFAULT_REDACTED_COLUMNS)
+        replica_backends = [recording.RecordingBackend(backend, recording_path,
+                                                       redacted_columns)
+                            for backend in replica_backends]
+
+    return replica_backends
 
 
 def confirm_db_connect(connection):
@@ -24,20 +138,26 @@ def confirm_db_connect(connection):
     pass
 
 
-def db_connect():
+def db_connect(host=None, user=None, password=None, database=None):
     """Establishes the connection with the MySQL database.
 
     If the connection is not successful, raises an error and shows the message.
 
+    Args:
+        host (str, optional): Defaults to ``db_credentials.DB_SERVER``.
+        user (str, optional): Defaults to ``db_credentials.DB_USER``.
+        password (str, optional): Defaults to ``db_credentials.DB_PASS``.
+        database (str, optional): Defaults to ``db_credentials.DB_NAME``.
+
     Returns:
         MySQLConnection: A MySQLConnection object.
 
     Raises:
-        ER_ACCESS_DENIED_ERROR: Raised by the MySQLConnection object if the
-            access to the database was denied.
-        ER_DBACCESS_DENIED_ERROR: Raised by the MySQLConnection object if the
-            database does not exist.
-        Error: Any other error raised by the MySQLConnection object.
+        AccessDeniedError: If the access to the database was denied
+            (ER_ACCESS_DENIED_ERROR) or the database does not exist
+            (ER_DBACCESS_DENIED_ERROR).
+        ConnectionFailedError: Any other error raised by the MySQLConnection
+            object.
 
     Error:
         Sphinx shows a different (**wrong**) error message than is implemented
@@ -61,10 +181,19 @@ def db_connect():
 
     """
 
+    if host is None:
+        host = db_credentials.DB_SERVER
+    if user is None:
+        user = db_credentials.DB_USER
+    if password is None:
+        password = db_credentials.DB_PASS
+    if database is None:
+        database = db_credentials.DB_NAME
+
     try:
-        connection_db = mysql.connector.connect(user=db_credentials.DB_USER, password=db_credentials.DB_PASS,
-                                                host=db_credentials.DB_SERVER,
-                                                database=db_credentials.DB_NAME)
+        connection_db = mysql.connector.connect(user=user, password=password,
+                                                host=host,
+                                                database=database)
 
         return connection_db
 
@@ -74,16 +203,17 @@ def db_connect():
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             shared.print_error_message(
                 "Something is wrong with your username or password.")
-            raise Exception(
-                "Something is wrong with your username or password.")
+            raise AccessDeniedError(
+                "Something is wrong with your username or password.", err)
 
         elif err.errno == errorcode.ER_DBACCESS_DENIED_ERROR:
             shared.print_error_message("Database does not exist.")
-            raise Exception("Database does not exist.")
+            raise AccessDeniedError("Database does not exist.", err)
 
         else:
             shared.print_error_message(err)
-            raise Exception("There was an error with the database connection.")
+            raise ConnectionFailedError(
+                "There was an error with the database connection.", err)
 
 
 def db_disconnect(connection):
@@ -15,8 +15,15 @@ except ImportError:
     from abc import ABCMeta, abstractmethod
     
 sys.path.insert(0, os.path.abspath(".."))
+import operator
+
 import shared
 from . connection_db import ConnectionDB
+from . async_connection_db import AsyncConnectionDB
+from . hydration import HydrationPlan, slotted_class
+from . identity_map import IdentityMap
+from . query_batch import QueryBatch
+from . query_set import QuerySet
 
 
 # class DatabaseObject(object):     # Python 2.7.11
@@ -51,7 +58,7 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
     _database = ConnectionDB()
     """activerecord.connection_db.ConnectionDB: Holds the connection
-    information used by static methods.
+    information used by static methods. It only connects on the first query.
 
     References:
         `Static class variables and methods in Python`_
@@ -64,6 +71,50 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
     _db_columns = []
     errors = []
 
+    _row_format = 'namedtuple'
+    """str: The format in which the finders fetch the records before creating
+    the objects (see ``activerecord.row_formats``). A namedtuple per row is
+    lighter than a dictionary, which repeats the column names in every row.
+    """
+
+    _fast_hydration = True
+    """bool: ``_instantiate()`` creates the objects from a ``HydrationPlan``,
+    without calling the constructor for every record (see
+    ``activerecord.hydration``). Subclasses whose constructor does more than
+    setting attributes (registering the object, for example) must set it to
+    False.
+    """
+
+    _original = None
+    """tuple: The values of ``_db_columns`` when the object was loaded or last
+    saved (see ``changed_fields()``). None for objects never saved.
+    """
+
+    _record = None
+    """(dict | tuple): The record the object was loaded from, until its values
+    are copied to ``_original`` (the first time they are compared), so finders
+    do not read the columns of every object they create.
+    """
+
+    _column_getters = {}
+    """dict: The ``operator.attrgetter`` of the ``_db_columns`` of each model."""
+
+    @classmethod
+    def slotted(cls):
+        """Returns a subclass of this model whose instance attributes are
+        ``__slots__`` (see ``activerecord.hydration.slotted_class()``). Its
+        finders create objects without a dictionary each.
+
+        Returns:
+            type: The subclass.
+
+        Example:
+            How to call this method::
+
+                bikes = Bicycle.slotted().find_all()
+        """
+        return slotted_class(cls)
+
     @classmethod
     def set_database(cls, database):
         """**Not implemented.**
@@ -90,11 +141,100 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
         pass
 
     @classmethod
-    def find_by_sql(cls, sql):
+    def warm_up(cls):
+        """Starts connecting to the database in the background, so the first
+        query does not pay for the connection.
+
+        Returns:
+            threading.Thread: The thread that is connecting.
+        """
+        return cls._database.warm_up()
+
+    @classmethod
+    def transaction(cls, autocommit_every=None):
+        """Runs the saves and deletes of a block in one transaction. See
+        ``ConnectionDB.transaction()``.
+
+        Args:
+            autocommit_every (int, optional): Commits after every N writes.
+                Defaults to None (commits only at the end).
+
+        Returns:
+            contextlib._GeneratorContextManager: The context manager to be used
+            in a ``with`` statement.
+
+        Example:
+            How to call this method::
+
+                with Bicycle.transaction():
+                    for bike in bikes:
+                        bike.price = bike.price * 2
+                        bike.save()
+        """
+        return cls._database.transaction(autocommit_every)
+
+    @classmethod
+    def session(cls, max_size=None):
+        """Starts a session with an identity map, so every record is loaded
+        into one object (see ``activerecord.identity_map``).
+
+        The session belongs to the current thread: the finders called in other
+        threads, including the ``*_async`` ones (which run in the worker
+        threads of ``AsyncConnectionDB``), do not use it.
+
+        Args:
+            max_size (int, optional): Keeps this number of objects, evicting
+                the least recently used. Defaults to None (the objects are kept
+                while they are used elsewhere).
+
+        Returns:
+            IdentityMap: The context manager to be used in a ``with``
+            statement.
+
+        Example:
+            How to call this method::
+
+                with Bicycle.session() as identity_map:
+                    first = Bicycle.find_by_id(26)
+                    again = Bicycle.find_by_id(26)   # No query.
+                    assert first is again
+        """
+        return IdentityMap(max_size)
+
+    @classmethod
+    def run_transaction(cls, function, *args, **kwargs):
+        """Calls a function in one transaction, trying it again after a
+        deadlock or a lock wait timeout. See
+        ``ConnectionDB.run_transaction()``.
+
+        Args:
+            function (callable): The work of the transaction.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Any: The return value of the function.
+
+        Example:
+            How to call this method::
+
+                def reprice(ids):
+                    for bike in Bicycle.find_by_sql(sql_with_the_ids):
+                        bike.price = bike.price * 2
+                        bike.save()
+
+                Bicycle.run_transaction(reprice, ids)
+        """
+        return cls._database.run_transaction(function, *args, **kwargs)
+
+    @classmethod
+    def find_by_sql(cls, sql, values=None):
         """Sends the SQL query to the database and returns a list of objects.
 
         Args:
             sql (str): The SQL string to be executed.
+            values (tuple, optional): The values of the ``%s`` placeholders of
+                the SQL string. Defaults to None.
 
         Returns:
             (list[obj] | False): List containing objects from the query result.
@@ -108,7 +248,21 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         """
 
-        result = cls._database.query(sql)
+        result = cls._database.query(sql, values, row_format=cls._row_format)
+        return cls._objects_from(result)
+
+    @classmethod
+    def _objects_from(cls, result):
+        """Turns the result of a query into objects (see ``find_by_sql()``).
+
+        Args:
+            result (list[dict] | list[tuple]): The records (dictionaries or
+                namedtuples).
+
+        Returns:
+            (list[obj] | False): List containing objects from the query result.
+            False if it is empty.
+        """
 
         # If the resulting list is empty:
         if not result:
@@ -123,6 +277,78 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         return object_list
 
+    @classmethod
+    def batch(cls):
+        """Creates a batch of finders to be executed in one round trip. See
+        ``activerecord.query_batch``.
+
+        Returns:
+            QueryBatch: An empty batch that uses the connection of this class.
+
+        Example:
+            The queries of a catalog page::
+
+                with Bicycle.batch() as batch:
+                    count = batch.count_all(Bicycle)
+                    page = batch.find_by_sql(
+                        Bicycle, "SELECT * FROM bicycles LIMIT 20")
+
+                print(count.value, len(page.value))
+        """
+        return QueryBatch(cls._database)
+
+    @classmethod
+    def query_set(cls):
+        """Creates a query of all the records of the table, to be refined
+        (see ``activerecord.query_set``).
+
+        Returns:
+            QuerySet: The lazy query.
+        """
+        return QuerySet(cls)
+
+    @classmethod
+    def where(cls, *args, **conditions):
+        """Starts a lazy query with conditions. See ``QuerySet.where()``.
+
+        Returns:
+            QuerySet: The lazy query.
+
+        Example:
+            How to call this method::
+
+                bikes = Bicycle.where(category='Road').order_by('price').limit(50)
+                print(bikes.count(), [bike.name() for bike in bikes])
+        """
+        return QuerySet(cls).where(*args, **conditions)
+
+    @classmethod
+    def order_by(cls, *columns):
+        """Starts a lazy query with an order. See ``QuerySet.order_by()``.
+
+        Returns:
+            QuerySet: The lazy query.
+        """
+        return QuerySet(cls).order_by(*columns)
+
+    @classmethod
+    def only(cls, *columns):
+        """Starts a lazy query of some columns. See ``QuerySet.only()``.
+
+        Returns:
+            QuerySet: The lazy query.
+        """
+        return QuerySet(cls).only(*columns)
+
+    @classmethod
+    def limit(cls, count):
+        """Starts a lazy query with a limit. See ``QuerySet.limit()``.
+
+        Returns:
+            QuerySet: The lazy query.
+        """
+        return QuerySet(cls).limit(count)
+
     @classmethod
     def find_all(cls):
         """Finds all records in the given database table.
@@ -137,8 +363,194 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
            https://www.tutorialspoint.com/class-method-vs-static-method-in-python#
         """
 
-        sql = "SELECT * FROM " + cls._table_name
-        return cls.find_by_sql(sql)
+        return cls.find_by_sql(cls._find_all_sql())
+
+    @classmethod
+    def _find_all_sql(cls):
+        return "SELECT * FROM " + cls._table_name
+
+    @classmethod
+    def find_in_batches(cls, sql=None, values=None, batch_size=1000):
+        """Streams the result of a query as lists of objects, so tables that do
+        not fit in memory can be processed.
+
+        Only one batch of records (and of objects) exists at a time. See
+        ``ConnectionDB.query_batches()``.
+
+        Args:
+            sql (str, optional): The SELECT to be executed. Defaults to all the
+                records of the table.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            batch_size (int, optional): The number of objects per list.
+                Defaults to 1000.
+
+        Yields:
+            list[obj]: The next batch of objects.
+        """
+
+        if sql is None:
+            sql = "SELECT * FROM " + cls._table_name
+
+        for records in cls._database.query_batches(sql, values, batch_size,
+                                                   cls._row_format):
+            yield [cls._instantiate(record) for record in records]
+
+    @classmethod
+    def find_each(cls, sql=None, values=None, batch_size=1000):
+        """Streams the result of a query one object at a time. The objects are
+        created in batches (see ``find_in_batches()``).
+
+        Args:
+            sql (str, optional): The SELECT to be executed. Defaults to all the
+                records of the table.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            batch_size (int, optional): The number of records fetched per
+                round trip. Defaults to 1000.
+
+        Yields:
+            obj: The next object.
+
+        Example:
+            How to call this method::
+
+                for bike in Bicycle.find_each(batch_size=500):
+                    print(bike.name())
+        """
+        for batch in cls.find_in_batches(sql, values, batch_size):
+            for obj in batch:
+                yield obj
+
+    @classmethod
+    def find_page(cls, after_id=None, limit=50, order_by='id', after_value=None):
+        """Finds the page of records that follows a record, using keyset (seek)
+        pagination instead of ``OFFSET``.
+
+        ``OFFSET 100000`` reads and throws away 100000 records, so deep pages
+        get slower. This method starts where the previous page ended
+        (``WHERE price > %s OR (price = %s AND id > %s)``), so with an index on
+        the ordering column every page costs the same. The ``id`` breaks the
+        ties between records with the same value.
+
+        Args:
+            after_id (int, optional): The ``id`` of the last record of the
+                previous page. Defaults to None (the first page).
+            limit (int, optional): The number of records per page. Defaults
+                to 50.
+            order_by (str, optional): A column of ``_db_columns`` (indexed,
+                without NULLs). A leading ``-`` sorts in descending order.
+                Defaults to ``'id'``.
+            after_value (Any, optional): The value of the ordering column in
+                the last record of the previous page. Defaults to None (it is
+                read with a query by ``after_id``).
+
+        Returns:
+            list[obj]: The objects of the page (empty after the last page).
+
+        Example:
+            How to call this method::
+
+                page = Bicycle.find_page(limit=20, order_by='-price')
+                while page:
+                    render(page)
+                    last = page[-1]
+                    page = Bicycle.find_page(after_id=last.id, limit=20,
+                                             order_by='-price',
+                                             after_value=last.price)
+        """
+
+        query = QuerySet(cls)
+        column = order_by.lstrip('-')
+        descending = order_by.startswith('-')
+        query._check_column(column)
+        comparison = "<" if descending else ">"
+        direction = "-" if descending else ""
+
+        if after_id is not None:
+            if column == 'id':
+                query = query.where("id " + comparison + " %s", after_id)
+            else:
+                if after_value is None:
+                    # A lookup by primary key.
+                    result = cls._database.query(
+                        "SELECT " + column + " AS value FROM " + cls._table_name +
+                        " WHERE id=%s", (after_id,))
+                    if not result:
+                        return []
+                    after_value = result[0]['value']
+                query = query.where(
+                    "{column} {comparison} %s OR ({column} = %s AND id {comparison} %s)".format(
+                        column=column, comparison=comparison),
+                    after_value, after_value, after_id)
+
+        if column == 'id':
+            query = query.order_by(order_by)
+        else:
+            query = query.order_by(order_by, direction + 'id')
+
+        return query.limit(limit).all()
+
+    @classmethod
+    def find_pages(cls, limit=50, order_by='id'):
+        """Iterates over the whole table, one page at a time (see
+        ``find_page()``).
+
+        Args:
+            limit (int, optional): The number of records per page. Defaults
+                to 50.
+            order_by (str, optional): See ``find_page()``. Defaults to
+                ``'id'``.
+
+        Yields:
+            list[obj]: The next page of objects.
+
+        Example:
+            How to call this method::
+
+                for page in Bicycle.find_pages(limit=200, order_by='brand'):
+                    for bike in page:
+                        print(bike.name())
+        """
+        column = order_by.lstrip('-')
+        page = cls.find_page(limit=limit, order_by=order_by)
+        while page:
+            yield page
+            if len(page) < limit:
+                return
+            last = page[-1]
+            page = cls.find_page(after_id=last.id, limit=limit,
+                                 order_by=order_by,
+                                 after_value=getattr(last, column))
+
+    @classmethod
+    def find_columns(cls, sql=None, values=None, dtypes=None, structured=False):
+        """Returns the result of a query as NumPy arrays, one per column,
+        instead of objects. See ``ConnectionDB.query_columns()``.
+
+        Args:
+            sql (str, optional): The SELECT to be executed. Defaults to all the
+                records of the table.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            dtypes (dict, optional): The dtype of some columns, by name.
+                Defaults to None (inferred from the values).
+            structured (bool, optional): Returns one structured array instead
+                of a dictionary of arrays. Defaults to False.
+
+        Returns:
+            (dict[str, numpy.ndarray] | numpy.ndarray): The columns.
+
+        Example:
+            How to call this method::
+
+                columns = Bicycle.find_columns(
+                    "SELECT price, weight_kg, year FROM bicycles")
+                print(columns['price'].mean(), columns['year'].min())
+        """
+        if sql is None:
+            sql = cls._find_all_sql()
+        return cls._database.query_columns(sql, values, dtypes, structured)
 
     @classmethod
     def count_all(cls):
@@ -147,12 +559,18 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
         Returns:
             int: The number of records in the table.
         """
-        sql = "SELECT COUNT(*) FROM " + cls._table_name
-        
+        result_set = cls._database.query(cls._count_all_sql())   # list
+        return cls._count_from(result_set)
+
+    @classmethod
+    def _count_all_sql(cls):
+        return "SELECT COUNT(*) FROM " + cls._table_name
+
+    @staticmethod
+    def _count_from(result_set):
         # The query result is only one line with only one column.
         # Because of that, there is no need for a dictionary.
         # A normal list is enough. The list below contains one dictionary.
-        result_set = cls._database.query(sql)   # list
         row = result_set[0]                     # dict
         for _, value in row.items():
             count = value
@@ -177,9 +595,93 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
            https://flexiple.com/check-if-list-is-empty-python/#section2
         """
 
+        # Inside session(), an object already loaded is returned as it is.
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            obj = identity_map.get(cls, id)
+            if obj is not None:
+                return obj
+
+        result = cls._database.query(cls._find_by_id_sql(id),
+                                     row_format=cls._row_format)
+        return cls._first_from(result)
+
+    @classmethod
+    def find_by_ids(cls, ids, chunk_size=500):
+        """Finds the records of many IDs with ``WHERE id IN (...)`` queries, one
+        per chunk of IDs, instead of one ``find_by_id()`` per ID.
+
+        Inside ``session()``, the objects already loaded are not queried again.
+
+        Args:
+            ids (list[int]): The ID numbers. Repeated IDs get the same object.
+            chunk_size (int, optional): Maximum number of IDs per query (it is
+                also limited by the placeholders allowed by the backend).
+                Defaults to 500.
+
+        Returns:
+            tuple: ``(objects, missing_ids)``. ``objects`` follows the order of
+            ``ids``, without the IDs that were not found. ``missing_ids`` lists
+            them, in the same order (once each).
+
+        Example:
+            How to call this method::
+
+                bikes, missing = Bicycle.find_by_ids(selected_ids)
+                if missing:
+                    print("Not found: {ids}".format(ids=missing))
+        """
+
+        ids = list(ids)
+        keys = [cls._id_key(id) for id in ids]
+
+        found = {}
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            for key in keys:
+                obj = identity_map.get(cls, key)
+                if obj is not None:
+                    found[key] = obj
+
+        pending = []
+        for key in keys:
+            if key not in found and key not in pending:
+                pending.append(key)
+
+        chunk_size = max(1, min(chunk_size,
+                                cls._database.backend.max_placeholders))
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            for obj in QuerySet(cls).where(id__in=chunk):
+                found[cls._id_key(obj.id)] = obj
+
+        objects = []
+        missing = []
+        for id, key in zip(ids, keys):
+            if key in found:
+                objects.append(found[key])
+            elif id not in missing:
+                missing.append(id)
+
+        return objects, missing
+
+    @staticmethod
+    def _id_key(id):
+        # find_by_ids(['26']) finds the record with id=26.
+        try:
+            return int(id)
+        except (TypeError, ValueError):
+            return id
+
+    @classmethod
+    def _find_by_id_sql(cls, id):
         sql = "SELECT * FROM " + cls._table_name + " "
         sql += "WHERE id='{id}'".format(id=cls._database.escape_string(id))
-        object_list = cls.find_by_sql(sql)
+        return sql
+
+    @classmethod
+    def _first_from(cls, result):
+        object_list = cls._objects_from(result)
 
         # Checks if the list is NOT empty (does not need the "not" keyword).
         if object_list:
@@ -193,8 +695,9 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
         the values of the object passed as argument.
 
         Args:
-            record (dict): A dictionary representing a record (row) in the
-                result set.
+            record (dict | tuple): A dictionary or a namedtuple (see
+                ``activerecord.row_formats``) representing a record (row) in
+                the result set.
 
         Returns:
             obj: An instance of the subclass.
@@ -214,21 +717,169 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
            https://stackoverflow.com/a/8542369
         """
 
-        # Creates an instance of the subclass.
-        obj = cls()
+        # Inside session(), a record loaded before keeps its object.
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            if isinstance(record, dict):
+                id = record.get('id')
+            else:
+                id = getattr(record, 'id', None)
+            if id is not None:
+                obj = identity_map.get(cls, id)
+                if obj is not None:
+                    return obj
+
+        if cls._fast_hydration:
+            # The constructor ran once, for the plan of these columns.
+            plan = HydrationPlan.of(cls, record)
+            obj = plan.hydrate(record)
+
+        else:
+            # Creates an instance of the subclass.
+            obj = cls()
+
+            if isinstance(record, dict):
+                items = record.items()
+            else:
+                # namedtuple: the column names are stored once, in its class.
+                items = zip(getattr(record, '_columns', record._fields), record)
 
-        # Loops through the dictionary.
-        for key, value in record.items():
+            # Loops through the columns.
+            for key, value in items:
 
-            # Checks if the instance has the same attribute as the dictionary
-            # key.
-            if hasattr(obj, key):
+                # Checks if the instance has the same attribute as the
+                # dictionary key.
+                if hasattr(obj, key):
 
-                # Sets the object attribute with the value from the key.
-                setattr(obj, key, value)
+                    # Sets the object attribute with the value from the key.
+                    setattr(obj, key, value)
+
+        if cls._fast_hydration and plan.keeps_record:
+            # The saved values are read from the record when they are needed.
+            obj._record = record
+        else:
+            obj._snapshot()
+
+        # Objects of some columns (QuerySet.only()) are not registered, so
+        # find_by_id() never returns an incomplete object.
+        if (identity_map is not None and id is not None and
+                len(record) >= len(cls._db_columns)):
+            identity_map.add(obj)
 
         return obj
 
+    @classmethod
+    def _column_values(cls, obj):
+        """Returns the values of the ``_db_columns`` of an object, in order."""
+        getter = DatabaseObject._column_getters.get(cls)
+        if getter is None:
+            if len(cls._db_columns) == 1:
+                single = operator.attrgetter(cls._db_columns[0])
+                getter = lambda obj: (single(obj),)
+            else:
+                getter = operator.attrgetter(*cls._db_columns)
+            DatabaseObject._column_getters[cls] = getter
+        return getter(obj)
+
+    def _snapshot(self, fields=None):
+        """Records the current values of the columns as the saved ones.
+
+        Args:
+            fields (list[str], optional): Only these columns were saved.
+                Defaults to None (every column).
+        """
+        values = self._column_values(self)
+        if fields is not None:
+            original = self._saved_values()
+            if original is None:
+                # The other columns were never saved: still unknown.
+                return
+            values = tuple(value if column in fields else old
+                           for column, old, value
+                           in zip(self._db_columns, original, values))
+        self._original = values
+        if getattr(self, '_record', None) is not None:
+            self._record = None
+
+    def _saved_values(self):
+        """Returns the values of the ``_db_columns`` when the object was loaded
+        or last saved (None if it never was), copying them from the record it
+        was loaded from the first time."""
+        original = getattr(self, '_original', None)
+        if original is None:
+            record = getattr(self, '_record', None)
+            if record is None:
+                return None
+            if not isinstance(record, dict):
+                # namedtuple (see activerecord.row_formats).
+                record = dict(zip(getattr(record, '_columns', record._fields),
+                                  record))
+            original = tuple(record[column] for column in self._db_columns)
+            self._original = original
+            self._record = None
+        return original
+
+    def changed_fields(self):
+        """Lists the columns (except ``id``) whose values changed since the
+        object was loaded or last saved.
+
+        Values are compared with ``!=``, so a value changed in place (an item
+        appended to a list, for example) is only noticed if the attribute is
+        assigned again.
+
+        Returns:
+            list[str]: The changed columns. Every column for objects that were
+            never saved (created by the constructor).
+
+        Example:
+            How to call this method::
+
+                bike = Bicycle.find_by_id(26)
+                bike.price = 1500
+                print(bike.changed_fields())    # ['price']
+        """
+        original = self._saved_values()
+        if original is None:
+            return [column for column in self._db_columns if column != 'id']
+
+        current = self._column_values(self)
+        return [column for column, old, new
+                in zip(self._db_columns, original, current)
+                if column != 'id' and old != new]
+
+    def has_changes(self):
+        """Checks if any column changed since the object was loaded or last
+        saved.
+
+        Returns:
+            bool: True if ``save()`` has something to write. False otherwise.
+        """
+        return bool(self.changed_fields())
+
+    def _validates(self, *fields):
+        """Used by ``_validate()`` to run only the rules of the fields that
+        changed, so saving an object does not repeat checks (like queries for
+        uniqueness) of values that are already in the database.
+
+        Args:
+            *fields (str): The fields checked by a rule.
+
+        Returns:
+            bool: True if the rule must run: the object was never saved or any
+            of the fields changed. False otherwise.
+
+        Example:
+            Inside ``_validate()``::
+
+                if self._validates('username'):
+                    if not Admin.has_unique_username(self.username, self.id):
+                        self.errors.append('Username not allowed. Try another.')
+        """
+        if self._saved_values() is None:
+            return True
+        changed = self.changed_fields()
+        return any(field in changed for field in fields)
+
     @abstractmethod
     def _validate(self):
         """Every class that extends this one (DatabaseObject) must implement
@@ -254,6 +905,382 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         pass
 
+    @classmethod
+    def bulk_create(cls, objects, batch_size=1000):
+        """Creates the records of many objects with multi-row INSERT statements
+        (``INSERT ... VALUES (...), (...)``), one commit per batch.
+
+        Every object is validated before anything is sent. If any of them has
+        errors, nothing is created and their ``errors`` lists are filled. The
+        batches are also split to fit in the server ``max_allowed_packet`` and
+        in the placeholders allowed per statement (65535 in MySQL). After each
+        batch, the ``id`` of its objects is filled from the id generated for the
+        first row (MySQL gives consecutive ids to the rows of one INSERT).
+
+        Args:
+            objects (list[obj]): New instances of this class (without ``id``).
+            batch_size (int, optional): Maximum number of rows per INSERT.
+                Defaults to 1000.
+
+        Returns:
+            bool: True if every record was created. False otherwise (batches
+            created before a failure remain created, unless this is called
+            inside ``transaction()``, which also turns the commit per batch into
+            one commit at the end of the block).
+
+        Example:
+            How to call this method::
+
+                bikes = [Bicycle(brand='Trek', model=name) for name in names]
+
+                if Bicycle.bulk_create(bikes, batch_size=500):
+                    print("Created up to ID {id}.".format(id=bikes[-1].id))
+
+        References:
+            `13.2.6 INSERT Statement`_
+
+            `15.6.1.6 AUTO_INCREMENT Handling in InnoDB`_
+
+        .. _13.2.6 INSERT Statement:
+           https://dev.mysql.com/doc/refman/8.0/en/insert.html
+        .. _15.6.1.6 AUTO_INCREMENT Handling in InnoDB:
+           https://dev.mysql.com/doc/refman/8.0/en/innodb-auto-increment-handling.html
+        """
+
+        objects = list(objects)
+        if not objects:
+            return True
+
+        valid = True
+        rows = []
+        for obj in objects:
+            obj._before_create()
+            obj._validate()
+            if obj.errors:
+                valid = False
+            rows.append(tuple(obj._sanitized_attributes().values()))
+
+        if not valid:
+            return False
+
+        columns = list(objects[0].attributes().keys())
+        place_holder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        sql_start = "INSERT INTO " + cls._table_name + " ("
+        sql_start += ", ".join(columns) + ") VALUES "
+
+        increment = cls._database.server_variable('auto_increment_increment')
+        identity_map = IdentityMap.current()
+
+        for start, end in cls._packet_batches(rows, batch_size, len(sql_start),
+                                              len(place_holder) + 2):
+            sql = sql_start + ", ".join([place_holder] * (end - start))
+            data = tuple(value for row in rows[start:end] for value in row)
+
+            result = cls._database.execute(sql, values=data)
+            if not result.rows:
+                return False
+
+            first_id = result.insert_id
+            for offset, obj in enumerate(objects[start:end]):
+                obj.id = first_id + offset * increment
+                obj._snapshot()
+                if identity_map is not None:
+                    identity_map.add(obj)
+
+        return True
+
+    @classmethod
+    def _check_fields(cls, fields):
+        """Raises an exception if a field is not in ``_db_columns`` or is
+        ``id``."""
+        for field in fields:
+            if field not in cls._db_columns or field == 'id':
+                message = "Cannot write the column {field} of {table}.".format(
+                    field=field, table=cls._table_name)
+                shared.print_error_message(message)
+                raise Exception(message)
+
+    @classmethod
+    def bulk_update(cls, objects, fields=None, batch_size=1000):
+        """Updates some columns of many records with one statement per batch,
+        one commit per batch::
+
+            UPDATE bicycles SET price = CASE id WHEN %s THEN %s WHEN %s THEN %s
+            END WHERE id IN (%s, %s)
+
+        Every object is validated before anything is sent. If any of them has
+        errors, nothing is updated and their ``errors`` lists are filled. The
+        batches are split like the ones of ``bulk_create()``.
+
+        Args:
+            objects (list[obj]): Instances of this class with an ``id``.
+            fields (list[str], optional): The columns updated. Defaults to None
+                (the columns in the ``changed_fields()`` of any of the
+                objects, so the columns that were not loaded, with
+                ``QuerySet.only()``, are not overwritten with the defaults of
+                the constructor).
+            batch_size (int, optional): Maximum number of records per UPDATE.
+                Defaults to 1000.
+
+        Returns:
+            bool: True if every record was updated. False otherwise (batches
+            updated before a failure remain updated, unless this is called
+            inside ``transaction()``).
+
+        Raises:
+            Exception: If a field is not a column, or an object has no ``id``.
+
+        Example:
+            Repricing the catalog::
+
+                bikes = Bicycle.find_all()
+                for bike in bikes:
+                    bike.price = round(bike.price * decimal.Decimal('1.05'), 2)
+
+                Bicycle.bulk_update(bikes, fields=['price'])
+
+        References:
+            `12.5 Flow Control Functions`_
+
+        .. _12.5 Flow Control Functions:
+           https://dev.mysql.com/doc/refman/8.0/en/flow-control-functions.html
+        """
+
+        objects = list(objects)
+        if fields is None:
+            changed = set()
+            for obj in objects:
+                changed.update(obj.changed_fields())
+            fields = [column for column in cls._db_columns if column in changed]
+        fields = list(fields)
+        cls._check_fields(fields)
+        if not objects or not fields:
+            return True
+
+        valid = True
+        rows = []
+        for obj in objects:
+            if not obj.id or obj.id <= 0:
+                message = "bulk_update() needs saved objects (with an id)."
+                shared.print_error_message(message)
+                raise Exception(message)
+            obj._validate()
+            if obj.errors:
+                valid = False
+            values = [cls._database.escape_string(getattr(obj, field))
+                      for field in fields]
+            # The values of the placeholders of one record: id and value per
+            # CASE, then id in the IN list.
+            rows.append(tuple(item for value in values for item in (obj.id, value))
+                        + (obj.id,))
+
+        if not valid:
+            return False
+
+        sql_size = len(cls._table_name) + sum(len(field) + 30 for field in fields)
+        # " WHEN %s THEN %s" per field and ", %s" in the IN list.
+        row_sql_size = len(" WHEN %s THEN %s") * len(fields) + len(", %s")
+        for start, end in cls._packet_batches(rows, batch_size, sql_size,
+                                              row_sql_size):
+            batch = rows[start:end]
+            cases = []
+            data = []
+            for index, field in enumerate(fields):
+                cases.append(field + " = CASE id" + " WHEN %s THEN %s" * len(batch)
+                             + " END")
+                for row in batch:
+                    data.extend(row[index * 2:index * 2 + 2])
+            data.extend(row[-1] for row in batch)
+
+            sql = "UPDATE " + cls._table_name + " SET " + ", ".join(cases)
+            sql += " WHERE id IN (" + ", ".join(["%s"] * len(batch)) + ")"
+
+            result = cls._database.execute(sql, values=tuple(data))
+            if not result.rows:
+                return False
+
+            for obj in objects[start:end]:
+                obj._snapshot(fields)
+
+        return True
+
+    @classmethod
+    def upsert(cls, objects, conflict_keys=('id',), fields=None,
+               batch_size=1000):
+        """Inserts many records, updating the existing ones instead when they
+        conflict with them, with multi-row statements, one commit per batch
+        (``INSERT ... ON DUPLICATE KEY UPDATE`` in MySQL, ``INSERT ... ON
+        CONFLICT DO UPDATE`` in SQLite; see
+        ``DatabaseBackend.upsert_clause()``).
+
+        Every object is validated before anything is sent, and the objects
+        without an ``id`` are prepared as new records (``_before_create()``).
+        If any of them has errors, nothing is sent and their ``errors`` lists
+        are filled. The batches are split like the ones of ``bulk_create()``.
+
+        Args:
+            objects (list[obj]): Instances of this class. If ``id`` is a
+                conflict key, the objects without an ``id`` are inserted with
+                a generated one.
+            conflict_keys (tuple[str], optional): The columns of the PRIMARY
+                KEY or UNIQUE index that identifies an existing record.
+                Defaults to ``('id',)``. MySQL uses any unique index of the
+                table instead.
+            fields (list[str], optional): The columns updated when a record
+                exists. Defaults to None (every column, except ``id`` and the
+                conflict keys).
+            batch_size (int, optional): Maximum number of rows per statement.
+                Defaults to 1000.
+
+        Returns:
+            bool: True if every record was written. False otherwise (batches
+            written before a failure remain written, unless this is called
+            inside ``transaction()``).
+
+        Raises:
+            Exception: If a conflict key or a field is not a column.
+
+        Note:
+            The ids of the records inserted are not filled in the objects
+            (MySQL does not report them for upserts). Find them by their
+            conflict keys if they are needed.
+
+        Example:
+            Importing a price list::
+
+                bikes = [Bicycle(id=row['id'], brand=row['brand'], ...)
+                         for row in price_list]
+                Bicycle.upsert(bikes, fields=['price'])
+        """
+
+        objects = list(objects)
+        if not objects:
+            return True
+
+        conflict_keys = list(conflict_keys)
+        for key in conflict_keys:
+            if key not in cls._db_columns:
+                message = "Unknown column of {table}: {column}".format(
+                    table=cls._table_name, column=key)
+                shared.print_error_message(message)
+                raise Exception(message)
+
+        columns = list(objects[0].attributes().keys())
+        if 'id' in conflict_keys:
+            columns.insert(0, 'id')
+        if fields is None:
+            fields = [column for column in columns
+                      if column != 'id' and column not in conflict_keys]
+        fields = list(fields)
+        cls._check_fields(fields)
+
+        valid = True
+        rows = []
+        for obj in objects:
+            if not obj.id or obj.id <= 0:
+                obj._before_create()
+            obj._validate()
+            if obj.errors:
+                valid = False
+            row = tuple(obj._sanitized_attributes().values())
+            if 'id' in conflict_keys:
+                # NULL: the database generates the id.
+                row = (obj.id if obj.id and obj.id > 0 else None,) + row
+            rows.append(row)
+
+        if not valid:
+            return False
+
+        place_holder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        sql_start = "INSERT INTO " + cls._table_name + " ("
+        sql_start += ", ".join(columns) + ") VALUES "
+        sql_end = cls._database.backend.upsert_clause(conflict_keys, fields)
+
+        for start, end in cls._packet_batches(rows, batch_size,
+                                              len(sql_start) + len(sql_end),
+                                              len(place_holder) + 2):
+            sql = sql_start + ", ".join([place_holder] * (end - start)) + sql_end
+            data = tuple(value for row in rows[start:end] for value in row)
+
+            result = cls._database.execute(sql, values=data)
+            if not result.rows:
+                return False
+
+            for obj in objects[start:end]:
+                if obj.id and obj.id > 0:
+                    # Existing records: only the fields were updated.
+                    obj._snapshot(fields)
+
+        return True
+
+    @classmethod
+    def _packet_batches(cls, rows, batch_size, sql_size=0, row_sql_size=0):
+        """Splits rows of values into batches that respect the batch size, the
+        server ``max_allowed_packet`` and the placeholder limit of the backend.
+
+        Args:
+            rows (list[tuple]): The values of each row.
+            batch_size (int): Maximum number of rows per batch.
+            sql_size (int, optional): The size of the SQL text that does not
+                depend on the rows. Defaults to 0.
+            row_sql_size (int, optional): The size of the SQL text added for
+                each row (its placeholders and separators). Defaults to 0.
+
+        Yields:
+            tuple: ``(start, end)`` slice indexes of each batch.
+        """
+
+        if not rows:
+            return
+
+        # 90% of the packet, leaving room for the protocol and the SQL text.
+        max_bytes = int(cls._database.server_variable('max_allowed_packet') * 0.9)
+        max_bytes -= sql_size
+        max_placeholders = cls._database.backend.max_placeholders
+        max_rows = max(1, min(batch_size, max_placeholders // max(1, len(rows[0]))))
+
+        start = 0
+        size = 0
+        for index, row in enumerate(rows):
+            row_size = cls._row_size(row) + row_sql_size
+            if index > start and (index - start >= max_rows or
+                                  size + row_size > max_bytes):
+                yield start, index
+                start = index
+                size = 0
+            size += row_size
+
+        yield start, len(rows)
+
+    @staticmethod
+    def _row_size(row):
+        """Estimates the bytes of a row of values in a statement.
+
+        Args:
+            row (tuple): The values.
+
+        Returns:
+            int: The estimated size.
+        """
+        size = 0
+        for value in row:
+            if isinstance(value, (bytes, bytearray)):
+                size += len(value)
+            elif isinstance(value, str):
+                size += len(value.encode('utf8'))
+            else:
+                size += len(str(value))
+            # Separators, quotes and length prefixes.
+            size += 4
+        return size
+
+    def _before_create(self):
+        """Called by ``_create()`` and ``bulk_create()`` before the object is
+        validated. Subclasses can override it to prepare the values that are
+        saved (for example, hashing a password).
+        """
+        pass
+
     def _create(self):
         """Creates a record in the database with the properties' values of the
         current instance in memory.
@@ -285,6 +1312,7 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
            https://flexiple.com/check-if-list-is-empty-python/
         """
 
+        self._before_create()
         self._validate()
         if self.errors:
             return False
@@ -317,19 +1345,28 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         # Prepared statement, stage 2: bind and execute happen inside query().
         # ----------------------------------------------------------------------
-        result = self._database.query(sql, values=data)
-        if result:
-            self.id = self._database.insert_id
+        result = self._database.execute(sql, values=data)
+        if result.rows:
+            self.id = result.insert_id
+            self._snapshot()
+            identity_map = IdentityMap.current()
+            if identity_map is not None:
+                identity_map.add(self)
 
-        return result
+        return result.rows
 
     def _update(self):
         """Updates the database with the properties' values of the current
         instance in memory.
 
+        Only the columns that changed since the object was loaded or last
+        saved are sent (see ``changed_fields()``). If none changed, nothing is
+        validated or sent.
+
         Returns:
             bool: The result of the query() method executed inside this
-            method. True if the update is successful. False otherwise.
+            method. True if the update is successful (or there was nothing to
+            update). False otherwise.
 
         References:
             `How to Convert a List to String in Python`_
@@ -338,6 +1375,12 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
            https://www.simplilearn.com/tutorials/python-tutorial/list-to-string-in-python#how_to_convert_a_list_to_string_in_python
         """
 
+        changed = self.changed_fields()
+        if not changed:
+            # Nothing changed: no round trip.
+            self.errors = []
+            return True
+
         self._validate()
         if self.errors:
             return False
@@ -348,6 +1391,8 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         # Loops through the dictionary:
         for key, value in attributes.items():
+            if key not in changed:
+                continue
             key_list.append("{key}=%s".format(key=key))
             value_list.append(value)
 
@@ -361,6 +1406,8 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
         data = tuple(value_list)
 
         result = self._database.query(sql, values=data)
+        if result:
+            self._snapshot()
         return result
 
     def save(self):
@@ -504,6 +1551,92 @@ class DatabaseObject(ABC):          # Python 3.8.10 (debugged)
 
         result = self._database.query(sql, values=data)
 
+        identity_map = IdentityMap.current()
+        if result and identity_map is not None:
+            identity_map.remove(self)
+
         return result
 
+    # ----- ASYNCIO COUNTERPARTS -----
+    # They run the synchronous methods above in the worker threads of the
+    # AsyncConnectionDB shared by everyone that uses cls._database. The
+    # identity map of session() belongs to the thread that started it, so
+    # these finders do not use it.
+
+    @classmethod
+    def _async_database(cls):
+        """Returns the asynchronous wrapper of ``_database``.
+
+        Returns:
+            AsyncConnectionDB: The shared instance.
+        """
+        return AsyncConnectionDB.of(cls._database)
+
+    @classmethod
+    async def find_by_sql_async(cls, sql, values=None):
+        """Awaitable ``find_by_sql()``.
+
+        Args:
+            sql (str): The SQL string to be executed.
+            values (tuple, optional): The values of the placeholders. Defaults
+                to None.
+
+        Returns:
+            (list[obj] | False): The same as ``find_by_sql()``.
+
+        Example:
+            Several lookups at the same time::
+
+                bikes, admin = await asyncio.gather(
+                    Bicycle.find_all_async(),
+                    Admin.find_by_id_async(1))
+        """
+        return await cls._async_database().run(cls.find_by_sql, sql, values)
+
+    @classmethod
+    async def find_all_async(cls):
+        """Awaitable ``find_all()``.
+
+        Returns:
+            (list[obj] | False): The same as ``find_all()``.
+        """
+        return await cls._async_database().run(cls.find_all)
+
+    @classmethod
+    async def find_by_id_async(cls, id):
+        """Awaitable ``find_by_id()``.
+
+        Args:
+            id (int): The ID number to be used in the query.
+
+        Returns:
+            (obj | False): The same as ``find_by_id()``.
+        """
+        return await cls._async_database().run(cls.find_by_id, id)
+
+    @classmethod
+    async def count_all_async(cls):
+        """Awaitable ``count_all()``.
+
+        Returns:
+            int: The number of records in the table.
+        """
+        return await cls._async_database().run(cls.count_all)
+
+    async def save_async(self):
+        """Awaitable ``save()``.
+
+        Returns:
+            (list[dict] | list[] | bool): The same as ``save()``.
+        """
+        return await self._async_database().run(self.save)
+
+    async def delete_async(self):
+        """Awaitable ``delete()``.
+
+        Returns:
+            (False | obj): The same as ``delete()``.
+        """
+        return await self._async_database().run(self.delete)
+
     # ----- END OF ACTIVE RECORD CODE -----
@@ -19,3 +19,118 @@ DB_PASS = 'userpassword'
 
 DB_NAME = 'databasename'
 """str: The database name."""
+
+DB_ENGINE = 'mysql'
+"""str: ``'mysql'`` (the server above), ``'sqlite'`` (the embedded database
+below, for offline sessions and benchmarks) or ``'replay'`` (the results
+recorded in ``DB_RECORDING``)."""
+
+DB_PATH = ':memory:'
+"""str: The SQLite database file, or ``':memory:'``. Only used by ``'sqlite'``.
+With ``':memory:'``, the connections read uncommitted data: a SELECT sees the
+rows written by a transaction of another thread before it commits (or rolls
+back), unlike the REPEATABLE READ isolation of MySQL. Use a file to keep the
+reads committed."""
+
+DB_SCHEMA = None
+"""str: Path to a SQL script run when the SQLite database is created (for
+example, ``<project_root>/resources/sql/chain_gang_sqlite.sql``)."""
+
+DB_RECORDING = None
+"""str: Path of a JSON Lines file. With ``'mysql'`` or ``'sqlite'``, every
+statement and its result is appended to it. With ``'replay'``, the recorded
+results are served without a database (see ``activerecord.recording``). None
+records nothing. While recording, every result set is read whole, so
+``find_each()`` and ``query_batches()`` do not stream in constant memory."""
+
+DB_RECORDING_REDACTED_COLUMNS = ('confirm_password', 'email',
+                                 'hashed_password', 'password')
+"""tuple[str]: Columns whose values are written to ``DB_RECORDING`` as
+``'[REDACTED]'``. Everything else is recorded in plain text."""
+
+DB_REPLAY_LATENCY = 0.0
+"""float: Seconds every statement waits with ``'replay'``, as if it went to
+the server."""
+
+
+DB_POOL_SIZE = 0
+"""int: Number of pooled connections shared by the threads. 0 keeps a single
+connection (no pool)."""
+
+DB_POOL_TIMEOUT = 30.0
+"""float: Seconds a thread waits for a free pooled connection."""
+
+DB_POOL_RECYCLE = 3600
+"""int: Pooled connections older than this number of seconds are replaced.
+None disables it."""
+
+DB_POOL_PRE_PING = True
+"""bool: Checks if a pooled connection is alive before lending it."""
+
+DB_WARM_UP = False
+"""bool: Starts connecting in a background thread as soon as ``activerecord`` is
+imported. When False, the connection is only opened by the first query."""
+
+DB_STATEMENT_CACHE_SIZE = 32
+"""int: Prepared statements kept per connection for INSERT, UPDATE and DELETE.
+0 disables the cache."""
+
+DB_INSTRUMENTATION = False
+"""bool: Times every query and keeps statistics by query fingerprint (see
+``activerecord.instrumentation``)."""
+
+DB_SLOW_QUERY_THRESHOLD = 0.5
+"""float: Queries slower than this number of seconds go to the slow-query log.
+None disables it."""
+
+DB_SLOW_QUERY_LOG = None
+"""str: Path of the JSON Lines slow-query log. If None, slow queries are only
+counted."""
+
+DB_SLOW_QUERY_LOG_VALUES = False
+"""bool: Writes the SQL text and the values of the slow queries to the log, in
+plain text. When False, only their fingerprints are written (the values can be
+passwords and e-mail addresses)."""
+
+DB_EXPLAIN_THRESHOLD = None
+"""float: Queries slower than this number of seconds are explained once per
+fingerprint and their plans are checked for full table scans and missing
+indexes (see ``activerecord.explain``). None disables it."""
+
+DB_QUERY_CACHE_SIZE = 0
+"""int: Number of SELECT results cached (see ``activerecord.query_cache``). 0
+disables the cache. Only the results read from ``DB_SERVER`` are cached, not
+the ones read from ``DB_REPLICAS``, which can lag behind it."""
+
+DB_QUERY_CACHE_TTL = None
+"""float: Seconds a cached result stays valid. None keeps it until a write to
+its table."""
+
+DB_REPLICAS = []
+"""list: Read replicas of ``DB_SERVER``, as host names (connected to with the
+credentials above) or dictionaries with the ``host``, ``user``, ``password``
+and ``database`` that differ. With ``'sqlite'``, database file paths. SELECTs
+outside transactions go to them. Empty sends everything to ``DB_SERVER``."""
+
+DB_REPLICA_SELECTION = 'round_robin'
+"""str: How a replica is chosen for each read: ``'round_robin'`` or
+``'least_latency'``."""
+
+DB_REPLICA_RETRY_AFTER = 30.0
+"""float: Seconds a replica that could not be connected to is left out."""
+
+DB_READ_YOUR_WRITES = 2.0
+"""float: Seconds after a write during which the reads of the same thread stay
+on ``DB_SERVER``, so they see the write even if the replicas lag behind."""
+
+DB_RETRY_ATTEMPTS = 3
+"""int: Attempts of a statement (outside transactions) that fails with a
+deadlock or a lock wait timeout, or of a read whose connection was lost (see
+``activerecord.errors``). 1 never tries again."""
+
+DB_RETRY_BASE_DELAY = 0.05
+"""float: Longest wait, in seconds, before the second attempt. It doubles after
+every failure, and the actual wait is random (jitter)."""
+
+DB_RETRY_MAX_DELAY = 1.0
+"""float: Longest wait, in seconds, between two attempts."""
@@ -0,0 +1,233 @@
+"""The exceptions raised by ``activerecord`` and the retry of transient errors.
+
+The errors of the database drivers are translated (by the ``error_kind()`` of
+the backend) to the classes below, so callers can tell a deadlock, that may
+succeed if it is tried again, from a schema error, that will not::
+
+    DatabaseError
+     +-- TransientError
+     |    +-- DeadlockError
+     |    +-- LockWaitTimeoutError
+     |    +-- ConnectionLostError
+     |    +-- ConnectionFailedError
+     +-- AccessDeniedError
+     +-- NoSuchTableError
+     +-- BadFieldError
+     +-- IntegrityError
+     +-- PoolTimeoutError
+     +-- QueryError
+
+They all extend ``Exception``, and the messages of the errors that existed
+before are the same.
+
+References:
+    `Exponential Backoff And Jitter`_
+
+    `15.7.5 Deadlocks in InnoDB`_
+
+.. _Exponential Backoff And Jitter:
+   https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+.. _15.7.5 Deadlocks in InnoDB:
+   https://dev.mysql.com/doc/refman/8.0/en/innodb-deadlocks.html
+
+"""
+
+__all__ = [
+    'AccessDeniedError',
+    'BadFieldError',
+    'ConnectionFailedError',
+    'ConnectionLostError',
+    'DatabaseError',
+    'DeadlockError',
+    'IntegrityError',
+    'LockWaitTimeoutError',
+    'NoSuchTableError',
+    'PoolTimeoutError',
+    'QueryError',
+    'RetryPolicy',
+    'TransientError'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import random
+import threading
+import time
+
+
+class DatabaseError(Exception):
+    """Superclass of the errors raised by ``activerecord``.
+
+    Args:
+        message (str): The message shown to the user.
+        original (Exception, optional): The error raised by the driver.
+            Defaults to None.
+
+    Attributes:
+        original (Exception): The error raised by the driver (or None).
+        errno (int): The error code of the driver (or None).
+    """
+
+    def __init__(self, message, original=None):
+        super().__init__(message)
+        self.original = original
+        self.errno = getattr(original, 'errno', None)
+
+
+class TransientError(DatabaseError):
+    """An error that may not happen if the same work is tried again."""
+
+
+class DeadlockError(TransientError):
+    """The transaction was chosen as the victim of a deadlock and was rolled
+    back (``ER_LOCK_DEADLOCK``)."""
+
+
+class LockWaitTimeoutError(TransientError):
+    """A lock was not granted in time (``ER_LOCK_WAIT_TIMEOUT``, or
+    ``database is locked`` in SQLite). Only the statement was rolled back."""
+
+
+class ConnectionLostError(TransientError):
+    """The connection broke while the statement was executed
+    (``CR_SERVER_LOST``, ``CR_SERVER_GONE_ERROR``). A write may or may not have
+    been applied."""
+
+
+class ConnectionFailedError(TransientError):
+    """The server could not be connected to."""
+
+
+class AccessDeniedError(DatabaseError):
+    """The credentials or the database name were not accepted."""
+
+
+class NoSuchTableError(DatabaseError):
+    """The table does not exist (``ER_NO_SUCH_TABLE``)."""
+
+
+class BadFieldError(DatabaseError):
+    """The column does not exist in the table (``ER_BAD_FIELD_ERROR``)."""
+
+
+class IntegrityError(DatabaseError):
+    """A constraint was violated: duplicate key, foreign key or NOT NULL."""
+
+
+class PoolTimeoutError(DatabaseError):
+    """No pooled connection became free in time."""
+
+
+class QueryError(DatabaseError):
+    """Any other error executing a statement."""
+
+
+ERRORS = {
+    'deadlock': (DeadlockError, "Deadlock found when trying to get lock."),
+    'lock_wait_timeout': (LockWaitTimeoutError, "Lock wait timeout exceeded."),
+    'connection_lost': (ConnectionLostError,
+                        "The connection to the database was lost."),
+    'no_such_table': (NoSuchTableError, "Database table does not exist."),
+    'bad_field': (BadFieldError, "Column does not exist in table."),
+    'integrity': (IntegrityError, "The data violates a constraint of the table.")
+}
+"""dict: The exception class and the message of every kind returned by
+``DatabaseBackend.error_kind()``. Other errors are ``QueryError``."""
+
+
+def translate_error(err, kind):
+    """Creates the exception that corresponds to an error of a driver.
+
+    Args:
+        err (Exception): The error raised by the driver.
+        kind (str): What ``DatabaseBackend.error_kind()`` returned for it.
+
+    Returns:
+        DatabaseError: The exception to be raised.
+    """
+    error_class, message = ERRORS.get(
+        kind, (QueryError, "There was an error executing the query."))
+    return error_class(message, err)
+
+
+class RetryPolicy(object):
+    """Tries a function again when it raises a transient error, waiting a
+    random time that grows exponentially ("full jitter") between the attempts,
+    so the writers that collided do not collide again.
+
+    Args:
+        attempts (int, optional): Maximum number of attempts (1 never tries
+            again). Defaults to 3.
+        base_delay (float, optional): Seconds of the longest wait after the
+            first failure. It doubles after every failure. Defaults to 0.05.
+        max_delay (float, optional): Longest wait, in seconds. Defaults to 1.0.
+        retry_on (tuple[type], optional): The exceptions that are tried again.
+            Defaults to ``(DeadlockError, LockWaitTimeoutError)``.
+
+    Attributes:
+        retries (int): How many times a function was tried again.
+
+    Example:
+        How to use this class directly::
+
+            policy = RetryPolicy(attempts=5)
+            policy.run(database.query, sql, values)
+    """
+
+    def __init__(self, attempts=3, base_delay=0.05, max_delay=1.0,
+                 retry_on=None):
+        if retry_on is None:
+            retry_on = (DeadlockError, LockWaitTimeoutError)
+
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = tuple(retry_on)
+
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def delay(self, failures):
+        """Returns the time to wait after a number of failures.
+
+        Args:
+            failures (int): The failures so far (1 after the first).
+
+        Returns:
+            float: Seconds, between 0 and the exponential bound.
+        """
+        bound = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+        return random.uniform(0, bound)
+
+    def run(self, function, *args, retry_on=None, **kwargs):
+        """Calls a function until it succeeds, raises an error that is not
+        tried again or runs out of attempts.
+
+        Args:
+            function (callable): The function to be called.
+            *args: Positional arguments of the function.
+            retry_on (tuple[type], optional): Replaces the exceptions that are
+                tried again. Defaults to None (``self.retry_on``).
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Any: The return value of the function.
+
+        Raises:
+            Exception: The last error, when the attempts run out.
+        """
+        if retry_on is None:
+            retry_on = self.retry_on
+
+        failures = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except retry_on:
+                failures += 1
+                if failures >= self.attempts:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.delay(failures))
@@ -0,0 +1,303 @@
+"""Execution plans of the slow queries, captured automatically.
+
+An ``ExplainCapture`` subscribes to the ``after_query`` event of a
+``QueryInstrumentation``. The first time a query of a fingerprint takes at
+least ``threshold`` seconds, its plan is asked for (``EXPLAIN FORMAT=JSON`` in
+MySQL, ``EXPLAIN QUERY PLAN`` in SQLite) and kept with the fingerprint,
+together with the problems found in it:
+
+``full table scan on <table>``
+    Every row of the table is read.
+
+``no index on <table> for: <condition>``
+    A table is filtered without an index (``WHERE username=`` on a table
+    without ``index_username``).
+
+``index not used on <table> for: <condition>``
+    There is an index for the condition, but the optimizer did not choose it.
+
+``full index scan on <table>``, ``filesort``, ``temporary table``
+    Sorting or grouping that is not served by an index.
+
+The EXPLAIN runs in a background (daemon) thread, on a connection of its own:
+the query that crossed the threshold only queues it, so its connection goes
+back to the pool without waiting, and the EXPLAIN is not seen by the
+instrumentation. ``wait()`` returns when the queued plans are ready. The
+statements sent together by ``ConnectionDB.query_many()`` are not explained
+(EXPLAIN takes one statement). The SQL kept with each plan has its literal values replaced by ``%s``, whether
+they were bound or written in the text. ``report()``
+returns the plans as JSON with sorted keys and without timings, so the reports
+of two releases can be compared with ``diff``.
+
+Example:
+    How to use this class::
+
+        explain = ExplainCapture(threshold=0.1)
+        explain.attach(DatabaseObject._database)
+
+        Admin.find_by_username('admin')
+
+        explain.wait()
+        for fingerprint, entry in explain.plans().items():
+            print(fingerprint, entry['problems'])
+        explain.write_report('explain-1.4.0.json')
+
+    Or, in db_credentials.py::
+
+        DB_EXPLAIN_THRESHOLD = 0.1
+
+References:
+    `8.8.2 EXPLAIN Output Format`_
+
+    `EXPLAIN QUERY PLAN`_
+
+.. _8.8.2 EXPLAIN Output Format:
+   https://dev.mysql.com/doc/refman/8.0/en/explain-output.html
+.. _EXPLAIN QUERY PLAN:
+   https://www.sqlite.org/eqp.html
+
+"""
+
+__all__ = ['ExplainCapture']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import json
+import os
+import queue
+import re
+import threading
+
+import shared
+from . instrumentation import QueryInstrumentation
+
+
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+"""tuple[str]: The first words of the statements that are explained."""
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+"""re.Pattern: Quoted strings and numbers (not the digits inside names)."""
+
+
+class ExplainCapture(object):
+    """Explains the queries that cross a latency threshold.
+
+    Args:
+        threshold (float, optional): Queries that take at least this number of
+            seconds are explained. Defaults to 0.5.
+        backend (DatabaseBackend, optional): Opens the connection that runs the
+            EXPLAIN statements. Defaults to the backend of the ``ConnectionDB``
+            given to ``attach()``.
+
+    Attributes:
+        explained (int): EXPLAIN statements executed.
+    """
+
+    def __init__(self, threshold=0.5, backend=None):
+        self.threshold = threshold
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._plans = {}
+        # Fingerprints whose EXPLAIN is queued or running.
+        self._pending = set()
+        # The statements to explain, for the thread of _work().
+        self._queue = None
+        self._pid = os.getpid()
+        self._instrumentation = None
+        self.explained = 0
+
+    def attach(self, database):
+        """Starts explaining the slow queries of a ``ConnectionDB``. An
+        instrumentation is created for it, if it has none.
+
+        Args:
+            database (ConnectionDB): The instance whose queries are explained.
+        """
+        if self.backend is None:
+            self.backend = database.backend
+        if database.instrumentation is None:
+            database.instrumentation = QueryInstrumentation()
+
+        self.detach()
+        self._instrumentation = database.instrumentation
+        self._instrumentation.subscribe('after_query', self.capture)
+
+    def detach(self):
+        """Stops explaining queries. The thread of the EXPLAIN statements
+        finishes the ones already queued and closes its connection."""
+        if self._instrumentation is not None:
+            self._instrumentation.unsubscribe('after_query', self.capture)
+            self._instrumentation = None
+
+        with self._lock:
+            self._forked()
+            work, self._queue = self._queue, None
+        if work is not None:
+            work.put(None)
+
+    def wait(self):
+        """Waits until the EXPLAIN statements queued so far have run, so
+        ``plans()`` has them."""
+        with self._lock:
+            self._forked()
+            work = self._queue
+        if work is not None:
+            work.join()
+
+    def _forked(self):
+        """Forgets the thread of the parent process (it does not exist in a
+        forked child) and the EXPLAIN statements it had queued, so they are
+        captured again. Must be called with the lock held."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._queue = None
+            for fingerprint in self._pending:
+                self._plans.pop(fingerprint, None)
+            self._pending = set()
+
+    def capture(self, event):
+        """Explains a query, if it is slow and its fingerprint was not explained
+        yet. It is the ``after_query`` callback.
+
+        Args:
+            event (QueryEvent): The query that was executed.
+        """
+        if (event.error is not None or event.duration is None or
+                event.duration < self.threshold):
+            return
+
+        if event.statements > 1:
+            # query_many(): EXPLAIN rejects several statements.
+            return
+
+        words = event.sql.split(None, 1)
+        if not words or words[0].upper() not in _EXPLAINABLE:
+            return
+
+        with self._lock:
+            self._forked()
+            entry = self._plans.get(event.fingerprint)
+            if entry is not None:
+                entry['slow_queries'] += 1
+                entry['max_time'] = max(entry['max_time'], event.duration)
+                return
+
+            # Claimed: the other slow queries of the fingerprint are only
+            # counted while this one is explained.
+            entry = {
+                'sql': _LITERAL.sub('%s', event.sql),
+                'engine': self.backend.name,
+                'plan': None,
+                'problems': [],
+                'slow_queries': 1,
+                'max_time': event.duration
+            }
+            self._plans[event.fingerprint] = entry
+            self._pending.add(event.fingerprint)
+
+            if self._queue is None:
+                self._queue = queue.Queue()
+                thread = threading.Thread(target=self._work,
+                                          args=(self._queue,))
+                thread.daemon = True
+                thread.start()
+            self._queue.put((event.fingerprint, event.sql, event.values, entry))
+
+    def _work(self, work):
+        """Runs the queued EXPLAIN statements, one at a time, on a connection
+        of this thread, until ``detach()`` queues None.
+
+        Args:
+            work (queue.Queue): ``(fingerprint, sql, values, entry)`` tuples.
+        """
+        connection = None
+        while True:
+            item = work.get()
+            if item is None:
+                if connection is not None:
+                    self.backend.close(connection)
+                work.task_done()
+                return
+
+            fingerprint, sql, values, entry = item
+            try:
+                if connection is None:
+                    connection = self.backend.connect()
+                plan, problems = self.backend.explain(connection, sql, values)
+            except Exception as err:
+                shared.print_error_message(err)
+                if (connection is not None and
+                        not self.backend.is_connected(connection)):
+                    self.backend.close(connection)
+                    connection = None
+                plan, problems = None, ['EXPLAIN failed: {error}'.format(
+                    error=err)]
+            else:
+                with self._lock:
+                    self.explained += 1
+
+            with self._lock:
+                entry['plan'] = plan
+                entry['problems'] = problems
+                self._pending.discard(fingerprint)
+            work.task_done()
+
+    def plans(self):
+        """Returns the plans captured so far.
+
+        Returns:
+            dict: By fingerprint, a dictionary with the ``sql`` that was
+            explained (its literal values replaced by ``%s``), the ``engine``,
+            the ``plan``, the ``problems`` (list of str), ``slow_queries`` and
+            ``max_time`` (seconds). The EXPLAIN statements still queued or
+            running are left out (see ``wait()``).
+        """
+        with self._lock:
+            return {fingerprint: dict(entry, problems=list(entry['problems']))
+                    for fingerprint, entry in self._plans.items()
+                    if fingerprint not in self._pending}
+
+    def problems(self):
+        """Returns the fingerprints whose plans have problems.
+
+        Returns:
+            dict[str, list[str]]: The problems, by fingerprint.
+        """
+        return {fingerprint: entry['problems']
+                for fingerprint, entry in self.plans().items()
+                if entry['problems']}
+
+    def report(self, timings=False):
+        """Returns the plans as a JSON document that can be compared between
+        releases.
+
+        Args:
+            timings (bool, optional): Includes ``slow_queries`` and
+                ``max_time``, which change from run to run. Defaults to False.
+
+        Returns:
+            str: The JSON document, with sorted keys and indented.
+        """
+        plans = self.plans()
+        if not timings:
+            for entry in plans.values():
+                del entry['slow_queries']
+                del entry['max_time']
+        return json.dumps(plans, indent=2, sort_keys=True, default=str)
+
+    def write_report(self, path, timings=False):
+        """Writes ``report()`` to a file.
+
+        Args:
+            path (str): The file (replaced if it exists).
+            timings (bool, optional): See ``report()``. Defaults to False.
+        """
+        with open(path, 'w') as report_file:
+            report_file.write(self.report(timings) + "\n")
+
+    def reset(self):
+        """Forgets the plans, so the next slow queries are explained again."""
+        with self._lock:
+            self._plans = {}
@@ -0,0 +1,287 @@
+"""Fast creation of model objects from records.
+
+``DatabaseObject._instantiate()`` used to call the constructor of the model for
+every record (``Bicycle.__init__`` reads every keyword argument and converts
+the weight to ``decimal.Decimal``) and then ``hasattr()`` and ``setattr()`` for
+every column. A ``HydrationPlan`` does that work once per class and set of
+columns:
+
+1. The constructor runs once, creating a prototype. Its attributes are the
+   defaults of every object.
+2. Every column is matched to an attribute: a plain instance attribute (copied
+   straight into the ``__dict__`` of the object) or a data descriptor, like a
+   ``property`` with a setter or a slot (set with ``setattr()``, so its code
+   still runs). Columns that are not attributes are ignored, as before.
+
+Then every record becomes an object with ``cls.__new__(cls)`` and two
+``dict.update()`` calls. The attributes set through descriptors are assigned
+by a function compiled for the plan (as ``dataclasses`` does for
+``__init__``), which is faster than a loop of ``setattr()``.
+
+``slotted_class()`` creates a subclass of a model whose instance attributes are
+``__slots__``, so the objects need no dictionary (less memory for large
+catalogs). Its objects are created through the same plans.
+
+References:
+    `3.3.2.4. __slots__`_
+
+.. _3.3.2.4. __slots__:
+   https://docs.python.org/3.7/reference/datamodel.html#slots
+
+"""
+
+__all__ = [
+    'HydrationPlan',
+    'slotted_class'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import copy
+import datetime
+import decimal
+import operator
+import types
+
+
+_IMMUTABLE = (type(None), bool, int, float, complex, str, bytes,
+              decimal.Decimal, tuple, frozenset, datetime.date, datetime.time,
+              datetime.timedelta)
+"""tuple[type]: Defaults of these types are shared by the objects. Any other
+default (a list, for example) is copied for every object."""
+
+_plans = {}
+"""dict: The plans, by class, columns and kind of record."""
+
+_slotted_classes = {}
+"""dict: The classes created by ``slotted_class()``, by model."""
+
+
+def _slot_names(cls):
+    """Returns the names of the slots of a class and of its superclasses."""
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots
+                     if name not in ('__dict__', '__weakref__'))
+    return names
+
+
+def _instance_state(obj):
+    """Returns the instance attributes of an object (in its ``__dict__`` and
+    in its slots)."""
+    state = dict(getattr(obj, '__dict__', {}))
+    for name in _slot_names(type(obj)):
+        try:
+            state[name] = getattr(obj, name)
+        except AttributeError:
+            # The slot was never set.
+            pass
+    return state
+
+
+def _data_descriptor(cls, name):
+    """Returns the data descriptor (property, slot...) of an attribute of a
+    class, or None if it is a plain attribute."""
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            attribute = klass.__dict__[name]
+            if hasattr(type(attribute), '__set__'):
+                return attribute
+            return None
+    return None
+
+
+class HydrationPlan(object):
+    """How the records with a set of columns become objects of a class.
+
+    Args:
+        cls (type): The model (a subclass of ``DatabaseObject``).
+        columns (tuple[str]): The columns of the records, in order.
+        by_name (bool): The records are dictionaries (True) or tuples (False).
+    """
+
+    def __init__(self, cls, columns, by_name):
+        self.cls = cls
+        prototype = cls()
+        state = _instance_state(prototype)
+
+        # Defaults: shared (immutable) or copied, straight into __dict__ or
+        # through a descriptor.
+        self.defaults = {}
+        self.descriptor_defaults = []
+        for name, value in state.items():
+            descriptor = _data_descriptor(cls, name) is not None
+            mutable = not isinstance(value, _IMMUTABLE)
+            if descriptor or mutable:
+                self.descriptor_defaults.append((name, value, mutable, descriptor))
+            else:
+                self.defaults[name] = value
+
+        # Columns: straight into __dict__ or through a descriptor.
+        self.names = []
+        sources = []
+        self.setters = []
+        for position, column in enumerate(columns):
+            source = column if by_name else position
+            if _data_descriptor(cls, column) is not None:
+                self.setters.append((source, column))
+            elif column in state or hasattr(prototype, column):
+                self.names.append(column)
+                sources.append(source)
+
+        if not by_name and sources == list(range(len(columns))):
+            # Every column, in order: the tuple itself has the values.
+            self.getter = None
+        elif len(sources) == 1:
+            single = operator.itemgetter(sources[0])
+            self.getter = lambda record: (single(record),)
+        elif sources:
+            self.getter = operator.itemgetter(*sources)
+        else:
+            self.getter = lambda record: ()
+
+        # The attributes of every column of the model keep the values of the
+        # record as they are (plain attributes and slots, not properties), so
+        # the record itself is what DatabaseObject.changed_fields() compares.
+        raw_columns = set(self.names)
+        raw_columns.update(column for _, column in self.setters
+                           if isinstance(_data_descriptor(cls, column),
+                                         types.MemberDescriptorType))
+        self.keeps_record = raw_columns.issuperset(
+            getattr(cls, '_db_columns', ()))
+
+        self.uses_dict = bool(self.defaults or self.names or any(
+            not descriptor for _, _, _, descriptor in self.descriptor_defaults))
+        self.assign = self._compile_assign()
+
+    def _compile_assign(self):
+        """Compiles ``assign(obj, record)``, which sets the attributes that go
+        through descriptors: ``obj.price = record[7]`` and so on.
+
+        Returns:
+            callable: The function (None if there is nothing to assign).
+        """
+        defaults = []
+        lines = []
+        for name, value, mutable, descriptor in self.descriptor_defaults:
+            if descriptor:
+                lines.append("    obj.{name} = {copy}(defaults[{index}])".format(
+                    name=name, index=len(defaults), copy='copy' if mutable else ''))
+                defaults.append(value)
+        for source, name in self.setters:
+            lines.append("    obj.{name} = record[{source!r}]".format(
+                name=name, source=source))
+        if not lines:
+            return None
+
+        names = [name for name, _, _, _ in self.descriptor_defaults]
+        names += [name for _, name in self.setters]
+        if not all(name.isidentifier() for name in names):
+            # Not valid in the source code: setattr() does the same.
+            def assign(obj, record):
+                for name, value, mutable, descriptor in self.descriptor_defaults:
+                    if descriptor:
+                        setattr(obj, name, copy.copy(value) if mutable else value)
+                for source, name in self.setters:
+                    setattr(obj, name, record[source])
+            return assign
+
+        namespace = {'copy': copy.copy, 'defaults': defaults}
+        source = "def assign(obj, record):\n" + "\n".join(lines) + "\n"
+        exec(source, namespace)
+        return namespace['assign']
+
+    @staticmethod
+    def of(cls, record):
+        """Returns the plan of a class for a record, creating it on the first
+        call.
+
+        Args:
+            cls (type): The model.
+            record (dict | tuple): A dictionary or a namedtuple (see
+                ``activerecord.row_formats``).
+
+        Returns:
+            HydrationPlan: The plan.
+        """
+        if isinstance(record, dict):
+            key = (cls, tuple(record), True)
+        else:
+            key = (cls, getattr(record, '_columns', record._fields), False)
+
+        plan = _plans.get(key)
+        if plan is None:
+            plan = HydrationPlan(cls, key[1], key[2])
+            _plans[key] = plan
+        return plan
+
+    def hydrate(self, record):
+        """Creates the object of a record without calling the constructor.
+
+        Args:
+            record (dict | tuple): A record with the columns of the plan.
+
+        Returns:
+            obj: The object, as if created by the constructor and filled with
+            ``setattr()``.
+        """
+        obj = self.cls.__new__(self.cls)
+
+        if self.uses_dict:
+            state = obj.__dict__
+            state.update(self.defaults)
+            for name, value, mutable, descriptor in self.descriptor_defaults:
+                if not descriptor:
+                    state[name] = copy.copy(value)
+            if self.getter is None:
+                state.update(zip(self.names, record))
+            else:
+                state.update(zip(self.names, self.getter(record)))
+
+        if self.assign is not None:
+            self.assign(obj, record)
+
+        return obj
+
+
+def slotted_class(cls):
+    """Returns a subclass of a model whose instance attributes (the ones its
+    constructor sets) are ``__slots__``, creating it on the first call.
+
+    Attributes that are not slots (like ``errors``, set by ``_validate()``)
+    still work, in a dictionary created only for the objects that use them.
+
+    Args:
+        cls (type): The model.
+
+    Returns:
+        type: The subclass, named ``Slotted<Model>``.
+
+    Example:
+        How to call this function::
+
+            SlottedBicycle = slotted_class(Bicycle)
+            bikes = SlottedBicycle.find_all()
+    """
+    slotted = _slotted_classes.get(cls)
+    if slotted is None:
+        slots = tuple(name for name in _instance_state(cls())
+                      if _data_descriptor(cls, name) is None)
+        # Set by DatabaseObject._instantiate() for every object loaded.
+        slots += ('_original', '_record')
+        if not cls.__weakrefoffset__:
+            # The identity map keeps weak references.
+            slots += ('__weakref__',)
+        namespace = {
+            '__slots__': slots,
+            '__module__': cls.__module__,
+            '__doc__': cls.__doc__
+        }
+        # type(cls) keeps the metaclass (ABCMeta).
+        slotted = type(cls)('Slotted' + cls.__name__, (cls,), namespace)
+        _slotted_classes[cls] = slotted
+    return slotted
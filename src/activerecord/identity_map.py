@@ -0,0 +1,161 @@
+"""An identity map: one object per record, inside a session.
+
+While a session is active, the objects created by the finders of
+``DatabaseObject`` are registered by ``(class, id)``. ``find_by_id()`` returns
+the registered object without querying, and the other finders return the
+registered object instead of a new one for the records that were already
+loaded (its attributes are not overwritten, so changes not saved yet are
+kept).
+
+By default, the map keeps weak references, so an object leaves it when the
+code stops using it. With ``max_size``, it keeps strong references to the
+most recently used objects instead, and evicts the least recently used.
+
+Sessions belong to the thread that started them, and a session started inside
+another one replaces it until it ends. The ``*_async`` finders run in the
+worker threads of ``AsyncConnectionDB``, so they never see the session of the
+caller.
+
+Example:
+    How to use a session::
+
+        with Bicycle.session():
+            for item in catalog_items:
+                bike = Bicycle.find_by_id(item.bicycle_id)   # Queries once per id.
+                layout.add(bike)
+
+References:
+    `Identity Map`_
+
+.. _Identity Map:
+   https://martinfowler.com/eaaCatalog/identityMap.html
+
+"""
+
+__all__ = ['IdentityMap']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import collections
+import threading
+import weakref
+
+
+_local = threading.local()
+"""threading.local: The active ``IdentityMap`` of each thread (``current``)."""
+
+
+def _key(cls, id):
+    # find_by_id('26') and the record with id=26 are the same object.
+    try:
+        return cls, int(id)
+    except (TypeError, ValueError):
+        return cls, id
+
+
+class IdentityMap(object):
+    """Maps ``(class, id)`` to the object loaded for that record. It is a
+    context manager that activates the map for the current thread.
+
+    Args:
+        max_size (int, optional): Keeps strong references to this number of
+            objects, evicting the least recently used. Defaults to None (weak
+            references, no limit).
+
+    Attributes:
+        hits (int): Lookups that found an object.
+        misses (int): Lookups that did not.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        if max_size is None:
+            self._objects = weakref.WeakValueDictionary()
+        else:
+            self._objects = collections.OrderedDict()
+        self._previous = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def current():
+        """Returns the map of the session of the current thread.
+
+        Returns:
+            (IdentityMap | None): The active map. None outside sessions.
+        """
+        return getattr(_local, 'identity_map', None)
+
+    def __enter__(self):
+        self._previous.append(IdentityMap.current())
+        _local.identity_map = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.identity_map = self._previous.pop()
+        return False
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, cls, id):
+        """Looks for the object of a record.
+
+        Args:
+            cls (type): The class of the object.
+            id (int): The id of the record.
+
+        Returns:
+            (obj | None): The object. None if it was not loaded.
+        """
+        key = _key(cls, id)
+        obj = self._objects.get(key)
+        if obj is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.max_size is not None:
+            self._objects.move_to_end(key)
+        return obj
+
+    def add(self, obj):
+        """Registers an object by its class and id.
+
+        Args:
+            obj (DatabaseObject): An object with an id.
+        """
+        key = _key(type(obj), obj.id)
+        self._objects[key] = obj
+        if self.max_size is not None:
+            self._objects.move_to_end(key)
+            while len(self._objects) > self.max_size:
+                self._objects.popitem(last=False)
+
+    def remove(self, obj):
+        """Forgets an object (for example, after it was deleted).
+
+        Args:
+            obj (DatabaseObject): The object.
+        """
+        key = _key(type(obj), obj.id)
+        if self._objects.get(key) is obj:
+            del self._objects[key]
+
+    def clear(self):
+        """Forgets every object, so the next finders query again."""
+        self._objects.clear()
+
+    def statistics(self):
+        """Returns the usage of the map.
+
+        Returns:
+            dict: ``objects``, ``max_size``, ``hits`` and ``misses``.
+        """
+        return {
+            'objects': len(self._objects),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
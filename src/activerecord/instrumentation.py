@@ -0,0 +1,355 @@
+"""Per-query timing, statistics and slow-query log for ``ConnectionDB``.
+
+Every query executed by an instrumented ``ConnectionDB`` is timed and grouped
+by its fingerprint: the SQL text with the literal values replaced by ``?``, so
+``WHERE id='26'`` and ``WHERE id='27'`` are counted together. Queries slower
+than a threshold are appended to a JSON Lines file, and callers can subscribe
+to the ``before_query`` and ``after_query`` events.
+
+The slow-query log keeps only the fingerprint of each query by default: the
+SQL text and the values can contain personal data and credentials (the
+``hashed_password`` of ``Admin``, for example), and the file stays on disk.
+``log_values=True`` adds them.
+
+Example:
+    How to instrument the connection of the models::
+
+        instrumentation = QueryInstrumentation(slow_query_threshold=0.1,
+                                               slow_query_log='slow.jsonl')
+        DatabaseObject._database.instrumentation = instrumentation
+
+        Bicycle.find_all()
+
+        for fingerprint, stats in instrumentation.statistics().items():
+            print(fingerprint, stats['count'], stats['total_time'])
+
+References:
+    `JSON Lines`_
+
+    `pt-fingerprint`_
+
+.. _JSON Lines:
+   https://jsonlines.org/
+.. _pt-fingerprint:
+   https://docs.percona.com/percona-toolkit/pt-fingerprint.html
+
+"""
+
+__all__ = [
+    'QueryEvent',
+    'QueryInstrumentation',
+    'fingerprint'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import bisect
+import datetime
+import functools
+import json
+import re
+import threading
+
+import shared
+
+
+_FINGERPRINT_PATTERNS = [
+    # Quoted strings.
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r'"(?:[^"\\]|\\.|"")*"'), "?"),
+    # Placeholders and numbers (not the digits inside names, like sp_1).
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])"), "?"),
+    # Lists of values: IN (?, ?, ?) and VALUES (?, ?), (?, ?).
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*"),
+     "(?+)"),
+    (re.compile(r"\s+"), " ")
+]
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Normalizes a SQL statement, so the executions of the same query with
+    different values are grouped together.
+
+    Args:
+        sql (str): The statement.
+
+    Returns:
+        str: The statement in lower case, without literal values, with lists of
+        values collapsed to ``(?+)`` and with single spaces.
+
+    Example:
+        How to call this function::
+
+            fingerprint("SELECT * FROM bicycles WHERE id='26'")
+            # select * from bicycles where id=?
+    """
+    for pattern, replacement in _FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip().lower()
+
+
+def estimate_bytes(rows):
+    """Estimates the size of the values of a result set.
+
+    Args:
+        rows (list): Rows as dictionaries or tuples.
+
+    Returns:
+        int: The approximate number of bytes received.
+    """
+    size = 0
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            if value is None:
+                size += 1
+            elif isinstance(value, (bytes, bytearray, str)):
+                size += len(value)
+            else:
+                size += 8
+    return size
+
+
+class QueryEvent(object):
+    """Describes one query for the subscribers of ``QueryInstrumentation``.
+
+    Attributes:
+        sql (str): The statement.
+        values (tuple): The values of the placeholders (or None).
+        fingerprint (str): See ``fingerprint()``.
+        duration (float): Seconds spent in the database (None before it runs).
+        result (list[dict] | bool): What the query returned (None before it
+            runs).
+        rows (int): Records returned by a SELECT.
+        bytes (int): Estimated size of the records returned.
+        affected_rows (int): See ``ConnectionDB.affected_rows``.
+        insert_id (int): See ``ConnectionDB.insert_id``.
+        error (Exception): The error raised by the driver, if any.
+        statements (int): Statements sent together (``sql`` joins them with
+            ``;``), by ``ConnectionDB.query_many()``.
+    """
+
+    def __init__(self, sql, values, statements=1):
+        self.sql = sql
+        self.values = values
+        self.statements = statements
+        self.fingerprint = fingerprint(sql)
+        self.duration = None
+        self.result = None
+        self.rows = 0
+        self.bytes = 0
+        self.affected_rows = 0
+        self.insert_id = 0
+        self.error = None
+
+
+class QueryInstrumentation(object):
+    """Collects the statistics of the queries and writes the slow-query log.
+
+    Args:
+        slow_query_threshold (float, optional): Queries that take at least this
+            number of seconds are logged. None disables the log. Defaults to
+            None.
+        slow_query_log (str, optional): Path of the JSON Lines file that
+            receives the slow queries. If None, they are only counted.
+            Defaults to None.
+        buckets (tuple[float], optional): Upper bounds (in seconds) of the
+            latency histogram. A last bucket counts everything above them.
+            Defaults to ``DEFAULT_BUCKETS``.
+        log_values (bool, optional): Writes the SQL text and the values of the
+            slow queries to the log, in plain text. Defaults to False (only
+            the fingerprint, without literal values).
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    """tuple[float]: Upper bounds of the histogram buckets, in seconds."""
+
+    EVENTS = ('before_query', 'after_query')
+    """tuple[str]: The events that can be subscribed."""
+
+    def __init__(self, slow_query_threshold=None, slow_query_log=None,
+                 buckets=None, log_values=False):
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_query_log = slow_query_log
+        self.log_values = log_values
+        self.buckets = tuple(buckets or self.DEFAULT_BUCKETS)
+
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._statistics = {}
+        self._subscribers = {event: [] for event in self.EVENTS}
+        self.slow_queries = 0
+
+    def subscribe(self, event, callback):
+        """Calls ``callback(query_event)`` every time the event happens.
+
+        ``before_query`` receives the ``QueryEvent`` before the statement is
+        sent. ``after_query`` receives it filled with the result, also when the
+        query fails. Exceptions raised by callbacks are printed and ignored.
+
+        Args:
+            event (str): ``'before_query'`` or ``'after_query'``.
+            callback (callable): The function to be called.
+
+        Raises:
+            ValueError: If the event does not exist.
+        """
+        if event not in self._subscribers:
+            raise ValueError("Unknown event: {event}".format(event=event))
+        with self._lock:
+            self._subscribers[event] = self._subscribers[event] + [callback]
+
+    def unsubscribe(self, event, callback):
+        """Stops calling a callback subscribed with ``subscribe()``.
+
+        Args:
+            event (str): ``'before_query'`` or ``'after_query'``.
+            callback (callable): The function that was subscribed.
+        """
+        with self._lock:
+            self._subscribers[event] = [
+                subscriber for subscriber in self._subscribers[event]
+                if subscriber != callback]
+
+    def before_query(self, sql, values=None, statements=1):
+        """Creates the event of a query that is about to be executed.
+
+        Args:
+            sql (str): The statement.
+            values (tuple, optional): The values of the placeholders.
+                Defaults to None.
+            statements (int, optional): Statements joined in ``sql``.
+                Defaults to 1.
+
+        Returns:
+            QueryEvent: The event, to be given to ``after_query()``.
+        """
+        event = QueryEvent(sql, values, statements)
+        self._notify('before_query', event)
+        return event
+
+    def after_query(self, event, duration, result=None, affected_rows=0,
+                    insert_id=0, error=None, rows=None, size=None):
+        """Records a query that was executed.
+
+        Args:
+            event (QueryEvent): The event created by ``before_query()``.
+            duration (float): Seconds spent in the database.
+            result (list[dict] | bool, optional): What the query returned.
+                Defaults to None.
+            affected_rows (int, optional): Defaults to 0.
+            insert_id (int, optional): Defaults to 0.
+            error (Exception, optional): The error raised, if any. Defaults to
+                None.
+            rows (int, optional): Records returned, when ``result`` is not
+                available (streamed queries). Defaults to ``len(result)``.
+            size (int, optional): Bytes returned, when ``result`` is not
+                available. Defaults to the size estimated from ``result``.
+        """
+        event.duration = duration
+        event.result = result
+        event.affected_rows = affected_rows
+        event.insert_id = insert_id
+        event.error = error
+        if isinstance(result, list):
+            event.rows = len(result)
+            event.bytes = estimate_bytes(result)
+        if rows is not None:
+            event.rows = rows
+        if size is not None:
+            event.bytes = size
+
+        bucket = bisect.bisect_left(self.buckets, duration)
+
+        with self._lock:
+            stats = self._statistics.get(event.fingerprint)
+            if stats is None:
+                stats = {
+                    'count': 0,
+                    'errors': 0,
+                    'total_time': 0.0,
+                    'min_time': duration,
+                    'max_time': duration,
+                    'rows': 0,
+                    'bytes': 0,
+                    'histogram': [0] * (len(self.buckets) + 1)
+                }
+                self._statistics[event.fingerprint] = stats
+
+            stats['count'] += 1
+            stats['total_time'] += duration
+            stats['min_time'] = min(stats['min_time'], duration)
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['rows'] += event.rows
+            stats['bytes'] += event.bytes
+            stats['histogram'][bucket] += 1
+            if error is not None:
+                stats['errors'] += 1
+
+        if (self.slow_query_threshold is not None and
+                duration >= self.slow_query_threshold):
+            self._log_slow_query(event)
+
+        self._notify('after_query', event)
+
+    def statistics(self):
+        """Returns the statistics of every fingerprint.
+
+        Returns:
+            dict: By fingerprint, a dictionary with ``count``, ``errors``,
+            ``total_time``, ``avg_time``, ``min_time``, ``max_time`` (seconds),
+            ``rows``, ``bytes`` and ``histogram`` (a list of counts, one per
+            bucket, the last one for the queries above every bound).
+        """
+        with self._lock:
+            statistics = {}
+            for key, stats in self._statistics.items():
+                copy = dict(stats, histogram=list(stats['histogram']))
+                copy['avg_time'] = stats['total_time'] / stats['count']
+                statistics[key] = copy
+            return statistics
+
+    def reset(self):
+        """Forgets every statistic collected so far."""
+        with self._lock:
+            self._statistics = {}
+            self.slow_queries = 0
+
+    def _log_slow_query(self, event):
+        with self._lock:
+            self.slow_queries += 1
+
+        if self.slow_query_log is None:
+            return
+
+        entry = {
+            'time': datetime.datetime.now().isoformat(),
+            'duration': event.duration,
+            'fingerprint': event.fingerprint,
+            'rows': event.rows,
+            'bytes': event.bytes,
+            'affected_rows': event.affected_rows,
+            # Messages like "Duplicate entry 'jdoe' for key ..." quote values.
+            'error': (type(event.error).__name__
+                      if event.error is not None else None)
+        }
+        if self.log_values:
+            entry['sql'] = event.sql
+            entry['values'] = event.values
+            if event.error is not None:
+                entry['error'] = str(event.error)
+        line = json.dumps(entry, default=str)
+
+        with self._log_lock:
+            with open(self.slow_query_log, 'a') as log_file:
+                log_file.write(line + "\n")
+
+    def _notify(self, name, event):
+        for callback in self._subscribers[name]:
+            try:
+                callback(event)
+            except Exception as err:
+                shared.print_error_message(err)
@@ -0,0 +1,194 @@
+"""Several finders of the models executed in one round trip.
+
+A ``QueryBatch`` collects the queries of ``find_by_sql()``, ``find_all()``,
+``find_by_id()`` and ``count_all()`` (of any model that shares the same
+``ConnectionDB``), sends them together with ``ConnectionDB.query_many()`` and
+converts every result set like the finder would: to objects of the model that
+asked for it, or to a number.
+
+Example:
+    How to use this class::
+
+        with Bicycle.batch() as batch:
+            count = batch.count_all(Bicycle)
+            breakdown = batch.query(
+                "SELECT category, COUNT(*) AS count FROM bicycles "
+                "GROUP BY category")
+            page = batch.find_by_sql(Bicycle,
+                                     "SELECT * FROM bicycles LIMIT 20")
+            admin = batch.find_by_id(Admin, 1)
+
+        print(count.value, len(page.value), admin.value.full_name())
+
+"""
+
+__all__ = [
+    'BatchResult',
+    'QueryBatch'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import shared
+
+
+class BatchResult(object):
+    """The result of one query of a ``QueryBatch``, available after the batch
+    is executed.
+
+    Args:
+        sql (str): The query.
+        values (tuple, optional): The values to complete the SQL statement.
+        convert (callable, optional): Receives the result of the query and
+            returns the value of this object.
+    """
+
+    def __init__(self, sql, values=None, convert=None):
+        self.sql = sql
+        self.values = values
+        self.convert = convert
+        self.executed = False
+        self._value = None
+
+    @property
+    def value(self):
+        """Any: The converted result of the query.
+
+        Raises:
+            Exception: If the batch was not executed yet.
+        """
+        if not self.executed:
+            shared.print_error_message("The batch was not executed yet.")
+            raise Exception("The batch was not executed yet.")
+        return self._value
+
+    def _set(self, result):
+        self._value = self.convert(result) if self.convert is not None else result
+        self.executed = True
+
+
+class QueryBatch(object):
+    """Collects queries and executes them in one round trip.
+
+    Args:
+        database (ConnectionDB): The connection that executes the queries.
+
+    Note:
+        Used as a context manager, the batch is executed at the end of the
+        ``with`` block (unless the block raises an exception).
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+
+    def __len__(self):
+        return len(self._results)
+
+    def add(self, sql, values=None, convert=None):
+        """Adds a query to the batch.
+
+        Args:
+            sql (str): The query to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+            convert (callable, optional): Converts the result of the query (a
+                list of dictionaries, or True). Defaults to None (the result is
+                kept as it is).
+
+        Returns:
+            BatchResult: Receives the result when the batch is executed.
+        """
+        result = BatchResult(sql, values, convert)
+        self._results.append(result)
+        return result
+
+    def query(self, sql, values=None):
+        """Adds a query whose result is kept as ``ConnectionDB.query()``
+        returns it.
+
+        Args:
+            sql (str): The query to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+
+        Returns:
+            BatchResult: Receives a list of dictionaries (or True).
+        """
+        return self.add(sql, values)
+
+    def find_by_sql(self, model, sql, values=None):
+        """Adds the query of ``model.find_by_sql()``.
+
+        Args:
+            model (type): A subclass of ``DatabaseObject``.
+            sql (str): The SQL string to be executed.
+            values (tuple, optional): The values to complete the SQL statement.
+                Defaults to None.
+
+        Returns:
+            BatchResult: Receives the same as ``find_by_sql()``.
+        """
+        return self.add(sql, values, model._objects_from)
+
+    def find_all(self, model):
+        """Adds the query of ``model.find_all()``.
+
+        Args:
+            model (type): A subclass of ``DatabaseObject``.
+
+        Returns:
+            BatchResult: Receives the same as ``find_all()``.
+        """
+        return self.add(model._find_all_sql(), None, model._objects_from)
+
+    def find_by_id(self, model, id):
+        """Adds the query of ``model.find_by_id()``.
+
+        Args:
+            model (type): A subclass of ``DatabaseObject``.
+            id (int): The ID number to be used in the query.
+
+        Returns:
+            BatchResult: Receives the same as ``find_by_id()``.
+        """
+        return self.add(model._find_by_id_sql(id), None, model._first_from)
+
+    def count_all(self, model):
+        """Adds the query of ``model.count_all()``.
+
+        Args:
+            model (type): A subclass of ``DatabaseObject``.
+
+        Returns:
+            BatchResult: Receives the same as ``count_all()``.
+        """
+        return self.add(model._count_all_sql(), None, model._count_from)
+
+    def execute(self):
+        """Executes the queries added since the last execution, in one round
+        trip (see ``ConnectionDB.query_many()``).
+
+        Returns:
+            list: The value of every ``BatchResult``, in the order they were
+            added.
+        """
+        results, self._results = self._results, []
+        if not results:
+            return []
+
+        rows = self.database.query_many(
+            [(result.sql, result.values) for result in results])
+        for result, result_rows in zip(results, rows):
+            result._set(result_rows)
+
+        return [result.value for result in results]
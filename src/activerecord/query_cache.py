@@ -0,0 +1,388 @@
+"""A cache of SELECT results, invalidated by the writes to their tables.
+
+``ConnectionDB`` keeps the result sets of its SELECT queries (keyed by the SQL
+text and the values) when it has a ``QueryCache``. Every write executed
+through it (``_create()``, ``_update()``, ``delete()`` and the bulk methods)
+removes the cached results that read the table that was written.
+
+Warning:
+    Only the writes made through the same ``ConnectionDB`` are seen. Writes
+    made by other programs (or other processes) are only noticed when the
+    entries expire, so a ``ttl`` should be used if the tables can change
+    elsewhere.
+
+References:
+    `OrderedDict objects`_
+
+.. _OrderedDict objects:
+   https://docs.python.org/3.7/library/collections.html#ordereddict-objects
+
+"""
+
+__all__ = ['QueryCache']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import collections
+import re
+import threading
+import time
+
+from . instrumentation import estimate_bytes
+
+
+_READ_STATEMENT = re.compile(r"^\s*\(?\s*(SELECT|SHOW|DESCRIBE|DESC|EXPLAIN|WITH)\b",
+                             re.IGNORECASE)
+_FROM_OR_JOIN = re.compile(r"\b(?:FROM|JOIN)\b", re.IGNORECASE)
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NAME = r"(?:[`\"]?[\w$]+[`\"]?\.)?[`\"]?[\w$]+[`\"]?"
+"""str: A table name, optionally quoted and qualified by the database."""
+_TABLE = re.compile(r"\s*(" + _NAME + ")")
+_ALIAS = re.compile(r"(?:\s+AS)?\s+([`\"]?\w+[`\"]?)", re.IGNORECASE)
+_SUBQUERY = re.compile(r"\s*\(\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_CLAUSE_WORDS = frozenset([
+    'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'CROSS', 'NATURAL', 'FULL',
+    'OUTER', 'STRAIGHT_JOIN', 'ON', 'USING', 'GROUP', 'ORDER', 'LIMIT',
+    'HAVING', 'UNION', 'EXCEPT', 'INTERSECT', 'WINDOW', 'FOR', 'LOCK', 'INTO',
+    'OFFSET', 'FETCH'
+])
+"""frozenset[str]: Words that can follow a table without being its alias."""
+_INDEX_HINTS = frozenset(['USE', 'IGNORE', 'FORCE', 'PARTITION'])
+_TABLE_WRITTEN = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+IGNORE)?|"
+    r"DELETE\s+FROM)\s+(" + _NAME + ")",
+    re.IGNORECASE)
+
+
+def is_read(sql):
+    """Checks if a statement only reads (SELECT, SHOW, DESCRIBE, EXPLAIN).
+
+    Args:
+        sql (str): The statement.
+
+    Returns:
+        bool: True if it only reads. False otherwise.
+    """
+    return _READ_STATEMENT.match(sql) is not None
+
+
+def _table_name(name):
+    # Removes the quotes and the database name (chain_gang.bicycles).
+    return name.split('.')[-1].strip('`"').lower()
+
+
+def _closing_parenthesis(sql, start):
+    """Returns the index after the parenthesis that closes the one at
+    ``start`` (None if it is not closed)."""
+    depth = 0
+    for index in range(start, len(sql)):
+        if sql[index] == '(':
+            depth += 1
+        elif sql[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+def tables_read(sql):
+    """Finds the tables a SELECT reads: the ones after every FROM (including
+    the comma-separated ones) and JOIN, in the statement and in its
+    subqueries.
+
+    Args:
+        sql (str): The statement.
+
+    Returns:
+        (set[str] | None): The table names, in lower case. None if they cannot
+        be found reliably (a table function or index hints, for example), so
+        the result must not be cached.
+    """
+    # Quoted values could contain "from".
+    sql = _LITERALS.sub("''", sql)
+    tables = set()
+
+    for keyword in _FROM_OR_JOIN.finditer(sql):
+        position = keyword.end()
+        while True:
+            if _SUBQUERY.match(sql, position):
+                # Derived table: its own FROM clauses are found by the loop.
+                start = sql.index('(', position)
+                position = _closing_parenthesis(sql, start)
+                if position is None:
+                    return None
+            else:
+                table = _TABLE.match(sql, position)
+                if table is None:
+                    return None
+                position = table.end()
+                if sql[position:].lstrip().startswith('('):
+                    # A table function, like JSON_TABLE(...).
+                    return None
+                tables.add(_table_name(table.group(1)))
+
+            alias = _ALIAS.match(sql, position)
+            if alias is not None:
+                word = alias.group(1).strip('`"').upper()
+                if word in _INDEX_HINTS:
+                    return None
+                if word not in _CLAUSE_WORDS:
+                    position = alias.end()
+                    following = _ALIAS.match(sql, position)
+                    if (following is not None and
+                            following.group(1).upper() in _INDEX_HINTS):
+                        return None
+
+            rest = sql[position:].lstrip()
+            if not rest.startswith(','):
+                break
+            position = len(sql) - len(rest) + 1
+
+    return tables
+
+
+def table_written(sql):
+    """Finds the table an INSERT, REPLACE, UPDATE or DELETE writes.
+
+    Args:
+        sql (str): The statement.
+
+    Returns:
+        (str | None): The table name, in lower case. None if it is not one of
+        those statements (DDL, for example).
+    """
+    match = _TABLE_WRITTEN.match(sql)
+    if match is None:
+        return None
+    return _table_name(match.group(1))
+
+
+class QueryCache(object):
+    """Least recently used cache of result sets, with optional expiration.
+
+    Args:
+        max_entries (int, optional): Maximum number of cached results.
+            Defaults to 256.
+        ttl (float, optional): Seconds a result stays valid. None keeps it until
+            it is evicted or invalidated. Defaults to None.
+        max_bytes (int, optional): Maximum estimated size of all the cached
+            results together. None does not limit it. Defaults to None.
+
+    Example:
+        Caching the catalog queries of the models::
+
+            DatabaseObject._database.query_cache = QueryCache(ttl=60)
+
+            Bicycle.find_all()      # Database.
+            Bicycle.find_all()      # Cache.
+            bike.save()             # Invalidates the bicycles entries.
+            Bicycle.find_all()      # Database.
+    """
+
+    def __init__(self, max_entries=256, ttl=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+
+        # key: (result, tables, size, expires_at)
+        self._entries = collections.OrderedDict()
+        # table: set of keys
+        self._keys_by_table = collections.defaultdict(set)
+        self._bytes = 0
+
+        # Bumped by every invalidation of a table (and of everything, by
+        # clear()), so a read that overlapped a write is not cached.
+        self._generations = collections.defaultdict(int)
+        self._clears = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(sql, values=None, *extra):
+        """Creates the key of a query.
+
+        Args:
+            sql (str): The statement.
+            values (tuple, optional): The values of the placeholders.
+                Defaults to None.
+            *extra: Anything else that changes the result (like the row
+                format).
+
+        Returns:
+            (tuple | None): The key. None if the values cannot be hashed (the
+            query is not cached).
+        """
+        key = (sql, tuple(values) if values is not None else None) + extra
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def generation(self, sql):
+        """Returns the generation of the tables a SELECT reads, to be taken
+        before it is executed and given to ``put()``.
+
+        Args:
+            sql (str): The statement.
+
+        Returns:
+            tuple: The generation. It changes when any of the tables is
+            invalidated.
+        """
+        tables = sorted(tables_read(sql) or ())
+        with self._lock:
+            return (self._clears,) + tuple(self._generations[table]
+                                           for table in tables)
+
+    def get(self, key):
+        """Looks for a cached result.
+
+        Args:
+            key (tuple): Created by ``key()``.
+
+        Returns:
+            (list | None): A copy of the result set, or None if it is not
+            cached (or expired).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[3] is not None and entry[3] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_rows(entry[0])
+
+    def put(self, key, sql, result, generation=None):
+        """Caches the result of a SELECT.
+
+        Args:
+            key (tuple): Created by ``key()``.
+            sql (str): The statement (its tables are found from it).
+            result (list): The result set. A copy is cached.
+            generation (tuple, optional): What ``generation()`` returned before
+                the SELECT was executed. If a table was invalidated since then
+                (a write finished while the SELECT was running), the result
+                may be stale and is not cached. Defaults to None (not checked).
+        """
+        tables = tables_read(sql)
+        if not tables:
+            return
+
+        size = estimate_bytes(result)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if generation is not None and generation != (
+                    (self._clears,) + tuple(self._generations[table]
+                                            for table in sorted(tables))):
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (_copy_rows(result), tables, size, expires_at)
+            self._bytes += size
+            for table in tables:
+                self._keys_by_table[table].add(key)
+
+            while (len(self._entries) > self.max_entries or
+                   (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, table):
+        """Removes every cached result that read a table.
+
+        Args:
+            table (str): The table name.
+        """
+        with self._lock:
+            self._generations[table.lower()] += 1
+            keys = self._keys_by_table.pop(table.lower(), ())
+            for key in list(keys):
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_sql(self, sql):
+        """Removes the cached results affected by a statement: the ones that
+        read the table it writes or, if that table cannot be found (DDL, for
+        example), all of them.
+
+        Args:
+            sql (str): A statement that is not a SELECT.
+        """
+        table = table_written(sql)
+        if table is None:
+            self.clear()
+        else:
+            self.invalidate(table)
+
+    def clear(self):
+        """Removes every cached result."""
+        with self._lock:
+            self._clears += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._bytes = 0
+
+    def statistics(self):
+        """Returns the counters of the cache.
+
+        Returns:
+            dict: ``entries``, ``bytes``, ``hits``, ``misses``, ``evictions``,
+            ``expirations`` and ``invalidations``.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        # Must be called with the lock held.
+        result, tables, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+def _copy_rows(rows):
+    """Copies a result set, so the callers cannot change the cached one.
+
+    Args:
+        rows (list): Rows as dictionaries or tuples.
+
+    Returns:
+        list: The copy (tuples are immutable and are not copied).
+    """
+    return [dict(row) if isinstance(row, dict) else row for row in rows]
@@ -0,0 +1,399 @@
+"""Lazy, chainable queries of a model.
+
+A ``QuerySet`` describes a SELECT of the table of a model. Every method
+returns a new ``QuerySet`` with one more clause, and nothing is sent to the
+database until the result is needed (iteration, ``len()``, ``list()``, an
+index, ``count()``, ``exists()`` or ``first()``). The statement is compiled
+with placeholders, so the values never become part of the SQL text::
+
+    bikes = (Bicycle.where(category='Road', price__lt=1500)
+             .order_by('-price', 'brand')
+             .only('brand', 'model', 'price')
+             .limit(50))
+
+    # SELECT id, brand, model, price FROM bicycles
+    # WHERE category=%s AND price<%s ORDER BY price DESC, brand ASC LIMIT 50
+    for bike in bikes:
+        print(bike.name())
+
+The keyword arguments of ``where()`` are columns of ``_db_columns``, optionally
+followed by an operator:
+
+========================  ==============================
+Keyword                   SQL
+========================  ==============================
+``price=10``              ``price=%s`` (``IS NULL`` for None)
+``price__ne=10``          ``price<>%s``
+``price__lt=10``          ``price<%s`` (also ``lte``, ``gt``, ``gte``)
+``brand__like='Tr%'``     ``brand LIKE %s``
+``id__in=[1, 2]``         ``id IN (%s, %s)``
+``color__isnull=True``    ``color IS NULL`` (``IS NOT NULL`` for False)
+========================  ==============================
+
+Conditions that do not fit them are written in SQL, with their values::
+
+    Bicycle.where("price BETWEEN %s AND %s", 500, 1500)
+
+References:
+    `QuerySet API reference`_
+
+.. _QuerySet API reference:
+   https://docs.djangoproject.com/en/stable/ref/models/querysets/
+
+"""
+
+__all__ = ['QuerySet']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import shared
+
+
+_OPERATORS = {
+    'eq': '=',
+    'ne': '<>',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>=',
+    'like': ' LIKE '
+}
+"""dict: The SQL of the operators that compare a column with one value."""
+
+_NO_LIMIT = 9223372036854775807
+"""int: The LIMIT of an OFFSET without limit (the largest BIGINT, accepted by
+MySQL and SQLite)."""
+
+
+class QuerySet(object):
+    """A SELECT of the table of a model, executed when its result is needed.
+
+    The result is kept after the first execution, so iterating again does not
+    query again. Every method that adds a clause returns a new, unexecuted,
+    ``QuerySet``.
+
+    Args:
+        model (type): A subclass of ``DatabaseObject``.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._conditions = []
+        self._values = []
+        self._order = []
+        self._columns = None
+        self._limit = None
+        self._offset = 0
+        self._result = None
+
+    def _clone(self):
+        clone = QuerySet(self.model)
+        clone._conditions = list(self._conditions)
+        clone._values = list(self._values)
+        clone._order = list(self._order)
+        clone._columns = self._columns
+        clone._limit = self._limit
+        clone._offset = self._offset
+        return clone
+
+    def _check_column(self, column):
+        """Raises an exception if the column is not in ``_db_columns``."""
+        if column not in self.model._db_columns:
+            message = "Unknown column of {table}: {column}".format(
+                table=self.model._table_name, column=column)
+            shared.print_error_message(message)
+            raise Exception(message)
+
+    # ----- CLAUSES -----
+
+    def where(self, *args, **conditions):
+        """Adds conditions, joined with AND to the previous ones.
+
+        Args:
+            *args: A SQL condition with ``%s`` placeholders, followed by its
+                values.
+            **conditions: ``column=value`` or ``column__operator=value`` (see
+                the table in ``activerecord.query_set``).
+
+        Returns:
+            QuerySet: A new query with the conditions.
+
+        Raises:
+            Exception: If a column or an operator is unknown.
+        """
+        clone = self._clone()
+
+        if args:
+            clone._conditions.append("(" + args[0] + ")")
+            clone._values.extend(args[1:])
+
+        # Sorted, so the same conditions always compile to the same SQL.
+        for key in sorted(conditions):
+            value = conditions[key]
+            column, _, operator = key.partition('__')
+            operator = operator or 'eq'
+            clone._check_column(column)
+
+            if operator == 'isnull':
+                clone._conditions.append(column + (" IS NULL" if value
+                                                   else " IS NOT NULL"))
+            elif operator == 'in':
+                value = list(value)
+                if not value:
+                    # Nothing is IN an empty list.
+                    clone._conditions.append("1=0")
+                else:
+                    clone._conditions.append(
+                        column + " IN (" + ", ".join(["%s"] * len(value)) + ")")
+                    clone._values.extend(value)
+            elif operator == 'eq' and value is None:
+                clone._conditions.append(column + " IS NULL")
+            elif operator in _OPERATORS:
+                clone._conditions.append(column + _OPERATORS[operator] + "%s")
+                clone._values.append(value)
+            else:
+                message = "Unknown operator: {operator}".format(
+                    operator=operator)
+                shared.print_error_message(message)
+                raise Exception(message)
+
+        return clone
+
+    def order_by(self, *columns):
+        """Replaces the order of the records.
+
+        Args:
+            *columns (str): Columns of ``_db_columns``. A leading ``-`` sorts
+                in descending order.
+
+        Returns:
+            QuerySet: A new query with the order.
+        """
+        clone = self._clone()
+        clone._order = []
+        for column in columns:
+            direction = "ASC"
+            if column.startswith('-'):
+                column, direction = column[1:], "DESC"
+            clone._check_column(column)
+            clone._order.append(column + " " + direction)
+        return clone
+
+    def only(self, *columns):
+        """Fetches only some columns. The other attributes of the objects keep
+        the defaults of the constructor. ``id`` is always fetched.
+
+        Args:
+            *columns (str): Columns of ``_db_columns``.
+
+        Returns:
+            QuerySet: A new query with the columns.
+        """
+        clone = self._clone()
+        selected = ['id']
+        for column in columns:
+            clone._check_column(column)
+            if column not in selected:
+                selected.append(column)
+        clone._columns = selected
+        return clone
+
+    def limit(self, count):
+        """Limits the number of records.
+
+        Args:
+            count (int): The maximum number of records.
+
+        Returns:
+            QuerySet: A new query with the limit.
+        """
+        clone = self._clone()
+        clone._limit = max(int(count), 0)
+        return clone
+
+    def offset(self, count):
+        """Skips the first records. With large offsets, prefer
+        ``DatabaseObject.find_page()``, which does not read the skipped
+        records.
+
+        Args:
+            count (int): The number of records skipped.
+
+        Returns:
+            QuerySet: A new query with the offset.
+        """
+        clone = self._clone()
+        clone._offset = max(int(count), 0)
+        return clone
+
+    # ----- SQL -----
+
+    def _where_sql(self):
+        if not self._conditions:
+            return ""
+        return " WHERE " + " AND ".join(self._conditions)
+
+    def _limit_sql(self):
+        if self._limit is None and not self._offset:
+            return ""
+        sql = " LIMIT {limit}".format(
+            limit=_NO_LIMIT if self._limit is None else self._limit)
+        if self._offset:
+            sql += " OFFSET {offset}".format(offset=self._offset)
+        return sql
+
+    def sql(self):
+        """Compiles the query.
+
+        Returns:
+            tuple: ``(sql, values)``, where ``values`` is a tuple or None.
+
+        Example:
+            Sending the query in a batch::
+
+                with Bicycle.batch() as batch:
+                    road = batch.find_by_sql(Bicycle, *Bicycle.where(
+                        category='Road').sql())
+        """
+        columns = ", ".join(self._columns) if self._columns else "*"
+        sql = "SELECT " + columns + " FROM " + self.model._table_name
+        sql += self._where_sql()
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        sql += self._limit_sql()
+        return sql, tuple(self._values) or None
+
+    def __repr__(self):
+        return "<QuerySet {model}: {sql}>".format(model=self.model.__name__,
+                                                  sql=self.sql()[0])
+
+    # ----- EXECUTION -----
+
+    def _fetch(self):
+        """Executes the query once and keeps the objects."""
+        if self._result is None:
+            sql, values = self.sql()
+            records = self.model._database.query(
+                sql, values, row_format=self.model._row_format)
+            self._result = [self.model._instantiate(record)
+                            for record in records]
+        return self._result
+
+    def all(self):
+        """Returns the objects.
+
+        Returns:
+            list[obj]: The objects (empty if no record matches).
+        """
+        return list(self._fetch())
+
+    def first(self):
+        """Returns the first object, fetching only one record.
+
+        Returns:
+            (obj | False): The object. False if no record matches.
+        """
+        if self._result is not None:
+            return self._result[0] if self._result else False
+        result = self.limit(1 if self._limit is None else min(self._limit, 1))._fetch()
+        return result[0] if result else False
+
+    def count(self):
+        """Counts the records in the database (or the objects, if the query was
+        executed already).
+
+        Returns:
+            int: The number of records.
+        """
+        if self._result is not None:
+            return len(self._result)
+
+        if self._limit is None and not self._offset:
+            sql = "SELECT COUNT(*) AS count FROM " + self.model._table_name
+            sql += self._where_sql()
+        else:
+            sql = "SELECT COUNT(*) AS count FROM (SELECT id FROM "
+            sql += self.model._table_name + self._where_sql()
+            sql += self._limit_sql() + ") AS counted"
+
+        result = self.model._database.query(sql, tuple(self._values) or None)
+        return self.model._count_from(result)
+
+    def exists(self):
+        """Checks if any record matches, fetching at most one.
+
+        Returns:
+            bool: True if there is a record. False otherwise.
+        """
+        if self._result is not None:
+            return bool(self._result)
+        if self._limit == 0:
+            return False
+
+        sql = "SELECT 1 AS found FROM " + self.model._table_name
+        sql += self._where_sql() + " LIMIT 1"
+        if self._offset:
+            sql += " OFFSET {offset}".format(offset=self._offset)
+        return bool(self.model._database.query(sql, tuple(self._values) or None))
+
+    def iterator(self, batch_size=1000):
+        """Streams the objects without keeping them (see
+        ``DatabaseObject.find_each()``).
+
+        Args:
+            batch_size (int, optional): The number of records fetched per round
+                trip. Defaults to 1000.
+
+        Returns:
+            generator: The objects.
+        """
+        sql, values = self.sql()
+        return self.model.find_each(sql, values, batch_size)
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __bool__(self):
+        return bool(self._fetch())
+
+    def __getitem__(self, key):
+        """Returns an object, or a new query for a slice (``[10:20]`` becomes
+        ``LIMIT 10 OFFSET 10``). If the query was executed, the kept objects
+        are used instead.
+
+        Raises:
+            IndexError: If there is no record at the index.
+            ValueError: For negative indexes and steps, which SQL cannot
+                express.
+        """
+        if self._result is not None:
+            return self._result[key]
+
+        if isinstance(key, slice):
+            if ((key.start or 0) < 0 or (key.stop is not None and key.stop < 0) or
+                    key.step not in (None, 1)):
+                raise ValueError("QuerySet slices cannot be negative or have a step.")
+            start = key.start or 0
+            clone = self._clone()
+            clone._offset = self._offset + start
+            if key.stop is not None:
+                clone._limit = max(key.stop - start, 0)
+                if self._limit is not None:
+                    clone._limit = max(min(clone._limit, self._limit - start), 0)
+            elif self._limit is not None:
+                clone._limit = max(self._limit - start, 0)
+            return clone
+
+        index = int(key)
+        if index < 0:
+            raise ValueError("QuerySet indexes cannot be negative.")
+        if self._limit is not None and index >= self._limit:
+            raise IndexError("QuerySet index out of range.")
+        result = self[index:index + 1]._fetch()
+        if not result:
+            raise IndexError("QuerySet index out of range.")
+        return result[0]
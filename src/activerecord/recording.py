@@ -0,0 +1,591 @@
+"""Recording of the statements sent to a database and their replay without it.
+
+``RecordingBackend`` wraps the backend of a real database and appends every
+statement, its values and its result (rows, affected rows, insert id or error)
+to a JSON Lines file. ``ReplayBackend`` reads that file and answers the same
+statements with the recorded results, without a database server, so the
+models and the Scribus layouts can be profiled on machines without MySQL, with
+the time spent in the server replaced by an optional synthetic latency.
+
+The values that JSON has no type for are tagged, so they come back with the
+same type::
+
+    {"$decimal": "1200.50"}, {"$datetime": "2024-05-01T10:00:00"},
+    {"$date": "2024-05-01"}, {"$time": "10:00:00"}, {"$timedelta": 36000.0},
+    {"$bytes": "<base64>"}, {"$set": ["a", "b"]}
+
+Example:
+    Recording, in db_credentials.py::
+
+        DB_ENGINE = 'mysql'
+        DB_RECORDING = '/tmp/catalog.jsonl'
+
+    And replaying the same file::
+
+        DB_ENGINE = 'replay'
+        DB_RECORDING = '/tmp/catalog.jsonl'
+        DB_REPLAY_LATENCY = 0.002
+
+    Or directly::
+
+        database = ConnectionDB(backend=ReplayBackend('/tmp/catalog.jsonl'))
+
+Warning:
+    A recording has the statements, their values and the rows they returned in
+    plain text. The values of the columns in ``redacted_columns`` (by default
+    ``DEFAULT_REDACTED_COLUMNS``: passwords and e-mail addresses) are replaced
+    by ``'[REDACTED]'`` in the file, in the bound values, in the literals of
+    the SQL text (``username='...'`` when ``username`` is one of them) and in
+    the rows; replay masks the statements it receives the same way, so they
+    still match. Any other personal data is written as it is.
+
+Note:
+    While recording, prepared statements and multi-statement round trips are
+    not used (every statement goes through ``execute()`` to be recorded), so
+    the timings of a recording session are not representative.
+
+    Every result set is also read whole when its statement is executed, to be
+    written as one entry. ``ConnectionDB.query_batches()``, ``query_iter()``
+    and ``find_each()`` still return their rows in batches, but they are all
+    in memory at once: streaming does not keep the memory constant while
+    recording. Record the large exports with a smaller catalog.
+
+References:
+    `JSON Lines`_
+
+.. _JSON Lines:
+   https://jsonlines.org/
+
+"""
+
+__all__ = [
+    'DEFAULT_REDACTED_COLUMNS',
+    'RecordingBackend',
+    'ReplayBackend',
+    'ReplayError'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import base64
+import collections
+import datetime
+import decimal
+import json
+import re
+import threading
+import time
+
+import shared
+from . backends import DatabaseBackend, SQLiteBackend
+
+
+def _encode(value):
+    """``default`` of ``json.dumps()``: tags the values JSON has no type for."""
+    if isinstance(value, decimal.Decimal):
+        return {'$decimal': str(value)}
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'$time': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {'$timedelta': value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {'$bytes': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, (set, frozenset)):
+        return {'$set': sorted(value)}
+    raise TypeError("Cannot record a value of type {type}".format(
+        type=type(value).__name__))
+
+
+_DECODERS = {
+    '$decimal': decimal.Decimal,
+    '$datetime': datetime.datetime.fromisoformat,
+    '$date': datetime.date.fromisoformat,
+    '$time': datetime.time.fromisoformat,
+    '$timedelta': lambda seconds: datetime.timedelta(seconds=seconds),
+    '$bytes': base64.b64decode,
+    '$set': set
+}
+
+
+def _decode(item):
+    """``object_hook`` of ``json.loads()``: restores the tagged values."""
+    if len(item) == 1:
+        tag, value = next(iter(item.items()))
+        decoder = _DECODERS.get(tag)
+        if decoder is not None:
+            return decoder(value)
+    return item
+
+
+DEFAULT_REDACTED_COLUMNS = ('confirm_password', 'email', 'hashed_password',
+                            'password')
+"""tuple[str]: The columns whose values are not written to recordings."""
+
+REDACTED = '[REDACTED]'
+"""str: What is written instead of a redacted value."""
+
+_INSERT = re.compile(r"^\s*INSERT\s+(?:IGNORE\s+)?INTO\s+[\w`.]+\s*\(([^)]*)\)\s*VALUES\b",
+                     re.IGNORECASE)
+_COMPARISON = re.compile(r"([\w`.]+)\s*(?:=|<>|!=|<=|>=|<|>|\bLIKE\b)\s*$",
+                         re.IGNORECASE)
+_IN_LIST = re.compile(r"([\w`.]+)\s+IN\s*\(\s*$", re.IGNORECASE)
+_CASE = re.compile(r"([\w`.]+)\s*=\s*CASE\s+([\w`.]+)\s+WHEN\s*$", re.IGNORECASE)
+_LITERAL = re.compile(r"([\w`.]+)(\s*(?:=|<>|!=|\bLIKE\b)\s*)'(?:[^'\\]|\\.|'')*'",
+                      re.IGNORECASE)
+
+
+def _column_name(name):
+    """``bicycles.`year``` -> ``year``."""
+    return name.strip().split('.')[-1].strip('`').lower()
+
+
+class _Redactor(object):
+    """Masks the values of some columns in the statements and rows that are
+    written to a recording.
+
+    Args:
+        columns (iterable[str]): The redacted columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = frozenset(column.lower() for column in columns)
+
+    def _placeholder_columns(self, sql):
+        """Returns the column of every ``%s`` of a statement (None when it is
+        not known): the INSERT column list, ``column <operator> %s``,
+        ``column IN (%s, ...)`` and ``column = CASE id WHEN %s THEN %s``."""
+        parts = sql.split('%s')[:-1]
+        insert = _INSERT.match(sql)
+        if insert is not None and '%s' not in sql[:insert.end()]:
+            columns = [_column_name(name) for name in insert.group(1).split(',')]
+            return [columns[index % len(columns)] for index in range(len(parts))]
+
+        result = []
+        context = None
+        for before in parts:
+            column = None
+            stripped = before.strip().upper()
+            if context is not None and context[0] == 'in' and stripped == ',':
+                column = context[1]
+            elif context is not None and context[0] == 'case' and stripped == 'THEN':
+                column = context[1]
+            elif context is not None and context[0] == 'case' and stripped == 'WHEN':
+                column = context[2]
+            else:
+                context = None
+                match = _CASE.search(before)
+                if match is not None:
+                    context = ('case', _column_name(match.group(1)),
+                               _column_name(match.group(2)))
+                    column = context[2]
+                else:
+                    match = _IN_LIST.search(before)
+                    if match is not None:
+                        context = ('in', _column_name(match.group(1)))
+                        column = context[1]
+                    else:
+                        match = _COMPARISON.search(before)
+                        if match is not None:
+                            column = _column_name(match.group(1))
+            result.append(column)
+        return result
+
+    def _mask_literal(self, match):
+        if _column_name(match.group(1)) in self.columns:
+            return match.group(1) + match.group(2) + "'" + REDACTED + "'"
+        return match.group(0)
+
+    def statement(self, sql, values):
+        """Masks a statement.
+
+        Args:
+            sql (str): The statement.
+            values (tuple): The values of its placeholders (or None).
+
+        Returns:
+            tuple: ``(sql, values, masked)``: the statement and the values
+            (a list or None) as they are recorded, and the original values
+            that were masked.
+        """
+        if not self.columns:
+            return sql, list(values) if values else None, []
+
+        sql = _LITERAL.sub(self._mask_literal, sql)
+        if not values:
+            return sql, None, []
+
+        values = list(values)
+        masked = []
+        for index, column in enumerate(self._placeholder_columns(sql)):
+            if (column in self.columns and index < len(values) and
+                    values[index] is not None):
+                masked.append(values[index])
+                values[index] = REDACTED
+        return sql, values, masked
+
+    def rows(self, columns, rows):
+        """Masks the redacted columns of the rows of a result set.
+
+        Args:
+            columns (list[str]): The names of the columns.
+            rows (list[tuple]): The rows.
+
+        Returns:
+            list[tuple]: The rows as they are recorded.
+        """
+        positions = [index for index, column in enumerate(columns)
+                     if column.lower() in self.columns]
+        if not positions:
+            return rows
+        masked_rows = []
+        for row in rows:
+            row = list(row)
+            for index in positions:
+                if row[index] is not None:
+                    row[index] = REDACTED
+            masked_rows.append(tuple(row))
+        return masked_rows
+
+
+def _values_key(values):
+    """The JSON of the values of a statement, used to find its responses."""
+    return json.dumps(list(values) if values else None, default=_encode,
+                      sort_keys=True)
+
+
+class ReplayError(Exception):
+    """The statement was not recorded, or it raised this error when it was.
+
+    Args:
+        message (str): The message.
+        kind (str, optional): What ``error_kind()`` returned for the recorded
+            error. Defaults to None.
+    """
+
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+
+class _Response(object):
+    """The result of one statement, as it was recorded."""
+
+    __slots__ = ('columns', 'rows', 'rowcount', 'insert_id', 'error')
+
+    def __init__(self, columns=None, rows=None, rowcount=-1, insert_id=0,
+                 error=None):
+        self.columns = columns
+        self.rows = rows
+        self.rowcount = rowcount
+        self.insert_id = insert_id
+        self.error = error
+
+
+class _ResponseCursor(object):
+    """A DB-API cursor that serves a ``_Response`` (the subset used by
+    ``ConnectionDB``)."""
+
+    def __init__(self, connection, dictionary):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = 0
+        self._rows = []
+        self._position = 0
+
+    def _load(self, response):
+        if response.columns is None:
+            self.description = None
+            self._rows = []
+        else:
+            self.description = [(name, None, None, None, None, None, None)
+                                for name in response.columns]
+            if self.dictionary:
+                self._rows = [dict(zip(response.columns, row))
+                              for row in response.rows]
+            else:
+                self._rows = response.rows
+        self._position = 0
+        self.rowcount = response.rowcount
+        self.lastrowid = response.insert_id
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def close(self):
+        self._rows = []
+
+
+class RecordingBackend(DatabaseBackend):
+    """Wraps a backend and records every statement it executes.
+
+    The recording has every statement, value and row in plain text, except
+    the values of the redacted columns (see the warning in
+    ``activerecord.recording``). Do not share it, or keep it on shared disks,
+    if the database has personal data in other columns.
+
+    Args:
+        backend (DatabaseBackend): The backend of the real database.
+        path (str): The JSON Lines file. The statements are appended to it.
+        redacted_columns (iterable[str], optional): The columns whose values
+            are replaced by ``'[REDACTED]'`` in the file. Defaults to
+            ``DEFAULT_REDACTED_COLUMNS``. An empty tuple records everything.
+    """
+
+    supports_prepared_statements = False
+    supports_multi_statements = False
+
+    def __init__(self, backend, path, redacted_columns=DEFAULT_REDACTED_COLUMNS):
+        self.backend = backend
+        self.path = path
+        self.redactor = _Redactor(redacted_columns)
+        self.name = backend.name
+        self.Error = backend.Error
+        self.max_placeholders = backend.max_placeholders
+        self.server_variables = backend.server_variables
+
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self._write({'backend': backend.name,
+                     'max_placeholders': backend.max_placeholders,
+                     'server_variables': backend.server_variables,
+                     'redacted_columns': sorted(self.redactor.columns)})
+
+    def connect(self):
+        return self.backend.connect()
+
+    def close(self, connection):
+        self.backend.close(connection)
+
+    def is_connected(self, connection):
+        return self.backend.is_connected(connection)
+
+    def cursor(self, connection, dictionary=True, buffered=True):
+        return _ResponseCursor(connection, dictionary)
+
+    def execute(self, cursor, sql, values=None):
+        response = _Response()
+        inner = self.backend.cursor(cursor.connection, dictionary=False)
+        try:
+            self.backend.execute(inner, sql, values)
+            if inner.description is not None:
+                response.columns = [column[0] for column in inner.description]
+                response.rows = [tuple(row) for row in inner.fetchall()]
+                response.rowcount = len(response.rows)
+            else:
+                response.rowcount = inner.rowcount
+                response.insert_id = self.backend.insert_id(inner, sql)
+        except self.backend.Error as err:
+            response.error = {'message': str(err),
+                              'kind': self.backend.error_kind(err)}
+            self._record(sql, values, response)
+            raise
+        finally:
+            inner.close()
+
+        self._record(sql, values, response)
+        cursor._load(response)
+
+    def insert_id(self, cursor, sql):
+        return cursor.lastrowid
+
+    def upsert_clause(self, conflict_keys, update_columns):
+        return self.backend.upsert_clause(conflict_keys, update_columns)
+
+    def explain(self, connection, sql, values=None):
+        return self.backend.explain(connection, sql, values)
+
+    def error_kind(self, err):
+        return self.backend.error_kind(err)
+
+    def _record(self, sql, values, response):
+        sql, values, masked = self.redactor.statement(sql, values)
+        rows = response.rows
+        if rows is not None:
+            rows = self.redactor.rows(response.columns, rows)
+        error = response.error
+        if error is not None and masked:
+            # Messages like "Duplicate entry 'jdoe@example.com' for key ...".
+            message = error['message']
+            for value in masked:
+                message = message.replace(str(value), REDACTED)
+            error = dict(error, message=message)
+
+        self._write({
+            'sql': sql,
+            'values': values,
+            'columns': response.columns,
+            'rows': rows,
+            'rowcount': response.rowcount,
+            'insert_id': response.insert_id,
+            'error': error
+        })
+        self.recorded += 1
+
+    def _write(self, entry):
+        line = json.dumps(entry, default=_encode)
+        with self._lock:
+            with open(self.path, 'a') as recording_file:
+                recording_file.write(line + "\n")
+
+
+class _ReplayConnection(object):
+    """The connection of a ``ReplayBackend``: transactions do nothing."""
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayBackend(DatabaseBackend):
+    """Answers the statements with the results recorded by
+    ``RecordingBackend``.
+
+    A statement that was recorded several times (with the same values) gets
+    the recorded results in order, starting again after the last one, so the
+    same sequence of calls always gets the same answers.
+
+    Args:
+        path (str): The JSON Lines file written by ``RecordingBackend``.
+        latency (float, optional): Seconds every statement waits, as if it
+            went to the server. Defaults to 0.0.
+        row_latency (float, optional): Additional seconds per row returned.
+            Defaults to 0.0.
+
+    Raises:
+        Exception: If the file cannot be read.
+
+    Attributes:
+        replayed (int): Statements answered.
+        recorded_backend (str): The ``name`` of the backend that was recorded
+            (its SQL dialect is used by ``upsert_clause()``).
+    """
+
+    name = 'replay'
+    Error = ReplayError
+
+    def __init__(self, path, latency=0.0, row_latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.row_latency = row_latency
+        self.server_variables = {}
+        self.recorded_backend = None
+        self._redactors = []
+
+        self._responses = collections.defaultdict(list)
+        self._turns = collections.Counter()
+        self._lock = threading.Lock()
+        self.replayed = 0
+
+        try:
+            with open(path) as recording_file:
+                for line in recording_file:
+                    if line.strip():
+                        self._load(json.loads(line, object_hook=_decode))
+        except (OSError, ValueError) as err:
+            message = "Could not read the recording {path}: {error}".format(
+                path=path, error=err)
+            shared.print_error_message(message)
+            raise Exception(message)
+
+    def _load(self, entry):
+        if 'backend' in entry:
+            self.recorded_backend = entry['backend']
+            redactor = _Redactor(entry.get('redacted_columns', ()))
+            if redactor.columns and all(redactor.columns != other.columns
+                                        for other in self._redactors):
+                self._redactors.append(redactor)
+            self.max_placeholders = entry['max_placeholders']
+            self.server_variables = dict(self.server_variables,
+                                         **entry['server_variables'])
+            return
+
+        rows = entry['rows']
+        response = _Response(entry['columns'],
+                             [tuple(row) for row in rows] if rows is not None else None,
+                             entry['rowcount'], entry['insert_id'], entry['error'])
+        key = (entry['sql'], _values_key(entry['values']))
+        self._responses[key].append(response)
+
+    def connect(self):
+        return _ReplayConnection()
+
+    def is_connected(self, connection):
+        return True
+
+    def cursor(self, connection, dictionary=True, buffered=True):
+        return _ResponseCursor(connection, dictionary)
+
+    def _find(self, sql, values):
+        """Returns the responses recorded for a statement, masked as the
+        recording sessions masked it, and their key."""
+        key = (sql, _values_key(values))
+        responses = self._responses.get(key)
+        for redactor in self._redactors:
+            if responses:
+                break
+            masked_sql, masked_values, _ = redactor.statement(sql, values)
+            key = (masked_sql, _values_key(masked_values))
+            responses = self._responses.get(key)
+        return key, responses
+
+    def execute(self, cursor, sql, values=None):
+        with self._lock:
+            key, responses = self._find(sql, values)
+            if not responses:
+                raise ReplayError(
+                    "The statement was not recorded: {sql}".format(sql=sql))
+            response = responses[self._turns[key] % len(responses)]
+            self._turns[key] += 1
+            self.replayed += 1
+
+        delay = self.latency
+        if response.rows:
+            delay += self.row_latency * len(response.rows)
+        if delay > 0:
+            time.sleep(delay)
+
+        if response.error is not None:
+            raise ReplayError(response.error['message'], response.error['kind'])
+        cursor._load(response)
+
+    def insert_id(self, cursor, sql):
+        return cursor.lastrowid
+
+    def upsert_clause(self, conflict_keys, update_columns):
+        # The SQL must be the same that was recorded.
+        if self.recorded_backend == SQLiteBackend.name:
+            return SQLiteBackend.upsert_clause(self, conflict_keys,
+                                               update_columns)
+        return DatabaseBackend.upsert_clause(self, conflict_keys,
+                                             update_columns)
+
+    def error_kind(self, err):
+        return err.kind
+
+    def rewind(self):
+        """Starts serving every statement from its first recorded result."""
+        with self._lock:
+            self._turns.clear()
@@ -0,0 +1,246 @@
+"""Read replicas for ``ConnectionDB``.
+
+A ``ReplicaSet`` keeps a pool of connections per read replica and chooses the
+replica that serves each read:
+
+``'round_robin'``
+    The replicas take turns.
+
+``'least_latency'``
+    The replica with the lowest average time per query (an exponentially
+    weighted moving average, so recent queries count more). Replicas that were
+    never used are tried first.
+
+A replica that cannot be connected to is left out for ``retry_after`` seconds,
+and its reads go to the other replicas (or to the primary, if none is left).
+
+References:
+    `Replication`_
+
+    `Exponential moving average`_
+
+.. _Replication:
+   https://dev.mysql.com/doc/refman/8.0/en/replication.html
+.. _Exponential moving average:
+   https://en.wikipedia.org/wiki/Moving_average#Exponential_moving_average
+
+"""
+
+__all__ = [
+    'Replica',
+    'ReplicaSet'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import itertools
+import threading
+import time
+
+import shared
+from . connection_pool import ConnectionPool
+
+
+class Replica(object):
+    """One read replica: its backend, its pool and its health.
+
+    Args:
+        backend (DatabaseBackend): Connects to the replica.
+        pool_size (int, optional): Maximum number of open connections.
+            Defaults to 1.
+        retry_after (float, optional): Seconds the replica is left out after a
+            connection error. Defaults to 30.0.
+        **pool_options: ``timeout``, ``pre_ping`` and ``recycle`` of the
+            ``ConnectionPool``.
+
+    Attributes:
+        latency (float): Average seconds per query (None before the first).
+        down_until (float): ``time.monotonic()`` until which the replica is
+            not used (0 if it is healthy).
+    """
+
+    def __init__(self, backend, pool_size=1, retry_after=30.0, **pool_options):
+        self.backend = backend
+        self.pool = ConnectionPool(self._connect, size=pool_size,
+                                   ping=backend.is_connected, **pool_options)
+        self.latency = None
+        self.down_until = 0.0
+        self.retry_after = retry_after
+
+        self.queries = 0
+        self.failures = 0
+
+    def _connect(self):
+        try:
+            return self.backend.connect()
+        except Exception:
+            self.mark_down()
+            raise
+
+    def is_available(self, now=None):
+        """Checks if the replica can receive reads.
+
+        Args:
+            now (float, optional): ``time.monotonic()``. Defaults to now.
+
+        Returns:
+            bool: True if it is not marked as down.
+        """
+        if now is None:
+            now = time.monotonic()
+        return self.down_until <= now
+
+    def mark_down(self):
+        """Leaves the replica out for ``retry_after`` seconds."""
+        self.failures += 1
+        self.down_until = time.monotonic() + self.retry_after
+
+
+class ReplicaSet(object):
+    """Chooses the replica that serves each read.
+
+    Args:
+        backends (list[DatabaseBackend]): One backend per replica, of the same
+            engine as the primary.
+        selection (str, optional): ``'round_robin'`` or ``'least_latency'``.
+            Defaults to ``'round_robin'``.
+        pool_size (int, optional): Connections per replica. Defaults to 1.
+        retry_after (float, optional): Seconds a replica that failed is left
+            out. Defaults to 30.0.
+        smoothing (float, optional): Weight of the last query in the average
+            latency (between 0 and 1). Defaults to 0.2.
+        **pool_options: ``timeout``, ``pre_ping`` and ``recycle`` of the pools.
+
+    Raises:
+        Exception: If the selection is unknown.
+
+    Example:
+        Two replicas, used by a pooled ``ConnectionDB``::
+
+            replicas = ReplicaSet([MySQLBackend(host='replica1'),
+                                   MySQLBackend(host='replica2')],
+                                  selection='least_latency', pool_size=4)
+            database = ConnectionDB(pool_size=4, replicas=replicas)
+    """
+
+    SELECTIONS = ('round_robin', 'least_latency')
+    """tuple[str]: The strategies that choose a replica."""
+
+    def __init__(self, backends, selection='round_robin', pool_size=1,
+                 retry_after=30.0, smoothing=0.2, **pool_options):
+        if selection not in self.SELECTIONS:
+            message = "Unknown replica selection: {selection}".format(
+                selection=selection)
+            shared.print_error_message(message)
+            raise Exception(message)
+
+        self.selection = selection
+        self.smoothing = smoothing
+        self.replicas = [Replica(backend, pool_size, retry_after, **pool_options)
+                         for backend in backends]
+
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def candidates(self):
+        """Returns the available replicas, in the order they should be tried.
+
+        Returns:
+            list[Replica]: The replicas that are not marked as down.
+        """
+        now = time.monotonic()
+        available = [replica for replica in self.replicas
+                     if replica.is_available(now)]
+        if len(available) < 2:
+            return available
+
+        if self.selection == 'round_robin':
+            start = next(self._turn) % len(available)
+            return available[start:] + available[:start]
+
+        # least_latency: replicas without measures first.
+        return sorted(available, key=lambda replica: (
+            replica.latency is not None, replica.latency or 0.0))
+
+    def checkout(self):
+        """Takes a connection from the chosen replica. If it cannot be
+        connected to, the next one is tried.
+
+        Returns:
+            tuple: ``(replica, connection)``, or ``(None, None)`` if no replica
+            is available (the read goes to the primary).
+        """
+        for replica in self.candidates():
+            try:
+                return replica, replica.pool.checkout()
+            except Exception:
+                # Connection errors already marked the replica as down. A
+                # timeout only means it is busy.
+                continue
+        return None, None
+
+    def checkin(self, replica, connection, duration=None, discard=False,
+                failed=False):
+        """Gives a connection back to its replica.
+
+        Args:
+            replica (Replica): The replica returned by ``checkout()``.
+            connection (Any): The connection returned by ``checkout()``.
+            duration (float, optional): Seconds the read took, for the average
+                latency. Defaults to None (not measured).
+            discard (bool, optional): Closes the connection instead of reusing
+                it (for example, when a streamed result was not read to the
+                end). Defaults to False.
+            failed (bool, optional): The read lost the connection. If the
+                connection does not answer, the replica is marked as down.
+                Defaults to False.
+        """
+        if failed:
+            try:
+                alive = replica.backend.is_connected(connection)
+            except Exception:
+                alive = False
+            if not alive:
+                replica.mark_down()
+        replica.pool.checkin(connection, discard=discard or failed)
+
+        if duration is not None:
+            with self._lock:
+                replica.queries += 1
+                if replica.latency is None:
+                    replica.latency = duration
+                else:
+                    replica.latency += self.smoothing * (duration - replica.latency)
+
+    def statistics(self):
+        """Returns the usage of every replica.
+
+        Returns:
+            list[dict]: Per replica, ``queries``, ``failures``, ``latency``
+            (seconds), ``available`` and ``pool`` (see
+            ``ConnectionPool.statistics()``).
+        """
+        now = time.monotonic()
+        return [{
+            'queries': replica.queries,
+            'failures': replica.failures,
+            'latency': replica.latency,
+            'available': replica.is_available(now),
+            'pool': replica.pool.statistics()
+        } for replica in self.replicas]
+
+    def after_fork(self):
+        """Forgets the connections inherited from the parent process (see
+        ``ConnectionPool.after_fork()``)."""
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            replica.pool.after_fork()
+
+    def close(self):
+        """Closes the idle connections of every replica."""
+        for replica in self.replicas:
+            replica.pool.close()
@@ -0,0 +1,104 @@
+"""The formats in which ``ConnectionDB`` returns the rows of a result set.
+
+``'dict'``
+    One dictionary per row (``MySQLCursorDict``). The column names are stored
+    again in every row. It is the default.
+
+``'tuple'``
+    One plain tuple per row, with the values in the order of the columns.
+
+``'namedtuple'``
+    One instance per row of a ``collections.namedtuple`` created for the
+    columns of the query. The values are read by name (``row.price``) or by
+    position, but the names are stored once, in the class, and an instance is
+    as small as a tuple. The classes are cached, so a query that is executed
+    again reuses its class.
+
+References:
+    `collections.namedtuple()`_
+
+.. _collections.namedtuple():
+   https://docs.python.org/3.7/library/collections.html#collections.namedtuple
+
+"""
+
+__all__ = [
+    'ROW_FORMATS',
+    'record_class'
+]
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import collections
+import functools
+
+import shared
+
+
+ROW_FORMATS = ('dict', 'tuple', 'namedtuple')
+"""tuple[str]: The formats accepted by ``ConnectionDB.query()``."""
+
+
+@functools.lru_cache(maxsize=256)
+def record_class(columns):
+    """Returns the namedtuple class of a set of columns, creating it on the
+    first call.
+
+    Column names that are not valid field names (``COUNT(*)``, keywords,
+    repeated names) are renamed to ``_0``, ``_1``, etc. The names returned by
+    the database are kept in the ``_columns`` attribute of the class.
+
+    Args:
+        columns (tuple[str]): The column names, in order.
+
+    Returns:
+        type: The namedtuple class.
+
+    Example:
+        How to call this function::
+
+            Record = record_class(('id', 'brand'))
+            row = Record(1, 'Trek')
+            print(row.brand, row._columns)
+    """
+    cls = collections.namedtuple('Record', columns, rename=True)
+    cls._columns = columns
+    return cls
+
+
+def check_row_format(row_format):
+    """Checks if a row format exists.
+
+    Args:
+        row_format (str): The format.
+
+    Raises:
+        Exception: If it is not one of ``ROW_FORMATS``.
+    """
+    if row_format not in ROW_FORMATS:
+        message = "Unknown row format: {row_format}".format(
+            row_format=row_format)
+        shared.print_error_message(message)
+        raise Exception(message)
+
+
+def format_rows(cursor, rows, row_format):
+    """Converts the tuples fetched from a cursor to the requested format.
+
+    Args:
+        cursor (Any): The cursor that executed the query (for the column
+            names).
+        rows (list[tuple]): The rows.
+        row_format (str): ``'tuple'`` or ``'namedtuple'``.
+
+    Returns:
+        list[tuple]: The rows in the format.
+    """
+    if row_format == 'namedtuple':
+        record = record_class(tuple(column[0] for column in cursor.description))
+        return list(map(record._make, rows))
+    if rows and not isinstance(rows[0], tuple):
+        # Some drivers fetch lists or their own row objects.
+        return list(map(tuple, rows))
+    return rows
@@ -0,0 +1,119 @@
+"""An LRU cache of server-side prepared statements for one connection.
+
+``ConnectionDB`` keeps one ``StatementCache`` per connection (prepared
+statements belong to the session that prepared them) and uses it for the
+statements that have values, that is, the ones sent by ``_create()``,
+``_update()`` and ``delete()``.
+
+References:
+    `10.6.4 cursor.MySQLCursorPrepared Class`_
+
+    `13.5 Prepared Statements`_
+
+.. _10.6.4 cursor.MySQLCursorPrepared Class:
+   https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursorprepared.html
+.. _13.5 Prepared Statements:
+   https://dev.mysql.com/doc/refman/8.0/en/sql-prepared-statements.html
+
+"""
+
+__all__ = ['StatementCache']
+__copyright__ = "Copyright (C) 2024 Leonardo Pinheiro"
+__author__ = "Leonardo Pinheiro <info@leonardopinheiro.net>"
+__link__ = "https://www.leonardopinheiro.net"
+
+import collections
+import threading
+
+
+class StatementCache(object):
+    """Keeps a ``MySQLCursorPrepared`` per SQL text, evicting the least
+    recently used one when ``size`` is reached.
+
+    ``MySQLCursorPrepared.execute()`` only prepares the statement again when it
+    receives a different string object than the last time, so the cache stores
+    the SQL string together with its cursor and that same object must be passed
+    to ``execute()``.
+
+    Args:
+        connection (MySQLConnection): The connection that owns the statements.
+        size (int): Maximum number of prepared statements kept open.
+        counters (collections.Counter, optional): Where ``hits``, ``misses``
+            and ``evictions`` are counted. Several caches can share it.
+            Defaults to a new Counter.
+        lock (threading.Lock, optional): Protects ``counters`` when it is
+            shared. Defaults to a new Lock.
+
+    Example:
+        How it is used by ``ConnectionDB.query()``::
+
+            cursor, sql = cache.get(sql)
+            cursor.execute(sql, values)
+    """
+
+    def __init__(self, connection, size, counters=None, lock=None):
+        self.connection = connection
+        self.size = size
+        self.counters = counters if counters is not None else collections.Counter()
+        self._lock = lock if lock is not None else threading.Lock()
+        self._statements = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._statements)
+
+    def get(self, sql):
+        """Returns the prepared cursor of the SQL text, preparing it if needed.
+
+        Args:
+            sql (str): The statement with ``%s`` placeholders.
+
+        Returns:
+            tuple: ``(cursor, sql)``, where ``sql`` is the cached string object
+            that must be given to ``cursor.execute()``.
+        """
+
+        entry = self._statements.get(sql)
+        if entry is not None:
+            self._statements.move_to_end(sql)
+            self._count('hits')
+            return entry
+
+        self._count('misses')
+        entry = (self.connection.cursor(prepared=True), sql)
+        self._statements[sql] = entry
+
+        while len(self._statements) > self.size:
+            _, (cursor, _) = self._statements.popitem(last=False)
+            self._close(cursor)
+            self._count('evictions')
+
+        return entry
+
+    def discard(self, sql):
+        """Removes (and closes) the prepared statement of the SQL text, for
+        example, after its execution failed.
+
+        Args:
+            sql (str): The statement to be removed.
+        """
+        entry = self._statements.pop(sql, None)
+        if entry is not None:
+            self._close(entry[0])
+
+    def clear(self):
+        """Closes every prepared statement of the cache."""
+        while self._statements:
+            _, (cursor, _) = self._statements.popitem()
+            self._close(cursor)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            # The connection is gone, and the statement with it.
+            pass
@@ -142,10 +142,10 @@ class Bicycle(DatabaseObject):
 
         self.errors = []
 
-        if shared.is_blank(self.brand):
+        if self._validates('brand') and shared.is_blank(self.brand):
             self.errors.append("Brand cannot be blank.")
 
-        if shared.is_blank(self.model):
+        if self._validates('model') and shared.is_blank(self.model):
             self.errors.append("Model cannot be blank.")
 
         return self.errors
@@ -191,19 +191,21 @@ class Admin(DatabaseObject):
     def full_name(self):
         return "{self.first_name} {self.last_name}".format(self=self)
 
-    def _create(self):
+    def _before_create(self):
+        # Used by _create() and bulk_create().
         self.set_hashed_password(self.password)
-        return super(Admin, self)._create()
 
     def _update(self):
 
         # If the user is being updated, but the password is not, it will
         # allow updating the record, skipping the validation.
         # If it comes from a form (like an UI) and the password field is
-        # empty, the validation will be skipped.
-        if self.password != '':
+        # empty (or, for an admin found in the database, None), the validation
+        # will be skipped.
+        if not shared.is_blank(self.password):
             self.set_hashed_password(self.password)
             # Validate password.
+            self._password_required = True
         else:
             # Password not being updated, skip hashing and validation.
             self._password_required = False
@@ -212,24 +214,35 @@ class Admin(DatabaseObject):
     def _validate(self):
         self.errors = []
 
-        if shared.is_blank(self.first_name):
+        # Only the rules of the fields that changed run again (see
+        # DatabaseObject._validates()), so an unchanged username is not
+        # queried for uniqueness on every save.
+        if not self._validates('first_name'):
+            pass
+        elif shared.is_blank(self.first_name):
             self.errors.append('First name cannot be blank.')
         elif not shared.has_length(self.first_name, {'min': 2, 'max': 255}):
             self.errors.append('First name must be between 2 and 255 characters.')
 
-        if shared.is_blank(self.last_name):
+        if not self._validates('last_name'):
+            pass
+        elif shared.is_blank(self.last_name):
             self.errors.append('Last name cannot be blank.')
         elif not shared.has_length(self.last_name, {'min': 2, 'max': 255}):
             self.errors.append('Last name must be between 2 and 255 characters.')
 
-        if shared.is_blank(self.email):
+        if not self._validates('email'):
+            pass
+        elif shared.is_blank(self.email):
             self.errors.append('Email cannot be blank.')
         elif not shared.has_length(self.email, {'max': 255}):
             self.errors.append('Email must be less than 255 characters.')
         elif not shared.has_valid_email_format(self.email):
             self.errors.append('Email must be a valid format.')
 
-        if shared.is_blank(self.username):
+        if not self._validates('username'):
+            pass
+        elif shared.is_blank(self.username):
             self.errors.append('Username cannot be blank.')
         elif not shared.has_length(self.username, {'min': 8, 'max': 255}):
             self.errors.append('Username must be between 8 and 255 characters.')
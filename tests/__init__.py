@@ -0,0 +1,104 @@
+"""Unit tests of the ``activerecord`` package.
+
+The tests run on the embedded SQLite backend (``DB_ENGINE = 'sqlite'``), so
+no MySQL server (nor ``mysql-connector-python``) is needed::
+
+    npm run test
+
+    # Or, without coverage:
+    python -m unittest discover
+
+A ``db_credentials`` module for SQLite is put in ``sys.modules`` before
+``activerecord`` is imported, so the ``db_credentials.py`` of the developer
+(which may point to a real server) is never used. Every
+``DatabaseTestCase`` gets a new in-memory database with the schema of
+``resources/sql/chain_gang_sqlite.sql`` (bicycles 1 and 2, no admins).
+
+References:
+    `How to mock an import`_
+
+.. _How to mock an import:
+   https://stackoverflow.com/questions/8658043/how-to-mock-an-import
+
+"""
+
+import os
+import sys
+import types
+import unittest
+
+# Adds the src folder to sys.path, if it not already there, so unit tests can
+# see the modules:
+tests_dir = os.path.dirname(os.path.realpath(__file__))     # tests
+root_dir = os.path.dirname(tests_dir)                       # <root_directory>
+src_dir = os.path.join(root_dir, "src")
+
+for path in sys.path:
+    if path == src_dir:
+        break
+else:
+    sys.path.append(src_dir)
+
+SCHEMA = os.path.join(root_dir, "resources", "sql", "chain_gang_sqlite.sql")
+"""str: The SQLite version of the chain_gang database."""
+
+# The settings read by activerecord.database_functions.
+db_credentials = types.ModuleType('activerecord.db_credentials')
+db_credentials.DB_ENGINE = 'sqlite'
+db_credentials.DB_PATH = ':memory:'
+db_credentials.DB_SCHEMA = SCHEMA
+sys.modules['activerecord.db_credentials'] = db_credentials
+
+from activerecord import ConnectionDB, DatabaseObject, SQLiteBackend    # noqa: E402
+from appclasses import Bicycle                                          # noqa: E402
+
+
+def new_database(**kwargs):
+    """Creates a ``ConnectionDB`` with a new in-memory database.
+
+    Args:
+        **kwargs: Other arguments of ``ConnectionDB``.
+
+    Returns:
+        ConnectionDB: The instance.
+    """
+    return ConnectionDB(backend=SQLiteBackend(':memory:', SCHEMA), **kwargs)
+
+
+def new_bicycle(**kwargs):
+    """Creates a valid (unsaved) ``Bicycle``.
+
+    Args:
+        **kwargs: The properties that differ from the defaults.
+
+    Returns:
+        Bicycle: The bicycle.
+    """
+    properties = {
+        'brand': 'Trek',
+        'model': 'Domane',
+        'year': 2020,
+        'category': 'Road',
+        'gender': 'Unisex',
+        'color': 'red',
+        'price': 1000,
+        'weight_kg': 9,
+        'condition_id': 5,
+        'description': ''
+    }
+    properties.update(kwargs)
+    return Bicycle(**properties)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Replaces ``DatabaseObject._database`` with a new database for every
+    test, so the tests do not see each other's rows."""
+
+    def setUp(self):
+        self.database = new_database()
+        previous = DatabaseObject._database
+        DatabaseObject._database = self.database
+
+        def restore():
+            DatabaseObject._database = previous
+        self.addCleanup(restore)
@@ -0,0 +1,49 @@
+"""Tests of ``activerecord.async_connection_db`` and the async finders of
+``DatabaseObject``."""
+
+import asyncio
+import gc
+import unittest
+import weakref
+
+import tests
+from activerecord import AsyncConnectionDB
+from appclasses import Bicycle
+
+
+class TestAsyncConnectionDB(tests.DatabaseTestCase):
+
+    def test_queries_run_concurrently_in_workers(self):
+        async_database = AsyncConnectionDB(self.database, max_workers=4)
+        self.addCleanup(async_database.close)
+
+        async def lookups():
+            return await asyncio.gather(*[
+                async_database.query("SELECT brand FROM bicycles WHERE id=%s",
+                                     (id,)) for id in (1, 2, 1)])
+
+        results = asyncio.run(lookups())
+        self.assertEqual([rows[0]['brand'] for rows in results],
+                         ['Trek', 'Cannondale', 'Trek'])
+
+    def test_async_finders(self):
+        async def find():
+            return await asyncio.gather(Bicycle.find_by_id_async(2),
+                                        Bicycle.count_all_async())
+
+        bike, count = asyncio.run(find())
+        self.assertEqual((bike.model, count), ('Synapse', 2))
+
+    def test_shared_instance_dies_with_its_database(self):
+        database = tests.new_database()
+        async_database = AsyncConnectionDB.of(database)
+        self.assertIs(AsyncConnectionDB.of(database), async_database)
+
+        reference = weakref.ref(database)
+        del database, async_database
+        gc.collect()
+        self.assertIsNone(reference())
+
+
+if __name__ == '__main__':
+    unittest.main()
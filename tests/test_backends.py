@@ -0,0 +1,65 @@
+"""Tests of ``activerecord.backends`` (the SQLite backend)."""
+
+import decimal
+import unittest
+
+import tests
+from activerecord import DatabaseBackend
+
+
+class TestSQLiteBackend(tests.DatabaseTestCase):
+
+    def test_connections_share_the_memory_database(self):
+        backend = self.database.backend
+        first = backend.connect()
+        second = backend.connect()
+        self.addCleanup(backend.close, first)
+        self.addCleanup(backend.close, second)
+
+        first.execute("UPDATE bicycles SET color='green' WHERE id=1")
+        first.commit()
+        color = second.execute("SELECT color FROM bicycles WHERE id=1").fetchone()
+        self.assertEqual(color[0], 'green')
+
+    def test_placeholders_and_dictionary_rows(self):
+        rows = self.database.query(
+            "SELECT brand FROM bicycles WHERE model=%s AND description='%s'",
+            ('Emonda',))
+        self.assertEqual(rows, [])
+
+        rows = self.database.query(
+            "SELECT brand FROM bicycles WHERE model=%s", ('Emonda',))
+        self.assertEqual(rows, [{'brand': 'Trek'}])
+
+    def test_decimal_columns_keep_their_scale(self):
+        row = self.database.query(
+            "SELECT price, weight_kg FROM bicycles WHERE id=1")[0]
+
+        self.assertEqual(row['price'], decimal.Decimal('1495.00'))
+        self.assertEqual(str(row['price']), '1495.00')
+        self.assertEqual(str(row['weight_kg']), '1.50000')
+
+    def test_insert_id_of_a_multi_row_insert_is_the_first_row(self):
+        # Explicit ids leave the generated ones out of sequence.
+        result = self.database.execute(
+            "INSERT INTO admins (id, first_name, last_name, email, username, "
+            "hashed_password) VALUES (%s, 'A', 'B', 'a@example.com', 'u', 'h'), "
+            "(%s, 'C', 'D', 'c@example.com', 'v', 'h')", (10, 5))
+
+        self.assertEqual(result.affected_rows, 2)
+        self.assertEqual(result.insert_id, 10)
+
+    def test_upsert_clause(self):
+        backend = self.database.backend
+        self.assertEqual(backend.upsert_clause(['id'], ['price']),
+                         " ON CONFLICT (id) DO UPDATE SET price=excluded.price")
+        self.assertEqual(backend.upsert_clause(['id'], []),
+                         " ON CONFLICT (id) DO NOTHING")
+        # MySQL (the implementation of the base class).
+        self.assertEqual(
+            DatabaseBackend.upsert_clause(backend, ['id'], ['price']),
+            " ON DUPLICATE KEY UPDATE price=VALUES(price)")
+
+
+if __name__ == '__main__':
+    unittest.main()
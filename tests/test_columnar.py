@@ -0,0 +1,38 @@
+"""Tests of ``activerecord.columnar``."""
+
+import unittest
+
+import tests
+from activerecord import columnar, to_columns
+
+
+@unittest.skipIf(columnar.numpy is None, "NumPy is not installed.")
+class TestColumnar(tests.DatabaseTestCase):
+
+    def test_one_array_per_column(self):
+        columns = self.database.query_columns(
+            "SELECT id, price, brand FROM bicycles ORDER BY id")
+
+        self.assertEqual(list(columns), ['id', 'price', 'brand'])
+        self.assertEqual(columns['id'].dtype.name, 'int64')
+        self.assertEqual(columns['price'].dtype.name, 'float64')
+        self.assertEqual(columns['price'].sum(), 1495.0 + 1999.0)
+        self.assertEqual(list(columns['brand']), ['Trek', 'Cannondale'])
+
+    def test_null_integers_become_float(self):
+        columns = to_columns(['year'], [(2017,), (None,)])
+
+        self.assertEqual(columns['year'].dtype.name, 'float64')
+        self.assertTrue(columnar.numpy.isnan(columns['year'][1]))
+
+
+class TestWithoutNumPy(unittest.TestCase):
+
+    @unittest.skipIf(columnar.numpy is not None, "NumPy is installed.")
+    def test_to_columns_raises_import_error(self):
+        with self.assertRaises(ImportError):
+            to_columns(['id'], [(1,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Tests of ``activerecord.connection_db``."""
+
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+import tests
+from activerecord import (IntegrityError, LockWaitTimeoutError,
+                          NoSuchTableError, RetryPolicy)
+
+
+class TestConnectionDB(tests.DatabaseTestCase):
+
+    def insert_bicycle(self, model, database=None):
+        database = database or self.database
+        return database.execute(
+            "INSERT INTO bicycles (brand, model, year, category, gender, "
+            "color, price, weight_kg, condition_id, description) "
+            "VALUES (%s, %s, 2020, 'Road', 'Unisex', 'red', 100, 9, 5, '')",
+            ('Trek', model))
+
+    def count(self):
+        return self.database.query(
+            "SELECT COUNT(*) AS count FROM bicycles")[0]['count']
+
+    def test_connects_on_the_first_query(self):
+        backend = tests.SQLiteBackend(':memory:', tests.SCHEMA)
+        with mock.patch.object(backend, 'connect', wraps=backend.connect) as connect:
+            database = tests.ConnectionDB(backend=backend)
+            connect.assert_not_called()
+
+            database.query("SELECT id FROM bicycles")
+            database.query("SELECT id FROM bicycles")
+            connect.assert_called_once_with()
+
+    def test_query_iter_streams_every_row_in_batches(self):
+        for number in range(5):
+            self.insert_bicycle('Model {number}'.format(number=number))
+
+        batches = list(self.database.query_batches(
+            "SELECT id FROM bicycles ORDER BY id", batch_size=3))
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(
+            [row['id'] for row in self.database.query_iter(
+                "SELECT id FROM bicycles ORDER BY id", batch_size=2)],
+            [row['id'] for batch in batches for row in batch])
+
+    def test_transaction_commits_at_the_end(self):
+        with self.database.transaction():
+            self.insert_bicycle('Inside')
+        self.assertEqual(self.count(), 3)
+
+    def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(ValueError):
+            with self.database.transaction():
+                self.insert_bicycle('Inside')
+                raise ValueError()
+        self.assertEqual(self.count(), 2)
+
+    def test_savepoint_rolls_back_only_the_inner_block(self):
+        with self.database.transaction():
+            self.insert_bicycle('Outer')
+            try:
+                with self.database.transaction():
+                    self.insert_bicycle('Inner')
+                    raise ValueError()
+            except ValueError:
+                pass
+            self.insert_bicycle('After')
+
+        models = [row['model'] for row in self.database.query(
+            "SELECT model FROM bicycles WHERE id > 2 ORDER BY id")]
+        self.assertEqual(models, ['Outer', 'After'])
+
+    def test_query_many_returns_one_result_per_statement(self):
+        count, inserted, rows = self.database.query_many([
+            "SELECT COUNT(*) AS count FROM bicycles",
+            ("UPDATE bicycles SET color=%s WHERE id=%s", ('blue', 1)),
+            ("SELECT color FROM bicycles WHERE id=%s", (1,))])
+
+        self.assertEqual(count, [{'count': 2}])
+        self.assertIs(inserted, True)
+        self.assertEqual(rows, [{'color': 'blue'}])
+
+    def test_row_formats(self):
+        sql = "SELECT id, brand FROM bicycles ORDER BY id"
+
+        self.assertEqual(self.database.query(sql, row_format='tuple')[0],
+                         (1, 'Trek'))
+        record = self.database.query(sql, row_format='namedtuple')[1]
+        self.assertEqual((record.id, record.brand), (2, 'Cannondale'))
+
+    def test_errors_are_typed(self):
+        with self.assertRaises(NoSuchTableError):
+            self.database.query("SELECT * FROM trucks")
+        with self.assertRaises(IntegrityError):
+            self.database.execute(
+                "INSERT INTO bicycles (id, brand) VALUES (%s, %s)", (1, 'x'))
+
+    def test_lock_wait_timeout_is_tried_again(self):
+        self.database.retry_policy = RetryPolicy(attempts=3, base_delay=0.0)
+        execute = self.database.backend.execute
+        failures = [sqlite3.OperationalError('database table is locked')]
+
+        def fail_once(cursor, sql, values=None):
+            if failures:
+                raise failures.pop()
+            return execute(cursor, sql, values)
+
+        with mock.patch.object(self.database.backend, 'execute', fail_once):
+            self.assertEqual(len(self.database.query("SELECT id FROM bicycles")), 2)
+        self.assertEqual(self.database.retry_policy.retries, 1)
+
+        self.database.retry_policy = RetryPolicy(attempts=1)
+        failures.append(sqlite3.OperationalError('database table is locked'))
+        with mock.patch.object(self.database.backend, 'execute', fail_once):
+            with self.assertRaises(LockWaitTimeoutError):
+                self.database.query("SELECT id FROM bicycles")
+
+    def test_query_metadata_belongs_to_the_thread(self):
+        result = self.insert_bicycle('Main')
+        other = []
+
+        thread = threading.Thread(
+            target=lambda: other.append(self.insert_bicycle('Other').insert_id))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(result.insert_id, 3)
+        self.assertEqual(other, [4])
+        self.assertEqual(self.database.insert_id, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Tests of ``activerecord.connection_pool``."""
+
+import sqlite3
+import threading
+import unittest
+
+import tests
+from activerecord import ConnectionPool, PoolTimeoutError
+
+
+def sqlite_pool(**kwargs):
+    return ConnectionPool(
+        lambda: sqlite3.connect(':memory:', check_same_thread=False),
+        ping=lambda connection: True, **kwargs)
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_reuses_the_connections_given_back(self):
+        pool = sqlite_pool(size=2)
+        connection = pool.checkout()
+        pool.checkin(connection)
+
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.statistics()['created'], 1)
+
+    def test_never_opens_more_than_size(self):
+        pool = sqlite_pool(size=2, timeout=0.05)
+        pool.checkout()
+        pool.checkout()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.checkout()
+        self.assertEqual(pool.statistics()['timeouts'], 1)
+
+    def test_a_waiting_thread_gets_the_connection_given_back(self):
+        pool = sqlite_pool(size=1, timeout=5.0)
+        connection = pool.checkout()
+        received = []
+
+        thread = threading.Thread(target=lambda: received.append(pool.checkout()))
+        thread.start()
+        pool.checkin(connection)
+        thread.join(5.0)
+
+        self.assertEqual(received, [connection])
+
+    def test_checkin_twice_does_not_free_a_slot(self):
+        pool = sqlite_pool(size=1, timeout=0.05)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        pool.checkin(connection)
+        pool.checkin(connection, discard=True)
+
+        self.assertIs(pool.checkout(), connection)
+        with self.assertRaises(PoolTimeoutError):
+            pool.checkout()
+
+    def test_discard_closes_and_frees_the_slot(self):
+        pool = sqlite_pool(size=1)
+        connection = pool.checkout()
+        pool.checkin(connection, discard=True)
+
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(pool.statistics()['created'], 2)
+
+    def test_connection_db_queries_through_the_pool(self):
+        database = tests.new_database(pool_size=2)
+
+        self.assertEqual(len(database.query("SELECT id FROM bicycles")), 2)
+        self.assertEqual(database.pool_statistics()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
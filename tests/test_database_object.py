@@ -0,0 +1,177 @@
+"""Tests of the finders and writers of ``activerecord.DatabaseObject``."""
+
+import decimal
+import unittest
+from unittest import mock
+
+import tests
+from appclasses import Bicycle
+
+
+class TestDatabaseObject(tests.DatabaseTestCase):
+
+    def statements(self):
+        """Returns a mock that records the calls of ``execute()`` and
+        ``query()`` (the writes of the models go through both)."""
+        calls = mock.Mock()
+        for name in ('execute', 'query'):
+            patcher = mock.patch.object(
+                self.database, name, wraps=getattr(self.database, name))
+            setattr(calls, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        return calls
+
+    def prices(self):
+        return {row['id']: row['price'] for row in self.database.query(
+            "SELECT id, price FROM bicycles")}
+
+    def test_warm_up_connects_in_the_background(self):
+        Bicycle.warm_up().join()
+        self.assertEqual(Bicycle.count_all(), 2)
+
+    def test_find_each_streams_every_object(self):
+        Bicycle.bulk_create([tests.new_bicycle(model=str(number))
+                             for number in range(5)])
+
+        ids = [bike.id for bike in Bicycle.find_each(batch_size=2)]
+        self.assertEqual(ids, list(range(1, 8)))
+
+    def test_bulk_create_fills_the_ids_of_every_batch(self):
+        bikes = [tests.new_bicycle(model=str(number)) for number in range(5)]
+
+        self.assertTrue(Bicycle.bulk_create(bikes, batch_size=2))
+
+        self.assertEqual([bike.id for bike in bikes], [3, 4, 5, 6, 7])
+        self.assertEqual(Bicycle.find_by_id(7).model, '4')
+        self.assertEqual(bikes[0].changed_fields(), [])
+
+    def test_bulk_create_sends_nothing_if_an_object_is_invalid(self):
+        bikes = [tests.new_bicycle(), tests.new_bicycle(brand='')]
+
+        self.assertFalse(Bicycle.bulk_create(bikes))
+        self.assertTrue(bikes[1].errors)
+        self.assertEqual(Bicycle.count_all(), 2)
+
+    def test_find_by_ids_keeps_the_order_and_reports_the_missing_ids(self):
+        bikes, missing = Bicycle.find_by_ids([2, 99, 1, 2, 99])
+
+        self.assertEqual([bike.id for bike in bikes], [2, 1, 2])
+        self.assertIs(bikes[0], bikes[2])
+        self.assertEqual(missing, [99])
+
+    def test_find_by_ids_queries_once_per_chunk(self):
+        Bicycle.bulk_create([tests.new_bicycle() for _ in range(3)])
+        calls = self.statements()
+
+        bikes, missing = Bicycle.find_by_ids(['5', 1, 3, 4, 2], chunk_size=2)
+
+        self.assertEqual([bike.id for bike in bikes], [5, 1, 3, 4, 2])
+        self.assertEqual(missing, [])
+        self.assertEqual(calls.query.call_count, 3)
+
+    def test_find_pages_ascending(self):
+        Bicycle.bulk_create([tests.new_bicycle(price=price)
+                             for price in (500, 1495, 3000, 800)])
+
+        pages = list(Bicycle.find_pages(limit=2, order_by='price'))
+
+        self.assertEqual([[bike.id for bike in page] for page in pages],
+                         [[3, 6], [1, 4], [2, 5]])
+
+    def test_find_pages_descending(self):
+        # Equal prices are ordered by id, in the same direction.
+        Bicycle.bulk_create([tests.new_bicycle(price=price)
+                             for price in (500, 1495, 3000, 800, 1495)])
+
+        pages = list(Bicycle.find_pages(limit=2, order_by='-price'))
+        ids = [bike.id for page in pages for bike in page]
+
+        self.assertEqual(ids, [5, 2, 7, 4, 1, 6, 3])
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        prices = [bike.price for page in pages for bike in page]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_find_page_after_an_id_reads_its_value(self):
+        page = Bicycle.find_page(after_id=2, order_by='-price')
+
+        self.assertEqual([bike.id for bike in page], [1])
+        self.assertEqual(Bicycle.find_page(after_id=99, order_by='price'), [])
+
+    def test_changed_fields_of_a_loaded_object(self):
+        bike = Bicycle.find_by_id(1)
+        self.assertIsNotNone(bike._record)
+        self.assertEqual(bike.changed_fields(), [])
+
+        bike.color = 'blue'
+        bike.price = decimal.Decimal('1495.00')
+
+        self.assertEqual(bike.changed_fields(), ['color'])
+        self.assertTrue(bike.has_changes())
+
+    def test_save_without_changes_sends_nothing(self):
+        bike = Bicycle.find_by_id(1)
+        calls = self.statements()
+
+        self.assertTrue(bike.save())
+
+        self.assertEqual(calls.query.call_count, 0)
+        self.assertEqual(calls.execute.call_count, 0)
+
+    def test_save_writes_only_the_changed_columns(self):
+        bike = Bicycle.find_by_id(1)
+        bike.color = 'blue'
+        calls = self.statements()
+
+        self.assertTrue(bike.save())
+
+        sql = calls.query.call_args[0][0]
+        self.assertIn("SET color=%s WHERE", sql)
+        self.assertEqual(bike.changed_fields(), [])
+        self.assertEqual(Bicycle.find_by_id(1).color, 'blue')
+
+    def test_bulk_update_of_partial_objects_keeps_the_other_columns(self):
+        bikes = Bicycle.only('id', 'brand').order_by('id').all()
+        for bike in bikes:
+            bike.brand = bike.brand.upper()
+
+        self.assertTrue(Bicycle.bulk_update(bikes))
+
+        self.assertEqual([bike.brand for bike in Bicycle.find_all()],
+                         ['TREK', 'CANNONDALE'])
+        self.assertEqual(self.prices(), {1: decimal.Decimal('1495.00'),
+                                         2: decimal.Decimal('1999.00')})
+
+    def test_bulk_update_defaults_to_the_changed_fields_of_any_object(self):
+        first, second = Bicycle.find_all()
+        first.color = 'blue'
+        second.price = decimal.Decimal('1899.00')
+        calls = self.statements()
+
+        self.assertTrue(Bicycle.bulk_update([first, second]))
+
+        sql = calls.execute.call_args[0][0]
+        self.assertIn("color = CASE id", sql)
+        self.assertIn("price = CASE id", sql)
+        self.assertNotIn("brand", sql)
+        self.assertEqual(self.prices()[2], decimal.Decimal('1899.00'))
+        self.assertEqual(second.changed_fields(), [])
+
+    def test_bulk_update_rejects_unknown_fields(self):
+        with mock.patch('shared.print_error_message'):
+            with self.assertRaises(Exception):
+                Bicycle.bulk_update(Bicycle.find_all(), fields=['trucks'])
+
+    def test_upsert_inserts_new_records_and_updates_existing_ones(self):
+        existing = Bicycle.find_by_id(2)
+        existing.price = decimal.Decimal('999.00')
+        new = tests.new_bicycle(model='Madone')
+
+        self.assertTrue(Bicycle.upsert([existing, new], fields=['price']))
+
+        self.assertEqual(Bicycle.count_all(), 3)
+        self.assertEqual(self.prices()[2], decimal.Decimal('999.00'))
+        self.assertEqual(Bicycle.find_by_id(3).model, 'Madone')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests of ``activerecord.errors``."""
+
+import sqlite3
+import unittest
+
+import tests
+from activerecord import (BadFieldError, DeadlockError, DatabaseError,
+                          QueryError, RetryPolicy, TransientError)
+from activerecord.errors import translate_error
+
+
+class TestErrors(unittest.TestCase):
+
+    def test_translate_error_keeps_the_driver_error(self):
+        driver_error = sqlite3.OperationalError('no such column: weight')
+        error = translate_error(driver_error, 'bad_field')
+
+        self.assertIsInstance(error, BadFieldError)
+        self.assertIsInstance(error, DatabaseError)
+        self.assertIsInstance(translate_error(driver_error, None), QueryError)
+
+    def test_retry_policy_tries_transient_errors_again(self):
+        policy = RetryPolicy(attempts=3, base_delay=0.0)
+        failures = [DeadlockError("Deadlock."), DeadlockError("Deadlock.")]
+
+        def deadlocked():
+            if failures:
+                raise failures.pop()
+            return 'done'
+
+        self.assertEqual(policy.run(deadlocked), 'done')
+        self.assertEqual(policy.retries, 2)
+        self.assertTrue(issubclass(DeadlockError, TransientError))
+
+    def test_retry_policy_gives_up(self):
+        policy = RetryPolicy(attempts=2, base_delay=0.0)
+        calls = []
+
+        def deadlocked():
+            calls.append(1)
+            raise DeadlockError("Deadlock.")
+
+        with self.assertRaises(DeadlockError):
+            policy.run(deadlocked)
+        self.assertEqual(len(calls), 2)
+
+    def test_other_errors_are_not_tried_again(self):
+        policy = RetryPolicy(attempts=3, base_delay=0.0)
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise BadFieldError("Column does not exist in table.")
+
+        with self.assertRaises(BadFieldError):
+            policy.run(broken)
+        self.assertEqual(len(calls), 1)
+
+    def test_delay_is_bounded(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3)
+
+        for failures in range(1, 10):
+            self.assertLessEqual(policy.delay(failures), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests of ``activerecord.explain``."""
+
+import json
+import unittest
+
+import tests
+from activerecord import ExplainCapture
+
+
+class TestExplainCapture(tests.DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.explain = ExplainCapture(threshold=0.0)
+        self.explain.attach(self.database)
+        self.addCleanup(self.explain.detach)
+
+    def test_full_table_scan_is_reported(self):
+        self.database.query("SELECT * FROM bicycles WHERE color=%s", ('red',))
+        self.explain.wait()
+
+        entry = list(self.explain.plans().values())[0]
+        self.assertEqual(entry['sql'], "SELECT * FROM bicycles WHERE color=%s")
+        self.assertIn('full table scan on bicycles', entry['problems'])
+
+    def test_each_fingerprint_is_explained_once(self):
+        for id in (1, 2, 1):
+            self.database.query("SELECT * FROM bicycles WHERE id=%s", (id,))
+        self.explain.wait()
+
+        self.assertEqual(self.explain.explained, 1)
+        entry = list(self.explain.plans().values())[0]
+        self.assertEqual(entry['slow_queries'], 3)
+        self.assertEqual(entry['problems'], [])
+
+    def test_literals_are_not_kept(self):
+        self.database.query("SELECT * FROM admins WHERE username='jdoe'")
+        self.explain.wait()
+
+        report = self.explain.report()
+        self.assertNotIn('jdoe', report)
+        entry = list(json.loads(report).values())[0]
+        self.assertEqual(entry['sql'], "SELECT * FROM admins WHERE username=%s")
+        self.assertNotIn('max_time', entry)
+
+    def test_query_many_is_not_explained(self):
+        self.database.query_many(["SELECT * FROM bicycles",
+                                  "SELECT * FROM admins"])
+        self.explain.wait()
+
+        self.assertEqual(self.explain.plans(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
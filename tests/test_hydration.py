@@ -0,0 +1,71 @@
+"""Tests of ``activerecord.hydration``."""
+
+import decimal
+import unittest
+
+import tests
+from activerecord import HydrationPlan
+from appclasses import Bicycle
+
+
+class TaggedBicycle(Bicycle):
+    """A bicycle with a mutable default and a column behind a property."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tags = []
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = value.upper()
+
+
+class TestHydration(tests.DatabaseTestCase):
+
+    def attributes(self, bike):
+        return {column: getattr(bike, column) for column in Bicycle._db_columns}
+
+    def test_plan_creates_the_same_objects_as_the_constructor(self):
+        fast = Bicycle.find_by_id(1)
+        Bicycle._fast_hydration = False
+        try:
+            slow = Bicycle.find_by_id(1)
+        finally:
+            del Bicycle._fast_hydration
+
+        self.assertEqual(self.attributes(fast), self.attributes(slow))
+        # The plan keeps the record instead of taking the snapshot.
+        self.assertEqual(fast.__dict__.keys() - {'_record'},
+                         slow.__dict__.keys() - {'_original'})
+        self.assertEqual(fast.price, decimal.Decimal('1495.00'))
+
+    def test_one_plan_per_class_and_columns(self):
+        record = self.database.query("SELECT id, brand FROM bicycles")[0]
+
+        self.assertIs(HydrationPlan.of(Bicycle, record),
+                      HydrationPlan.of(Bicycle, dict(record)))
+        self.assertIsNot(HydrationPlan.of(Bicycle, record),
+                         HydrationPlan.of(TaggedBicycle, record))
+
+    def test_setters_run_and_mutable_defaults_are_copied(self):
+        first, second = TaggedBicycle.find_all()
+
+        self.assertEqual((first.color, second.color), ('BLACK', 'MATTE BLACK'))
+        first.tags.append('sale')
+        self.assertEqual(second.tags, [])
+
+    def test_slotted_objects_keep_their_state_in_slots(self):
+        bike = Bicycle.slotted().find_by_id(2)
+
+        self.assertEqual(vars(bike), {})
+        self.assertEqual((bike.brand, bike.name()),
+                         ('Cannondale', 'Cannondale Synapse 2016'))
+        self.assertIsInstance(bike, Bicycle)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests of ``activerecord.identity_map``."""
+
+import threading
+import unittest
+
+import tests
+from activerecord import IdentityMap, QueryInstrumentation
+from appclasses import Bicycle
+
+
+class TestIdentityMap(tests.DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instrumentation = QueryInstrumentation()
+        self.database.instrumentation = self.instrumentation
+
+    def queries(self):
+        return sum(stats['count'] for stats
+                   in self.instrumentation.statistics().values())
+
+    def test_find_by_id_returns_the_loaded_object(self):
+        with Bicycle.session() as identity_map:
+            first = Bicycle.find_by_id(1)
+            again = Bicycle.find_by_id(1)
+            listed = Bicycle.find_all()[0]
+
+        self.assertIs(again, first)
+        self.assertIs(listed, first)
+        self.assertEqual(self.queries(), 2)
+        self.assertEqual(identity_map.hits, 2)
+
+    def test_outside_a_session_every_finder_queries(self):
+        self.assertIsNot(Bicycle.find_by_id(1), Bicycle.find_by_id(1))
+        self.assertIsNone(IdentityMap.current())
+
+    def test_partial_objects_are_not_registered(self):
+        with Bicycle.session():
+            partial = Bicycle.only('brand').first()
+            complete = Bicycle.find_by_id(partial.id)
+
+        self.assertIsNot(complete, partial)
+        self.assertEqual(complete.model, 'Emonda')
+
+    def test_the_session_belongs_to_the_thread(self):
+        seen = []
+        with Bicycle.session():
+            thread = threading.Thread(
+                target=lambda: seen.append(IdentityMap.current()))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(seen, [None])
+
+    def test_max_size_evicts_the_least_recently_used(self):
+        with Bicycle.session(max_size=1) as identity_map:
+            Bicycle.find_by_id(1)
+            Bicycle.find_by_id(2)
+
+        self.assertEqual(len(identity_map), 1)
+        self.assertIsNone(identity_map.get(Bicycle, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests of ``activerecord.instrumentation``."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import tests
+from activerecord import QueryInstrumentation, fingerprint
+
+
+class TestInstrumentation(tests.DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        log = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False)
+        log.close()
+        self.addCleanup(os.remove, log.name)
+        self.log_path = log.name
+
+        self.instrumentation = QueryInstrumentation(
+            slow_query_threshold=0.0, slow_query_log=self.log_path)
+        self.database.instrumentation = self.instrumentation
+
+    def log(self):
+        with open(self.log_path) as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_fingerprint_hides_the_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM  bicycles WHERE id='26' AND price > 10"),
+            fingerprint("select * from bicycles where id='3' and price > 2000"))
+
+    def test_statistics_by_fingerprint(self):
+        for id in (1, 2, 3):
+            self.database.query("SELECT * FROM bicycles WHERE id=%s", (id,))
+
+        statistics = self.instrumentation.statistics()
+        self.assertEqual(len(statistics), 1)
+        stats = list(statistics.values())[0]
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['rows'], 2)
+        self.assertEqual(sum(stats['histogram']), 3)
+
+    def test_slow_query_log_has_no_values_by_default(self):
+        self.database.query("SELECT * FROM admins WHERE email=%s",
+                            ('jdoe@example.com',))
+
+        entry = self.log()[0]
+        self.assertIn('fingerprint', entry)
+        self.assertNotIn('jdoe@example.com', json.dumps(entry))
+
+    def test_subscribers_receive_the_events(self):
+        events = []
+        self.instrumentation.subscribe('after_query', events.append)
+
+        self.database.query("SELECT id FROM bicycles")
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].rows, 2)
+        self.assertIsNotNone(events[0].duration)
+
+
+if __name__ == '__main__':
+    unittest.main()
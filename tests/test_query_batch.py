@@ -0,0 +1,32 @@
+"""Tests of ``activerecord.query_batch``."""
+
+import unittest
+
+import tests
+from appclasses import Bicycle
+
+
+class TestQueryBatch(tests.DatabaseTestCase):
+
+    def test_results_are_converted_by_the_model(self):
+        with Bicycle.batch() as batch:
+            count = batch.count_all(Bicycle)
+            bike = batch.find_by_id(Bicycle, 2)
+            bikes = batch.find_all(Bicycle)
+
+        self.assertEqual(count.value, 2)
+        self.assertEqual(bike.value.model, 'Synapse')
+        self.assertEqual([bike.id for bike in bikes.value], [1, 2])
+
+    def test_value_before_the_execution_raises(self):
+        batch = Bicycle.batch()
+        count = batch.count_all(Bicycle)
+
+        with self.assertRaises(Exception):
+            count.value
+        batch.execute()
+        self.assertEqual(count.value, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Tests of ``activerecord.query_cache``."""
+
+import unittest
+
+import tests
+from activerecord import QueryCache
+from activerecord.query_cache import table_written, tables_read
+
+
+class TestTablesRead(unittest.TestCase):
+
+    def test_joins_comma_lists_and_subqueries(self):
+        self.assertEqual(
+            tables_read("SELECT * FROM bicycles b JOIN admins a ON a.id=b.id"),
+            {'bicycles', 'admins'})
+        self.assertEqual(
+            tables_read("SELECT * FROM bicycles AS b, `chain_gang`.`admins` a "
+                        "WHERE a.id=b.id"),
+            {'bicycles', 'admins'})
+        self.assertEqual(
+            tables_read("SELECT * FROM (SELECT id FROM admins) AS a, bicycles"),
+            {'bicycles', 'admins'})
+        self.assertEqual(
+            tables_read("SELECT * FROM bicycles WHERE brand='from trucks'"),
+            {'bicycles'})
+
+    def test_unknown_tables_are_not_cached(self):
+        self.assertIsNone(tables_read(
+            "SELECT * FROM JSON_TABLE(@doc, '$[*]' COLUMNS (id INT PATH '$')) t"))
+        self.assertIsNone(tables_read(
+            "SELECT * FROM bicycles USE INDEX (PRIMARY) WHERE id=1"))
+
+    def test_table_written(self):
+        self.assertEqual(table_written("UPDATE `bicycles` SET price=1"),
+                         'bicycles')
+        self.assertEqual(table_written("INSERT INTO admins (id) VALUES (1)"),
+                         'admins')
+        self.assertIsNone(table_written("CREATE TABLE trucks (id INT)"))
+
+
+class TestQueryCache(tests.DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = QueryCache()
+        self.database.query_cache = self.cache
+
+    def test_repeated_select_is_served_from_the_cache(self):
+        first = self.database.query("SELECT id FROM bicycles ORDER BY id")
+        second = self.database.query("SELECT id FROM bicycles ORDER BY id")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.statistics()['hits'], 1)
+
+    def test_write_to_a_joined_table_invalidates_the_result(self):
+        sql = ("SELECT COUNT(*) AS count FROM bicycles b "
+               "JOIN admins a ON a.id = b.id")
+        self.assertEqual(self.database.query(sql), [{'count': 0}])
+
+        self.database.execute(
+            "INSERT INTO admins (first_name, last_name, email, username, "
+            "hashed_password) VALUES ('Ann', 'Lee', 'a@example.com', "
+            "'annlee01', 'hash')")
+
+        self.assertEqual(self.database.query(sql), [{'count': 1}])
+
+    def test_write_to_a_comma_joined_table_invalidates_the_result(self):
+        sql = "SELECT COUNT(*) AS count FROM bicycles, admins"
+        self.assertEqual(self.database.query(sql), [{'count': 0}])
+
+        self.database.execute(
+            "INSERT INTO admins (first_name, last_name, email, username, "
+            "hashed_password) VALUES ('Ann', 'Lee', 'a@example.com', "
+            "'annlee01', 'hash')")
+
+        self.assertEqual(self.database.query(sql), [{'count': 2}])
+
+    def test_results_are_copies(self):
+        rows = self.database.query("SELECT id FROM bicycles WHERE id=1")
+        rows[0]['id'] = 99
+
+        self.assertEqual(self.database.query("SELECT id FROM bicycles WHERE id=1"),
+                         [{'id': 1}])
+
+    def test_put_after_an_invalidation_is_skipped(self):
+        sql = "SELECT id FROM bicycles"
+        key = QueryCache.key(sql)
+        generation = self.cache.generation(sql)
+        self.cache.invalidate('bicycles')
+
+        self.cache.put(key, sql, [{'id': 1}], generation)
+        self.assertIsNone(self.cache.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
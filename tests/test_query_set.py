@@ -0,0 +1,53 @@
+"""Tests of ``activerecord.query_set``."""
+
+import unittest
+
+import tests
+from appclasses import Bicycle
+
+
+class TestQuerySet(tests.DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Bicycle.bulk_create([
+            tests.new_bicycle(brand='Trek', model='FX', category='Hybrid',
+                              price=600),
+            tests.new_bicycle(brand='Giant', model='TCR', price=2500)])
+
+    def test_compiles_to_sql_with_placeholders(self):
+        query = (Bicycle.where(category='Road', price__lt=1500)
+                 .order_by('-price', 'brand').only('brand').limit(5))
+
+        self.assertEqual(
+            query.sql(),
+            ("SELECT id, brand FROM bicycles WHERE category=%s AND price<%s "
+             "ORDER BY price DESC, brand ASC LIMIT 5", ('Road', 1500)))
+
+    def test_is_lazy_and_chainable(self):
+        query = Bicycle.where(category='Hybrid')
+        narrower = query.where(price__lt=1000)
+
+        self.assertEqual(len(query), 2)
+        self.assertEqual([bike.model for bike in narrower], ['FX'])
+
+    def test_count_exists_and_first(self):
+        self.assertEqual(Bicycle.where(price__gte=1495).count(), 3)
+        self.assertFalse(Bicycle.where(brand='Specialized').exists())
+        self.assertEqual(Bicycle.order_by('-price').first().model, 'TCR')
+
+    def test_in_and_raw_conditions(self):
+        self.assertEqual(
+            [bike.id for bike in Bicycle.where(id__in=[4, 1]).order_by('id')],
+            [1, 4])
+        self.assertEqual(list(Bicycle.where(id__in=[])), [])
+        self.assertEqual(
+            Bicycle.where("price BETWEEN %s AND %s", 500, 1500).count(), 2)
+
+    def test_unknown_column_raises(self):
+        with self.assertRaises(Exception):
+            Bicycle.where(wheels=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests of ``activerecord.recording``."""
+
+import decimal
+import os
+import tempfile
+import unittest
+
+import tests
+from activerecord import (ConnectionDB, DatabaseObject, RecordingBackend,
+                          ReplayBackend, SQLiteBackend)
+from appclasses import Admin, Bicycle
+
+
+class TestRecordAndReplay(unittest.TestCase):
+
+    def setUp(self):
+        recording = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False)
+        recording.close()
+        self.addCleanup(os.remove, recording.name)
+        self.path = recording.name
+
+        previous = DatabaseObject._database
+
+        def restore():
+            DatabaseObject._database = previous
+        self.addCleanup(restore)
+
+    def use(self, backend):
+        DatabaseObject._database = ConnectionDB(backend=backend)
+
+    def session(self):
+        """The statements that are recorded and then replayed."""
+        bike = Bicycle.find_by_id(1)
+        admin = Admin(first_name='Ann', last_name='Lee',
+                      email='ann@example.com', username='annlee01',
+                      password='Secret-password-1',
+                      confirm_password='Secret-password-1')
+        admin.save()
+        return bike.price, Admin.find_by_id(admin.id).username
+
+    def test_replay_answers_like_the_database(self):
+        self.use(RecordingBackend(SQLiteBackend(':memory:', tests.SCHEMA),
+                                  self.path))
+        recorded = self.session()
+
+        self.use(ReplayBackend(self.path))
+        replayed = self.session()
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(replayed, (decimal.Decimal('1495.00'), 'annlee01'))
+        self.assertGreater(DatabaseObject._database.backend.replayed, 0)
+
+    def test_redacted_columns_are_not_written(self):
+        self.use(RecordingBackend(SQLiteBackend(':memory:', tests.SCHEMA),
+                                  self.path))
+        self.session()
+
+        with open(self.path) as recording_file:
+            recording = recording_file.read()
+        self.assertNotIn('ann@example.com', recording)
+        self.assertNotIn('Secret-password-1', recording)
+        self.assertIn('[REDACTED]', recording)
+        self.assertIn('annlee01', recording)
+
+
+if __name__ == '__main__':
+    unittest.main()
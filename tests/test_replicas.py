@@ -0,0 +1,56 @@
+"""Tests of ``activerecord.replicas`` and the read routing of
+``ConnectionDB``."""
+
+import unittest
+
+import tests
+from activerecord import QueryCache, ReplicaSet, SQLiteBackend
+
+
+class TestReplicas(unittest.TestCase):
+
+    def setUp(self):
+        # The replica has the same schema, with a brand that tells it apart.
+        replica = SQLiteBackend(':memory:', tests.SCHEMA)
+        connection = replica.connect()
+        connection.execute("UPDATE bicycles SET brand='Replica' WHERE id=1")
+        connection.commit()
+        self.addCleanup(replica.close, connection)
+
+        self.database = tests.new_database(replicas=ReplicaSet([replica]),
+                                           read_your_writes=60.0)
+
+    def brand(self):
+        return self.database.query(
+            "SELECT brand FROM bicycles WHERE id=1")[0]['brand']
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.brand(), 'Replica')
+        self.assertEqual(self.database.replica_statistics()[0]['queries'], 1)
+
+    def test_primary_block_reads_the_primary(self):
+        with self.database.primary():
+            self.assertEqual(self.brand(), 'Trek')
+
+    def test_reads_in_a_transaction_stay_on_the_primary(self):
+        with self.database.transaction():
+            self.assertEqual(self.brand(), 'Trek')
+
+    def test_reads_after_a_write_see_it(self):
+        self.database.execute("UPDATE bicycles SET color='blue' WHERE id=2")
+        self.assertEqual(self.brand(), 'Trek')
+
+    def test_replica_reads_are_not_cached(self):
+        cache = QueryCache()
+        self.database.query_cache = cache
+
+        self.brand()
+        self.assertEqual(cache.statistics()['entries'], 0)
+
+        with self.database.primary():
+            self.brand()
+        self.assertEqual(cache.statistics()['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
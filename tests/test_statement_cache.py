@@ -0,0 +1,48 @@
+"""Tests of ``activerecord.statement_cache``."""
+
+import unittest
+from unittest import mock
+
+import tests
+from activerecord import StatementCache
+
+
+class TestStatementCache(unittest.TestCase):
+
+    def setUp(self):
+        # MySQLConnection.cursor(prepared=True) returns a MySQLCursorPrepared.
+        self.connection = mock.MagicMock()
+        self.connection.cursor.side_effect = lambda prepared: mock.MagicMock()
+        self.cache = StatementCache(self.connection, size=2)
+
+    def test_prepares_each_statement_once(self):
+        cursor, sql = self.cache.get("UPDATE bicycles SET price=%s WHERE id=%s")
+        again = self.cache.get("UPDATE bicycles SET price=%s WHERE id=%s")
+
+        self.assertIs(again[0], cursor)
+        self.assertIs(again[1], sql)
+        self.assertEqual(self.connection.cursor.call_count, 1)
+        self.assertEqual(self.cache.counters['hits'], 1)
+        self.assertEqual(self.cache.counters['misses'], 1)
+
+    def test_evicts_and_closes_the_least_recently_used(self):
+        first, _ = self.cache.get("DELETE FROM bicycles WHERE id=%s")
+        second, _ = self.cache.get("DELETE FROM admins WHERE id=%s")
+        self.cache.get("DELETE FROM bicycles WHERE id=%s")
+        self.cache.get("UPDATE admins SET email=%s WHERE id=%s")
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.counters['evictions'], 1)
+        second.close.assert_called_once_with()
+        first.close.assert_not_called()
+
+    def test_discard_closes_the_statement(self):
+        cursor, _ = self.cache.get("DELETE FROM bicycles WHERE id=%s")
+        self.cache.discard("DELETE FROM bicycles WHERE id=%s")
+
+        cursor.close.assert_called_once_with()
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()